@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 import asyncio
 import logging
+from contextlib import ExitStack
+from contextvars import ContextVar
 
 import discord
 from discord import Intents
@@ -9,6 +11,9 @@ from discord.ext.commands import Bot, Context, check, errors, when_mentioned_or
 
 from config import CONFIG
 from utils.custom_help import SimplePrettyHelp
+from utils.message_cache import message_cache
+from utils.message_dispatch import message_dispatch
+from utils.metrics import timed_operation
 from utils.utils import done_react, is_compsoc_exec_in_guild, wait_react
 
 DESCRIPTION = """
@@ -36,6 +41,7 @@ EXTENSIONS = [
     "cogs.commands.misc",
     "cogs.commands.onmessage",
     "cogs.commands.openaiadmin",
+    "cogs.commands.perf",
     "cogs.commands.quotes",
     "cogs.commands.rolemenu",
     "cogs.commands.reminders",
@@ -53,6 +59,7 @@ EXTENSIONS = [
     "cogs.commands.auction",
     "cogs.channel_checker",
     "cogs.database",
+    "cogs.http_client",
     "cogs.irc",
     "cogs.parallelism",
     "cogs.welcome",
@@ -79,6 +86,62 @@ async def reload_cogs(ctx: Context[Bot]):
     await ctx.message.add_reaction("✅")
 
 
+# The command being run in the current task, entered on invoke and exited after
+_invocation: ContextVar[ExitStack] = ContextVar("invocation")
+
+
+def _invokes_subcommand(ctx: Context[Bot]) -> bool:
+    """Whether the command is a group which is going on to run one of its subcommands"""
+    if not isinstance(ctx.command, commands.Group):
+        return False
+    # Peek at the next word like Group.invoke does, without consuming it
+    view = ctx.view
+    index, previous = view.index, view.previous
+    view.skip_ws()
+    trigger = view.get_word()
+    view.index, view.previous = index, previous
+    return trigger in ctx.command.all_commands
+
+
+@bot.before_invoke
+async def before_invoke(ctx: Context[Bot]):
+    # Time the command and attribute its database work to it. Groups run their own hooks
+    # before their subcommand's, so only the subcommand is timed.
+    assert ctx.command
+    if _invokes_subcommand(ctx):
+        return
+    invocation = ExitStack()
+    invocation.enter_context(
+        timed_operation("command", f"{CONFIG.PREFIX}{ctx.command.qualified_name}")
+    )
+    _invocation.set(invocation)
+
+
+@bot.after_invoke
+async def after_invoke(ctx: Context[Bot]):
+    invocation = _invocation.get(None)
+    if invocation is not None:
+        invocation.close()
+
+
+@bot.listen()
+async def on_message(message: discord.Message):
+    # Kept so that replies to it can be looked up without asking discord
+    message_cache.add(message)
+    # Classify each message once for the handlers interested in it, see MessageDispatch
+    await message_dispatch.dispatch(bot, message)
+
+
+@bot.listen()
+async def on_message_edit(before: discord.Message, after: discord.Message):
+    message_cache.edit(after)
+
+
+@bot.listen()
+async def on_raw_message_delete(payload: discord.RawMessageDeleteEvent):
+    message_cache.remove(payload.message_id)
+
+
 @bot.event
 async def on_ready():
     logging.info("Logged in as")
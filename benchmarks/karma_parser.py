@@ -0,0 +1,61 @@
+"""Throughput benchmark for the karma parser on long pasted messages.
+
+Run from the repository root with `python -m benchmarks.karma_parser`.
+"""
+import argparse
+import random
+from time import perf_counter
+
+from karma.parser import parse_message_content
+
+
+def shell_paste(rng: random.Random, lines: int) -> str:
+    flags = ["--verbose", "--dry-run", "-rf", "--force", "--no-cache", "--", "-+"]
+    return "\n".join(
+        f"$ cmd{i} {' '.join(rng.choices(flags, k=4))} path/to/file_{i}.txt"
+        for i in range(lines)
+    )
+
+
+def code_paste(rng: random.Random, lines: int) -> str:
+    statements = ["i++;", "j--;", "x += y--;", "if (a-- > 0) {", "}", "c = c++ + ++c;"]
+    return "\n".join(
+        "    " * rng.randint(0, 3) + rng.choice(statements) for _ in range(lines)
+    )
+
+
+def prose(rng: random.Random, words: int) -> str:
+    vocabulary = ["the", "karma", "bot", "is", "great", "apollo++", "for", "reasons"]
+    return " ".join(rng.choices(vocabulary, k=words))
+
+
+CORPORA = {
+    "shell paste": shell_paste,
+    "unfenced code paste": code_paste,
+    "long prose": prose,
+}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--iterations", type=int, default=200)
+    arg_parser.add_argument("--size", type=int, default=100, help="lines or words")
+    args = arg_parser.parse_args()
+
+    rng = random.Random(0)
+    for name, make in CORPORA.items():
+        message = make(rng, args.size)
+        start = perf_counter()
+        for _ in range(args.iterations):
+            parse_message_content(message)
+        elapsed = perf_counter() - start
+
+        print(
+            f"{name:>20}: {len(message):>6} chars, "
+            f"{args.iterations / elapsed:>9.1f} messages/s, "
+            f"{len(message) * args.iterations / elapsed / 1e6:>6.2f} MB/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Replay benchmark for the message to karma pipeline.
+
+Messages are classified and replayed through `Database.on_message` (and so
+`process_karma`) against a throwaway database, reporting throughput, latency percentiles
+and SQL statements per message. The corpus is synthetic unless a file with one message
+per line is given.
+
+Run from the repository root with `python -m benchmarks.karma_pipeline`, after
+`pipenv install --dev` for the async SQLite driver (without it messages go through the
+blocking driver, as the bot would). Tables are created in the database if missing, so
+only point `--database` at a scratch database.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+from pathlib import Path
+from time import perf_counter
+from typing import List
+
+import pretend
+from discord.abc import GuildChannel
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+
+import models.models
+from cogs.database import Database
+from config import CONFIG
+from models import Base, create_async_engine_for, db_session
+from tests.stubs import make_message_stub
+from utils.message_dispatch import MessageInfo
+
+CHATTER = ["hello", "anyone up for lunch?", "the lab is full again", "lol", "gg"]
+REASONS = ["for being great", "because of the coursework", "for the pizza"]
+
+
+class BenchmarkChannel(GuildChannel):
+    """A guild channel which throws replies away"""
+
+    def __init__(self, channel_id: int):
+        self.id = channel_id
+        self.name = "benchmark"
+
+    async def send(self, content: str):
+        pass
+
+
+def synthetic_corpus(
+    rng: random.Random, messages: int, topics: int, karma_ratio: float
+) -> List[str]:
+    """Chat with some karma in it, topics being karma'd with a long tail like real chat"""
+    names = [f"topic{i}" for i in range(topics)]
+    weights = [1 / (rank + 1) for rank in range(topics)]
+    corpus = []
+    for _ in range(messages):
+        if rng.random() >= karma_ratio:
+            corpus.append(rng.choice(CHATTER))
+            continue
+        parts = []
+        # A topic is only karma'd once per message
+        topics_karmad = rng.choices(names, weights, k=rng.randint(1, 3))
+        for topic in dict.fromkeys(topics_karmad):
+            part = topic + rng.choice(["++", "++", "--", "+-"])
+            if rng.random() < 0.2:
+                part += " " + rng.choice(REASONS)
+            parts.append(part)
+        corpus.append(" ".join(parts))
+    return corpus
+
+
+def count_statements(engine: Engine) -> List[int]:
+    """A counter of the statements executed through an engine"""
+    counter = [0]
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(*args):
+        counter[0] += 1
+
+    return counter
+
+
+async def replay(corpus: List[str], authors: int, database: str, cooldown: int):
+    url = make_url(database)
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    # Everything else, the in-memory caches included, reads from the benchmark database
+    db_session.bind = engine
+    async_engine = create_async_engine_for(url)
+    models.models._async_engine = async_engine
+    models.models._async_engine_created = True
+    statements = count_statements(engine)
+    async_statements = (
+        count_statements(async_engine.sync_engine) if async_engine else [0]
+    )
+    CONFIG.KARMA_TIMEOUT = cooldown
+
+    bot = pretend.stub(command_prefix=lambda bot, message: ["!"], user=None)
+    cog = pretend.stub(bot=bot)
+    channel = BenchmarkChannel(1)
+    users = [
+        pretend.stub(
+            name=f"user{i}", nick=None, id=1000 + i, bot=False, mention=f"<@{i}>"
+        )
+        for i in range(authors)
+    ]
+
+    latencies = []
+    start_statements = statements[0] + async_statements[0]
+    start = perf_counter()
+    for message_id, content in enumerate(corpus, 1):
+        message = make_message_stub(content, users[message_id % authors])
+        message.id = message_id
+        message.channel = channel
+        message.reference = None
+        message_start = perf_counter()
+        await Database.on_message(cog, MessageInfo.classify(bot, message))
+        latencies.append(perf_counter() - message_start)
+    elapsed = perf_counter() - start
+    total_statements = statements[0] + async_statements[0] - start_statements
+    if async_engine is not None:
+        await async_engine.dispose()
+
+    percentiles = statistics.quantiles(latencies, n=100)
+    print(f"{len(corpus)} messages against {url.get_backend_name()}")
+    print(f"{len(corpus) / elapsed:>9.1f} messages/s")
+    print(f"{percentiles[49] * 1000:>9.2f} ms p50")
+    print(f"{percentiles[98] * 1000:>9.2f} ms p99")
+    print(f"{total_statements / len(corpus):>9.2f} statements/message")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument(
+        "--database", help="SQLAlchemy URL, a new SQLite file by default"
+    )
+    arg_parser.add_argument("--corpus", type=Path, help="file of messages to replay")
+    arg_parser.add_argument("--messages", type=int, default=5000)
+    arg_parser.add_argument("--topics", type=int, default=500)
+    arg_parser.add_argument("--authors", type=int, default=50)
+    arg_parser.add_argument("--karma-ratio", type=float, default=0.3)
+    arg_parser.add_argument(
+        "--cooldown", type=int, default=0, help="karma cooldown in seconds"
+    )
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    if args.corpus is not None:
+        corpus = args.corpus.read_text().splitlines()
+    else:
+        rng = random.Random(args.seed)
+        corpus = synthetic_corpus(rng, args.messages, args.topics, args.karma_ratio)
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = args.database or f"sqlite:///{directory}/karma_pipeline.db"
+        asyncio.run(replay(corpus, args.authors, database, args.cooldown))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ import discord
 from discord.ext.commands import Bot, Cog
 
 from config import CONFIG
+from utils.metrics import timed_operation
 
 
 def locate(channel_id, channel_list):
@@ -48,36 +49,39 @@ async def channel_check(bot):
     while not bot.is_closed():
         await asyncio.sleep(CONFIG.CHANNEL_CHECK_INTERVAL)
 
-        # Get channel ids for diff
-        current = sorted(guild.channels, key=discord_channel_key)
-        curr_channels = [c.id for c in current]
-        prev_channels = [c.id for c in previous]
+        with timed_operation("loop", "channel_check"):
+            # Get channel ids for diff
+            current = sorted(guild.channels, key=discord_channel_key)
+            curr_channels = [c.id for c in current]
+            prev_channels = [c.id for c in previous]
 
-        if curr_channels == prev_channels:
-            continue
+            if curr_channels == prev_channels:
+                continue
 
-        # Find and filter changes
-        changes = list(difflib.Differ().compare(prev_channels, curr_channels))
+            # Find and filter changes
+            changes = list(difflib.Differ().compare(prev_channels, curr_channels))
 
-        # Each line after Differ will start with 2 char code
-        added = [c[2:] for c in changes if c.startswith("+ ")]
-        removed = [c[2:] for c in changes if c.startswith("- ")]
+            # Each line after Differ will start with 2 char code
+            added = [c[2:] for c in changes if c.startswith("+ ")]
+            removed = [c[2:] for c in changes if c.startswith("- ")]
 
-        moved = [int(c) for c in added if c in removed]  # Moved if added and removed
-
-        # Construct message
-        if moved:
-            msg = "**⚠️ Channel Moved:**"
+            moved = [
+                int(c) for c in added if c in removed
+            ]  # Moved if added and removed
 
+            # Construct message
             if moved:
-                for channel_id in moved:
-                    c, prev_pos_str = locate(channel_id, previous)
-                    c, curr_pos_str = locate(channel_id, current)
-                    msg += f"\n\t{c.mention} has been moved from {prev_pos_str} to {curr_pos_str}"
+                msg = "**⚠️ Channel Moved:**"
+
+                if moved:
+                    for channel_id in moved:
+                        c, prev_pos_str = locate(channel_id, previous)
+                        c, curr_pos_str = locate(channel_id, current)
+                        msg += f"\n\t{c.mention} has been moved from {prev_pos_str} to {curr_pos_str}"
 
-            await channel.send(msg)
+                await channel.send(msg)
 
-        previous = current
+            previous = current
 
 
 class ChannelChecker(Cog):
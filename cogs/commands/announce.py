@@ -22,6 +22,7 @@ from utils import (
     user_is_irc_bot,
 )
 from utils.announce_utils import generate_announcement
+from utils.metrics import timed_operation
 
 
 async def get_webhook(channel):
@@ -257,38 +258,41 @@ async def announcement_check(bot):
     """Checks for any announcements that need to be posted and haven't"""
     await bot.wait_until_ready()
     while not bot.is_closed():
-        # Find announcements that need posting
-        now = datetime.datetime.now()
-        announcements = (
-            db_session.query(Announcement)
-            .filter(Announcement.trigger_at <= now, Announcement.triggered.is_(False))
-            .all()
-        )
-
-        for a in announcements:
-            channel = bot.get_channel(a.playback_channel_id)
-            webhook = await get_webhook(channel)
-
-            # Find author info
-            name, avatar = None, None
-            if a.irc_name:
-                name = a.irc_name
-            else:
-                author = (
-                    bot.get_user(a.user.user_uid)
-                    if CONFIG.ANNOUNCEMENT_IMPERSONATE
-                    else bot.user
+        with timed_operation("loop", "announcement_check"):
+            # Find announcements that need posting
+            now = datetime.datetime.now()
+            announcements = (
+                db_session.query(Announcement)
+                .filter(
+                    Announcement.trigger_at <= now, Announcement.triggered.is_(False)
                 )
-                name, avatar = author.name, author.avatar.url
+                .all()
+            )
 
-            message = a.announcement_content
-            a.triggered = True
-            db_session.commit()
+            for a in announcements:
+                channel = bot.get_channel(a.playback_channel_id)
+                webhook = await get_webhook(channel)
+
+                # Find author info
+                name, avatar = None, None
+                if a.irc_name:
+                    name = a.irc_name
+                else:
+                    author = (
+                        bot.get_user(a.user.user_uid)
+                        if CONFIG.ANNOUNCEMENT_IMPERSONATE
+                        else bot.user
+                    )
+                    name, avatar = author.name, author.avatar.url
 
-            # Post message
-            await generate_announcement(
-                channel, message, webhook, name, avatar, AllowedMentions.all()
-            )
+                message = a.announcement_content
+                a.triggered = True
+                db_session.commit()
+
+                # Post message
+                await generate_announcement(
+                    channel, message, webhook, name, avatar, AllowedMentions.all()
+                )
 
         await asyncio.sleep(CONFIG.ANNOUNCEMENT_SEARCH_INTERVAL)
 
@@ -14,6 +14,7 @@ from discord.ext.commands import (
 
 from cogs.commands.openaiadmin import is_author_banned_openai
 from config import CONFIG
+from utils.message_dispatch import MessageInfo, fetch_reply, message_dispatch
 from utils.utils import get_name_and_content, split_into_messages
 
 LONG_HELP_TEXT = """
@@ -29,6 +30,8 @@ SHORT_HELP_TEXT = "Apollo is smarter than you think..."
 mentions = AllowedMentions(everyone=False, users=False, roles=False, replied_user=True)
 chat_cmd = CONFIG.PREFIX + "chat"
 prompt_cmd = CONFIG.PREFIX + "prompt"
+# The most messages of a reply chain followed back
+MAX_CHAIN_LENGTH = 50
 
 
 def clean(msg, *prefixes):
@@ -45,6 +48,16 @@ class ChatGPT(commands.Cog):
         if CONFIG.AI_INCLUDE_NAMES:
             self.system_prompt += "\nYou are in a Discord chat room, each message is prepended by the name of the message's author separated by a colon."
         self.cooldowns = {}
+        # Only engage if replying, use !chat to trigger otherwise
+        message_dispatch.register(
+            self.on_message,
+            lambda info: not info.message.author.bot
+            and not info.content.startswith(CONFIG.PREFIX)
+            and info.reply_to_id is not None,
+        )
+
+    async def cog_unload(self):
+        message_dispatch.unregister(self.on_message)
 
     @commands.hybrid_command(help=LONG_HELP_TEXT, brief=SHORT_HELP_TEXT)
     async def prompt(self, ctx: Context, *, message: str):
@@ -59,14 +72,10 @@ class ChatGPT(commands.Cog):
     async def chat(self, ctx: Context, *, message: str):
         await self.cmd(ctx, message)
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        # Avoid replying to bot or msg that triggers the command anyway
-        if message.author.bot or message.content.startswith(CONFIG.PREFIX):
-            return
-
-        # Only engage if replying to Apollo, use !chat to trigger otherwise
-        previous = await self.fetch_previous(message)
+    async def on_message(self, info: MessageInfo):
+        message = info.message
+        # Only engage if replying to Apollo, discord usually sends the reply with it
+        previous = await info.fetch_reply()
         if not previous:
             return
         if not previous.author.id == self.bot.user.id:
@@ -216,32 +225,33 @@ class ChatGPT(commands.Cog):
     ) -> list[discord.Message | str]:
         """
         Traverses a chain of replies to get a thread of chat messages between a user and Apollo.
+        Only the latest MAX_CHAIN_LENGTH messages of a longer chain are included.
         """
-        if message is None:
-            return []
-        previous = (
-            await self.fetch_previous(message)
-            if isinstance(message, discord.Message)
-            else None
-        )
-        append = [message]
-
-        attachments = (
-            message.attachments
-            if isinstance(message, discord.Message)
-            else ctx.message.attachments
-        )
-        for attachment in attachments:
-            if attachment.content_type.startswith("image"):
-                append.append(attachment.url)
-        return (await self.get_message_chain(previous, ctx)) + append
+        # Each message with its images, latest first
+        links = []
+        current: discord.Message | str | None = message
+        while current is not None and len(links) < MAX_CHAIN_LENGTH:
+            link = [current]
+            attachments = (
+                current.attachments
+                if isinstance(current, discord.Message)
+                else ctx.message.attachments
+            )
+            for attachment in attachments:
+                if attachment.content_type.startswith("image"):
+                    link.append(attachment.url)
+            links.append(link)
+            current = (
+                await self.fetch_previous(current)
+                if isinstance(current, discord.Message)
+                else None
+            )
+        return [item for link in reversed(links) for item in link]
 
     async def fetch_previous(
         self, message: discord.Message
     ) -> Optional[discord.Message]:
-        if message.reference is not None and message.reference.message_id is not None:
-            return await message.channel.fetch_message(message.reference.message_id)
-        return None
+        return await fetch_reply(message)
 
 
 async def setup(bot: Bot):
@@ -1,18 +1,13 @@
-import io
-import os
+import asyncio
 import shlex
-import tempfile
-from collections import defaultdict
-from contextlib import nullcontext
 from datetime import datetime, timedelta
 from io import BytesIO
-from pathlib import Path
+from math import ceil
 from time import time
 from typing import Dict, List, Optional, Tuple
 
-import matplotlib
-import matplotlib.pyplot as plt
-from discord import Color, Embed, File
+import discord
+from discord import Color, Embed, File, app_commands
 from discord.ext import commands
 from discord.ext.commands import (
     Bot,
@@ -22,34 +17,56 @@ from discord.ext.commands import (
     MissingRequiredArgument,
     clean_content,
 )
-from matplotlib import font_manager, rc_context
-from matplotlib.dates import (
-    DateFormatter,
-    DayLocator,
-    HourLocator,
-    MinuteLocator,
-    MonthLocator,
-    WeekdayLocator,
-    YearLocator,
-    date2num,
-)
 from pytz import timezone, utc
-from sqlalchemy import func
 
+from cogs.parallelism import Parallelism
+from karma.activity import topic_activity, trending_topics
+from karma.leaderboard import Window, leaderboards
+from karma.plot import (
+    PLOT_WORKER,
+    fetch_series,
+    init_plot_worker,
+    plot_cache,
+    plot_filename,
+    plot_key,
+    render_plot,
+)
+from karma.reasons import (
+    REASONS_PER_PAGE,
+    Reason,
+    count_reasons,
+    export_reasons,
+    format_reason,
+    get_reasons_page,
+)
+from karma.stats import KarmaStats
+from karma.topic_index import topic_index
 from models import db_session
 from models.karma import Karma as KarmaModel
-from models.karma import KarmaChange
-from models.user import User
-from utils import get_name_string, pluralise
-
-matplotlib.use("Agg")
-
+from models.karma import topic_key
+from utils import get_name_string, pluralise, split_into_messages
 
 LONG_HELP_TEXT = """
 Query and display the information about the karma topics on the UWCS discord server.
 """
 SHORT_HELP_TEXT = """View information about karma topics."""
 
+TOP_HELP_TEXT = """Shows the {} N karma topics (5 by default) of all time, or optionally for today, this week or this term"""
+DEFAULT_LEADERBOARD_SIZE = 5
+MAX_LEADERBOARD_SIZE = 100
+WINDOW_NAMES = {
+    Window.Today: "today",
+    Window.Week: "this week",
+    Window.Term: "this term",
+}
+
+TRENDING_SIZE = 10
+MAX_ACTIVITY_DAYS = 31
+ACTIVITY_BAR_LENGTH = 20
+
+# Keeps a page of reasons well within the message length limit
+MAX_REASON_LENGTH = 150
+
 
 class KarmaError(CommandError):
     message = None
@@ -64,122 +81,6 @@ def current_milli_time():
     return int(round(time() * 1000))
 
 
-# Utility coroutine to generate the matplotlib Figure object that can be manipulated by the calling function
-async def plot_karma(
-    karma_dict: Dict[str, List[KarmaChange]], xkcd: bool = False
-) -> Tuple[Optional[BytesIO], str]:
-    # Error if there's no input data
-    if len(karma_dict) == 0:
-        return None, ""
-
-    # Matplotlib preamble
-    plt.clf()
-    xkcd_context = plt.xkcd if xkcd else nullcontext
-    line_width = plt.rcParams["grid.linewidth"]
-
-    # Load Humor Sans font
-    font_path = str(Path("resources", "Humor-Sans.ttf"))
-    font_manager.fontManager.addfont(font_path)
-
-    # xkcd context sets grid.linewidth to 0 which causes an error with ax.grid.
-    # Setting it back to the initial line width fixes this.
-    with xkcd_context(), rc_context(
-        {"grid.linewidth": line_width, "figure.autolayout": True}
-    ):
-        fig, ax = plt.subplots(figsize=(8, 6))
-
-    # Get the earliest and latest karma values fo
-    earliest_karma = utc.localize(datetime.utcnow()).astimezone(
-        timezone("Europe/London")
-    )
-    latest_karma = utc.localize(datetime(1970, 1, 1)).astimezone(
-        timezone("Europe/London")
-    )
-    for key, changes in karma_dict.items():
-        earliest_karma = (
-            changes[0].local_time
-            if changes[0].local_time < earliest_karma
-            else earliest_karma
-        )
-        latest_karma = (
-            changes[-1].local_time
-            if changes[-1].local_time >= latest_karma
-            else latest_karma
-        )
-
-    karma_timeline = latest_karma - earliest_karma
-
-    # Determine the right graph tick positioning
-    if karma_timeline <= timedelta(hours=1):
-        date_format = DateFormatter("%H:%M %d %b %Y")
-        date_locator_major = MinuteLocator(interval=15)
-        date_locator_minor = MinuteLocator()
-    elif karma_timeline <= timedelta(hours=6):
-        date_format = DateFormatter("%H:%M %d %b %Y")
-        date_locator_major = HourLocator()
-        date_locator_minor = MinuteLocator(interval=15)
-    elif karma_timeline <= timedelta(days=14):
-        date_format = DateFormatter("%d %b %Y")
-        date_locator_major = DayLocator()
-        date_locator_minor = HourLocator(interval=6)
-    elif karma_timeline <= timedelta(days=30):
-        date_format = DateFormatter("%d %b %Y")
-        date_locator_major = WeekdayLocator()
-        date_locator_minor = DayLocator()
-    elif karma_timeline <= timedelta(days=365):
-        date_format = DateFormatter("%B %Y")
-        date_locator_major = MonthLocator()
-        date_locator_minor = WeekdayLocator(interval=2)
-    else:
-        date_format = DateFormatter("%Y")
-        date_locator_major = YearLocator()
-        date_locator_minor = MonthLocator()
-
-    # Transform the karma changes into plottable values
-    for karma, changes in karma_dict.items():
-        scores = [k.score for k in changes]
-        time = date2num([k.local_time for k in changes])
-
-        # Plot the values
-        ax.xaxis.set_major_locator(date_locator_major)
-        ax.xaxis.set_minor_locator(date_locator_minor)
-        ax.xaxis.set_major_formatter(date_format)
-        ax.grid(visible=True, which="minor", color="0.9", linestyle=":")
-        ax.grid(visible=True, which="major", color="0.5", linestyle="--")
-        ax.set(
-            xlabel="Time",
-            ylabel="Karma",
-            xlim=[
-                time[0] - ((time[-1] - time[0]) * 0.05),
-                time[-1] + ((time[-1] - time[0]) * 0.05),
-            ],
-        )
-        (line,) = ax.plot_date(time, scores, "-", xdate=True)
-        line.set_label(karma)
-
-    # Create a legend if more than  1 line and format the dates
-    if len(karma_dict.keys()) > 1:
-        with xkcd_context():
-            ax.legend()
-    fig.autofmt_xdate()
-
-    # Save the file to disk and set the right permissions
-    filename = (
-        "".join(karma_dict.keys())
-        + "-"
-        + str(hex(int(datetime.utcnow().timestamp()))).lstrip("0x")
-        + ".png"
-    ).replace(" ", "")
-    # path = CONFIG.FIG_SAVE_PATH / filename
-
-    img = io.BytesIO()
-    with xkcd_context():
-        fig.savefig(img, dpi=240, transparent=False, format="png")
-    img.seek(0)
-    plt.close(fig)
-    return img, filename
-
-
 # Util function to construct comma-separated strings in the form of:
 # "foo" or "foo and bar" or "foo, bar, and baz" or "foo, bar, baz, and (n) other topics"
 def comma_separate(items: List[str]) -> str:
@@ -213,92 +114,200 @@ def convert_int(argument: str):
 class Karma(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        leaderboards.load(db_session)
+        topic_index.load(db_session)
+        self.bot.loop.create_task(self.start_plot_worker())
+
+    async def start_plot_worker(self):
+        # Have the worker loaded before the first plot is asked for
+        p = await Parallelism.get(self.bot)
+        p.worker(PLOT_WORKER, init_plot_worker)
 
     @commands.hybrid_group(help=LONG_HELP_TEXT, brief=SHORT_HELP_TEXT)
     async def karma(self, ctx: Context):
         if not ctx.invoked_subcommand:
             await ctx.send("Subcommand not found")
 
-    @karma.command(help="Shows the top 5 karma topics")
-    async def top(self, ctx: Context):
-        # Get the top 5 karma items
-        top_karma = (
-            db_session.query(KarmaModel)
-            .order_by(KarmaModel.net_score.desc(), KarmaModel.name.asc())
-            .limit(5)
-            .all()
-        )
-
-        # Construct the appropriate response string
-        result = f"The top {len(top_karma)} items and their scores are:\n\n"
-        for karma in top_karma:
-            latest_karma = (
-                db_session.query(KarmaChange)
-                .filter(KarmaChange.karma_id == karma.id)
-                .order_by(KarmaChange.created_at.desc())
-                .first()
+    def get_window(self, window: Optional[str]) -> Optional[Window]:
+        if window is None:
+            return None
+        parsed = Window.get(window)
+        if parsed is None:
+            raise KarmaError(
+                message=f"The leaderboard can be for {comma_separate([w.name.lower() for w in Window])}, or of all time."
             )
-            result += f" • **{karma.name}** with a score of {latest_karma.score}\n"
-        result += "\nWhere equal scores, karma is sorted alphabetically. :scales:"
+        return parsed
 
-        await ctx.send(result)
+    def get_size(self, n: Optional[int]) -> int:
+        # n is optional so a window can be given without it, e.g. "!karma top week"
+        if n is None:
+            return DEFAULT_LEADERBOARD_SIZE
+        return max(1, min(n, MAX_LEADERBOARD_SIZE))
 
-    @karma.command(help="Shows the bottom 5 karma topics")
-    async def bottom(self, ctx: Context):
-        # Get the bottom 5 karma items
-        top_karma = (
-            db_session.query(KarmaModel)
-            .order_by(KarmaModel.net_score.asc(), KarmaModel.name.asc())
-            .limit(5)
-            .all()
-        )
+    async def send_leaderboard(
+        self, ctx: Context, heading: str, lines: List[str], tie_break: str
+    ):
+        result = heading + "\n\n" + "".join(lines)
+        result += f"\nWhere equal {tie_break}, karma is sorted alphabetically. :scales:"
+        for message in split_into_messages(result):
+            await ctx.send(message)
+
+    @karma.command(help=TOP_HELP_TEXT.format("top"))
+    async def top(
+        self, ctx: Context, n: Optional[int] = None, window: Optional[str] = None
+    ):
+        window = self.get_window(window)
+        n = self.get_size(n)
+        top_karma = leaderboards.top(n, db_session, window)
 
         # Construct the appropriate response string
-        result = f"The bottom {len(top_karma)} items and their scores are:\n\n"
-        for karma in top_karma:
-            latest_karma = (
-                db_session.query(KarmaChange)
-                .filter(KarmaChange.karma_id == karma.id)
-                .order_by(KarmaChange.created_at.desc())
-                .first()
-            )
-            result += f" • **{karma.name}** with a score of {latest_karma.score}\n"
-        result += "\nWhere equal scores, karma is sorted alphabetically. :scales:"
+        if window is None:
+            heading = f"The top {len(top_karma)} items and their scores are:"
+            lines = [f" • **{name}** with a score of {v}\n" for name, v in top_karma]
+        else:
+            heading = f"The top {len(top_karma)} items {WINDOW_NAMES[window]} and their changes in score are:"
+            lines = [f" • **{name}** with a change of {v:+}\n" for name, v in top_karma]
+        await self.send_leaderboard(ctx, heading, lines, "scores")
 
-        await ctx.send(result)
+    @karma.command(help=TOP_HELP_TEXT.format("bottom"))
+    async def bottom(
+        self, ctx: Context, n: Optional[int] = None, window: Optional[str] = None
+    ):
+        window = self.get_window(window)
+        n = self.get_size(n)
+        bottom_karma = leaderboards.bottom(n, db_session, window)
 
-    @karma.command(help="Shows the top !5 most karma'd topics")
-    async def most(self, ctx: Context):
-        # Get the 5 most karma'd items
-        most_karma = (
-            db_session.query(KarmaModel)
-            .order_by(KarmaModel.total_karma.desc(), KarmaModel.name.asc())
-            .limit(5)
-            .all()
-        )
+        # Construct the appropriate response string
+        if window is None:
+            heading = f"The bottom {len(bottom_karma)} items and their scores are:"
+            lines = [f" • **{name}** with a score of {v}\n" for name, v in bottom_karma]
+        else:
+            heading = f"The bottom {len(bottom_karma)} items {WINDOW_NAMES[window]} and their changes in score are:"
+            lines = [
+                f" • **{name}** with a change of {v:+}\n" for name, v in bottom_karma
+            ]
+        await self.send_leaderboard(ctx, heading, lines, "scores")
+
+    @karma.command(help=TOP_HELP_TEXT.format("most karma'd"))
+    async def most(
+        self, ctx: Context, n: Optional[int] = None, window: Optional[str] = None
+    ):
+        window = self.get_window(window)
+        n = self.get_size(n)
+        most_karma = leaderboards.most(n, db_session, window)
 
         # Construct the response string
-        result = "The 5 most karma'd topics and their total karma are:\n\n"
-        for karma in most_karma:
-            result += f" • **{karma.name}** being karma'd a total number of {karma.total_karma} times\n"
-        result += "\nWhere equal scores, karma is sorted alphabetically. :scales:"
+        when = "" if window is None else f" {WINDOW_NAMES[window]}"
+        heading = f"The {len(most_karma)} most karma'd topics{when} and their total karma are:"
+        lines = [
+            f" • **{name}** being karma'd a total number of {v} {pluralise(v, 'time')}\n"
+            for name, v in most_karma
+        ]
+        await self.send_leaderboard(ctx, heading, lines, "totals")
+
+    @top.error
+    @bottom.error
+    @most.error
+    async def leaderboard_error(self, ctx: Context, error: CommandError):
+        if isinstance(error, KarmaError):
+            await ctx.send(error.message)
+        else:
+            raise error
 
+    @karma.command(
+        help="Shows the most karma'd topics of the last N days (7 by default)"
+    )
+    async def trending(self, ctx: Context, days: int = 7):
+        days = max(1, min(days, MAX_ACTIVITY_DAYS))
+        since = datetime.utcnow() - timedelta(days=days)
+        topics = trending_topics(db_session, since, TRENDING_SIZE)
+        if not topics:
+            return await ctx.send(
+                f"Nothing has been karma'd in the last {days} {pluralise(days, 'day')}! :frowning:"
+            )
+
+        result = f"The {len(topics)} most karma'd topics of the last {days} {pluralise(days, 'day')} are:\n\n"
+        for name, changes, net in topics:
+            result += f" • **{name}** karma'd {changes} {pluralise(changes, 'time')} for a net change of {net:+}\n"
         await ctx.send(result)
 
+    @karma.command(
+        help="Shows how often a karma topic was karma'd each day of the last N days (14 by default)"
+    )
+    async def activity(self, ctx: Context, item: str, days: int = 14):
+        item = await clean_content().convert(ctx, item)
+        karma_stripped = item.lstrip("@")
+        karma_item = self.get_karma_item(item)
+        if not karma_item:
+            return await ctx.reply(self.not_karmad_message(karma_stripped))
+
+        # Total up the hourly activity into local days, including the quiet ones
+        days = max(1, min(days, MAX_ACTIVITY_DAYS))
+        london = timezone("Europe/London")
+        today = utc.localize(datetime.utcnow()).astimezone(london).date()
+        first_day = today - timedelta(days=days - 1)
+        since = london.localize(datetime.combine(first_day, datetime.min.time()))
+        daily = {first_day + timedelta(days=i): [0, 0] for i in range(days)}
+        for hour, changes, net in topic_activity(
+            db_session, karma_item.id, since.astimezone(utc).replace(tzinfo=None)
+        ):
+            day = utc.localize(hour).astimezone(london).date()
+            if day in daily:
+                daily[day][0] += changes
+                daily[day][1] += net
+
+        busiest = max(changes for changes, _ in daily.values()) or 1
+        result = f'Karma activity for "{karma_item.name}" over the last {days} {pluralise(days, "day")}:\n\n'
+        for day, (changes, net) in daily.items():
+            bar = "▇" * round(ACTIVITY_BAR_LENGTH * changes / busiest)
+            result += f"`{day:%a %d %b}` {bar} {changes} ({net:+})\n"
+        for message in split_into_messages(result):
+            await ctx.send(message)
+
     @karma.command(help="Gives the karma of an item", ignore_extra=True)
     async def score(self, ctx: Context, item: str):
         item = await clean_content().convert(ctx, item)
         karma_item = self.get_karma_item(item)
         if not karma_item:
-            return await ctx.reply(f"\"{item}\" hasn't been karma'd yet. :cry:")
+            return await ctx.reply(self.not_karmad_message(item))
+
+        await ctx.reply(f'"{item}" has a score of {karma_item.score}.')
+
+    async def get_plot(
+        self, karma_items: Dict[str, KarmaModel], xkcd: bool = False
+    ) -> Tuple[BytesIO, str]:
+        """Plots the karma items, rendering in the plot worker unless already cached"""
+        key = plot_key(karma_items, xkcd)
+        png = plot_cache.get(key)
+        if png is None:
+            series = fetch_series(karma_items, db_session)
+            p = await Parallelism.get(self.bot)
+            png = await asyncio.wrap_future(
+                p.worker(PLOT_WORKER, init_plot_worker).submit(
+                    render_plot, series, xkcd
+                )
+            )
+            plot_cache.put(key, png)
+        return BytesIO(png), plot_filename(karma_items.keys())
+
+    def did_you_mean(self, topic: str) -> str:
+        suggestions = topic_index.similar(topic.lstrip("@"), db_session)
+        if not suggestions:
+            return ""
+        return " Did you mean " + " or ".join(f'"{s}"' for s in suggestions) + "?"
 
-        await ctx.reply(f'"{item}" has a score of {karma_item.net_score}.')
+    def not_karmad_message(self, topic: str) -> str:
+        return f"\"{topic}\" hasn't been karma'd yet. :cry:{self.did_you_mean(topic)}"
 
     def get_karma_item(self, item: str):
         karma_stripped = item.lstrip("@")
+        # Karma is written through the async session in the message listener, so
+        # refresh anything this session already holds rather than trust it
         karma_item = (
             db_session.query(KarmaModel)
-            .filter(func.lower(KarmaModel.name) == func.lower(karma_stripped))
+            .populate_existing()
+            .filter(KarmaModel.key == topic_key(karma_stripped))
+            .order_by(KarmaModel.id.asc())
             .first()
         )
         return karma_item
@@ -317,42 +326,17 @@ class Karma(commands.Cog):
 
         # If the item doesn't exist then raise an error
         if not karma_item:
+            raise KarmaError(message=self.not_karmad_message(karma_stripped))
+
+        # Aggregated by the database rather than loading every change
+        stats = KarmaStats.for_karma(karma_item, db_session)
+        if stats is None:
             raise KarmaError(
                 message=f"\"{karma_stripped}\" hasn't been karma'd yet. :cry:"
             )
 
-        # Get the changes and plot the graph
-        img, filename = await plot_karma({karma_stripped: karma_item.changes})
-
-        # Get the user with the most karma
-        # I'd use a group_by sql statement here, but it seems to not terminate
-        all_changes = (
-            db_session.query(KarmaChange)
-            .filter(KarmaChange.karma_id == karma_item.id)
-            .order_by(KarmaChange.created_at.asc())
-            .all()
-        )
-
-        # User is not a hashable type (?) due to dataclass fuckery (???)
-        user_changes: defaultdict[int, list[KarmaChange]] = defaultdict(list)
-        for change in all_changes:
-            user_changes[change.user.id].append(change)
-
-        most_karma = max(user_changes.items(), key=lambda item: len(item[1]))
-        most_karma = (
-            db_session.query(User).filter(User.id == most_karma[0]).one_or_none(),
-            most_karma[1],
-        )
-        assert most_karma[0]
-
-        # Calculate the approval rating of the karma
-        approval = 100 * (
-            (karma_item.pluses - karma_item.minuses)
-            / (karma_item.pluses + karma_item.minuses)
-        )
-        mins_per_karma = (
-            all_changes[-1].local_time - all_changes[0].local_time
-        ).total_seconds() / (60 * len(all_changes))
+        # Plot the graph
+        img, filename = await self.get_plot({karma_stripped: karma_item})
         time_taken = (current_milli_time() - t_start) / 1000
 
         # Construct the embed
@@ -362,22 +346,22 @@ class Karma(commands.Cog):
         )
         embed_colour = Color.from_rgb(61, 83, 255)
         embed_title = f'Statistics for "{karma_stripped}"'
-        embed_description = f'"{karma_stripped}" has a karma of {karma_item.net_score} and has been karma\'d {len(all_changes)} {pluralise(all_changes, "time")} by {len(user_changes.keys())} {pluralise(user_changes.keys(), "user")}.'
+        embed_description = f'"{karma_stripped}" has a karma of {karma_item.net_score} and has been karma\'d {stats.changes} {pluralise(stats.changes, "time")} by {stats.users} {pluralise(stats.users, "user")}.'
 
         embed = Embed(
             title=embed_title, description=embed_description, color=embed_colour
         )
         embed.add_field(
             name="Most karma'd",
-            value=f'"{karma_stripped}" has been karma\'d the most by <@{most_karma[0].user_uid}> with a total of {len(most_karma[1])} {pluralise(most_karma[1], "change")}.',
+            value=f'"{karma_stripped}" has been karma\'d the most by <@{stats.top_user_uid}> with a total of {stats.top_user_changes} {pluralise(stats.top_user_changes, "change")}.',
         )
         embed.add_field(
             name="Approval rating",
-            value=f'The approval rating of "{karma_stripped}" is {approval:.1f}% ({karma_item.pluses} positive to {karma_item.minuses} negative karma and {karma_item.neutrals} neutral karma).',
+            value=f'The approval rating of "{karma_stripped}" is {stats.approval:.1f}% ({stats.pluses} positive to {stats.minuses} negative karma and {stats.neutrals} neutral karma).',
         )
         embed.add_field(
             name="Karma timeline",
-            value=f'"{karma_stripped}" was first karma\'d on {datetime.strftime(all_changes[0].local_time, "%d %b %Y at %H:%M")} and has been karma\'d approximately every {mins_per_karma:.1f} minutes.',
+            value=f'"{karma_stripped}" was first karma\'d on {datetime.strftime(stats.first_change, "%d %b %Y at %H:%M")} and has been karma\'d approximately every {stats.mins_per_change:.1f} minutes.',
         )
         embed.set_footer(
             text=f"Statistics generated at {generated_at} in {time_taken:.3f} seconds."
@@ -414,34 +398,49 @@ class Karma(commands.Cog):
             raise KarmaError(message="I can't")
 
         karma_dict = dict()
+        # The name each topic is plotted under, by ID
+        plotted = dict()
         failed = []
 
         # Iterate over the karma item(s)
         for karma in args:
             karma_stripped = karma.lstrip("@")
-            karma_item = (
-                db_session.query(KarmaModel)
-                .filter(func.lower(KarmaModel.name) == func.lower(karma_stripped))
-                .first()
-            )
+            karma_item = self.get_karma_item(karma_stripped)
 
             # Bucket the karma item(s) based on existence in the database
             if not karma_item:
-                failed.append((karma_stripped, "hasn't been karma'd"))
+                failed.append(
+                    (
+                        karma_stripped,
+                        f"hasn't been karma'd.{self.did_you_mean(karma_stripped)}",
+                    )
+                )
+                continue
+
+            # Check if the topic has been karma'd >=5 times
+            # Each change counts towards one of the totals, so the changes aren't loaded
+            if karma_item.total_karma < 5:
+                failed.append(
+                    (
+                        karma_stripped,
+                        f"must have been karma'd at least 5 times before a plot can be made (currently karma'd {karma_item.total_karma} {pluralise(karma_item.total_karma, 'time')})",
+                    )
+                )
                 continue
 
-            # Check if the topic has been karma'd >=10 times
-            if len(karma_item.changes) < 5:
+            # A topic given twice, perhaps spelt differently, is only plotted once
+            if karma_item.id in plotted:
                 failed.append(
                     (
                         karma_stripped,
-                        f"must have been karma'd at least 5 times before a plot can be made (currently karma'd {len(karma_item.changes)} {pluralise(karma_item.changes, 'time')})",
+                        f'is the same topic as "{plotted[karma_item.id]}", which is only plotted once',
                     )
                 )
                 continue
 
-            # Add the karma changes to the dict
-            karma_dict[karma_stripped] = karma_item.changes
+            # Add the karma item to the dict
+            karma_dict[karma_stripped] = karma_item
+            plotted[karma_item.id] = karma_stripped
 
         if len(karma_dict) == 0:
             if failed:
@@ -453,7 +452,7 @@ class Karma(commands.Cog):
                 return await ctx.send("No items to graph!")
 
         # Plot the graph and save it to a png
-        img, filename = await plot_karma(karma_dict, xkcd)
+        img, filename = await self.get_plot(karma_dict, xkcd)
         t_end = current_milli_time()
 
         # Construct the embed
@@ -462,7 +461,7 @@ class Karma(commands.Cog):
             "%H:%M %d %b %Y",
         )
         time_taken = (t_end - t_start) / 1000
-        total_changes = sum(len(v) for v in karma_dict.values())
+        total_changes = sum(v.total_karma for v in karma_dict.values())
         # Construct the embed strings
         if keys := karma_dict.keys():
             embed_colour = Color.from_rgb(61, 83, 255)
@@ -494,7 +493,7 @@ class Karma(commands.Cog):
 
         emoji = (
             ":chart_with_upwards_trend:"
-            if sum(c.change for cs in karma_dict.values() for c in cs) >= 0
+            if sum(v.score for v in karma_dict.values()) >= 0
             else ":chart_with_downwards_trend:"
         )
         file = File(img, filename=filename)
@@ -518,6 +517,31 @@ class Karma(commands.Cog):
         if hasattr(error, "message"):
             await ctx.send(error.message)
 
+    @score.autocomplete("item")
+    @info.autocomplete("item")
+    async def topic_autocomplete(
+        self, interaction: discord.Interaction, current: str
+    ) -> List[app_commands.Choice[str]]:
+        return [
+            app_commands.Choice(name=name[:100], value=name[:100])
+            for name in topic_index.complete(current, db_session)
+        ]
+
+    @plot.autocomplete("args")
+    @xkcd.autocomplete("args")
+    async def plot_autocomplete(
+        self, interaction: discord.Interaction, current: str
+    ) -> List[app_commands.Choice[str]]:
+        # Only the topic being typed is completed, keeping the ones before it
+        before, _, partial = current.rpartition(" ")
+        choices = []
+        for name in topic_index.complete(partial, db_session):
+            topic = shlex.quote(name) if " " in name else name
+            value = f"{before} {topic}".lstrip()
+            if len(value) <= 100:
+                choices.append(app_commands.Choice(name=value, value=value))
+        return choices
+
     @karma.command(
         help="Lists the reasons (if any) for the specific karma", ignore_extra=True
     )
@@ -526,79 +550,89 @@ class Karma(commands.Cog):
         karma_stripped = karma.lstrip("@")
 
         # Get the karma from the database
-        karma_item = (
-            db_session.query(KarmaModel)
-            .filter(func.lower(KarmaModel.name) == func.lower(karma_stripped))
-            .first()
-        )
-
-        if karma_item:
-            # Set the karma item's name to be the same as in the database
-            karma_stripped = karma_item.name
-            # Local function for getting prefix of karma reason
-            # These are full width unicode characters to ensure that the text remains
-            # aligned when not in a monospace font
-
-            def prefix(change: KarmaChange):
-                if change.change > 0:
-                    return "＋"
-                elif change.change < 0:
-                    return "－"
-                else:
-                    return "＝"
-
-            # Get all the changes that have some reason
-            karma_changes = (
-                db_session.query(KarmaChange)
-                .filter(
-                    KarmaChange.karma_id == karma_item.id,
-                    KarmaChange.reason is not None,
-                )
-                .all()
-            )
-            # Flatten the reasons into a single list and sort it alphabetically
-            reasons = sorted(
-                (
-                    (r, p)
-                    for (r, p) in (
-                        (change.reason, prefix(change)) for change in karma_changes
-                    )
-                    if r is not None
-                ),
-                key=lambda t: t[0].casefold(),
+        karma_item = self.get_karma_item(karma_stripped)
+        if not karma_item:
+            # The item hasn't been karma'd
+            result = self.not_karmad_message(karma_stripped)
+            return await ctx.send(result)
+
+        # Only the first page is loaded, the view fetches the others as they're asked for
+        total = count_reasons(karma_item.id, db_session)
+        if not total:
+            return await ctx.send(
+                "There are no reasons down for that karma topic! :frowning:"
             )
 
-            # If there's at least one reason
-            if reasons:
-                reasons_plural = pluralise(reasons, "reason")
-
-                bullet_points = "\n".join(
-                    f" {prefix} {reason}" for (reason, prefix) in reasons
-                )
-                result = f'The {reasons_plural} for "{karma_stripped}" are as follows:\n\n{bullet_points}'
-            else:
-                result = "There are no reasons down for that karma topic! :frowning:"
-
-            file = None
-            fp = None
-            if len(result) > 2000:
-                # Create a new temporary file that isn't deleted until we say
-                with tempfile.NamedTemporaryFile(delete=False) as fp:
-                    fp.write(result.encode("utf8"))
-
-                # Wait for the file to close before accessing it (Windows NT limitation)
-                file = File(fp.name, filename=f"{karma_stripped}.txt")
-                result = f'There are too many reasons for "{karma_stripped}" to fit in a Discord message!'
-
-            await ctx.send(result, file=file)
-
-            # Delete temporary file (if any) after message is sent
-            if fp:
-                os.remove(fp.name)
+        view = ReasonsView(
+            karma_item, total, get_reasons_page(karma_item.id, db_session)
+        )
+        if view.pages > 1:
+            view.message = await ctx.send(view.content(), view=view)
         else:
-            # The item hasn't been karma'd
-            result = f"\"{karma_stripped}\" hasn't been karma'd yet. :cry:"
-            await ctx.send(result)
+            await ctx.send(view.content())
+
+
+class ReasonsView(discord.ui.View):
+    """Pages through the reasons for a karma topic, with a button to export them all"""
+
+    def __init__(self, karma_item: KarmaModel, total: int, page: List[Reason]):
+        super().__init__(timeout=300)
+        self.karma_id = karma_item.id
+        self.name = karma_item.name
+        self.total = total
+        self.pages = ceil(total / REASONS_PER_PAGE)
+        self.page_number = 1
+        self.page = page
+        self.message: Optional[discord.Message] = None
+        self.update_buttons()
+
+    def content(self) -> str:
+        bullet_points = "\n".join(
+            format_reason(reason, change, MAX_REASON_LENGTH)
+            for reason, change, _ in self.page
+        )
+        result = f'The {pluralise(self.total, "reason")} for "{self.name}" are as follows:\n\n{bullet_points}'
+        if self.pages > 1:
+            result += f"\n\nPage {self.page_number} of {self.pages}"
+        return result
+
+    def update_buttons(self):
+        self.previous.disabled = self.page_number <= 1
+        self.next.disabled = self.page_number >= self.pages
+
+    async def show(self, interaction: discord.Interaction, page: List[Reason]):
+        # The reasons may have changed since the last page, so stay put if it's empty
+        if page:
+            self.page = page
+        self.update_buttons()
+        await interaction.response.edit_message(content=self.content(), view=self)
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary)
+    async def previous(
+        self, interaction: discord.Interaction, button: discord.ui.Button
+    ):
+        page = get_reasons_page(self.karma_id, db_session, before=self.page[0][2])
+        self.page_number = max(self.page_number - 1, 1) if page else self.page_number
+        await self.show(interaction, page)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary)
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
+        page = get_reasons_page(self.karma_id, db_session, after=self.page[-1][2])
+        self.page_number = self.page_number + 1 if page else self.page_number
+        await self.show(interaction, page)
+
+    @discord.ui.button(label="Export", style=discord.ButtonStyle.primary)
+    async def export(self, interaction: discord.Interaction, button: discord.ui.Button):
+        file = File(
+            export_reasons(self.karma_id, db_session), filename=f"{self.name}.txt"
+        )
+        await interaction.response.send_message(file=file)
+
+    async def on_timeout(self):
+        for button in self.children:
+            button.disabled = True
+        if self.message:
+            await self.message.edit(view=self)
 
 
 async def setup(bot: Bot):
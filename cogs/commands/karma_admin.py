@@ -6,9 +6,11 @@ from discord.ext import commands
 from discord.ext.commands import Bot, Context, check
 from sqlalchemy.exc import SQLAlchemyError
 
+from config import CONFIG
 from models import db_session
 from models.channel_settings import IgnoredChannel, MiniKarmaChannel
 from utils import EnumGet, get_database_user, is_compsoc_exec_in_guild
+from utils.channel_settings import channel_settings, channel_settings_refresh
 
 LONG_HELP_TEXT = """
 A set of administrative utility commands to make life easier.
@@ -34,17 +36,20 @@ class MiniKarmaMode(EnumGet, Enum):
 
 def get_mini_karma(c_id):
     # Get whether the channel is on mini karma or not
-    channel = (
-        db_session.query(MiniKarmaChannel)
-        .filter(MiniKarmaChannel.channel == c_id)
-        .one_or_none()
-    )
-    return MiniKarmaMode.Normal if channel is None else MiniKarmaMode.Mini
+    if channel_settings.is_mini_karma(c_id):
+        return MiniKarmaMode.Mini
+    return MiniKarmaMode.Normal
 
 
 class Admin(commands.Cog):
     def __init__(self, bot: Bot):
         self.bot = bot
+        if CONFIG.CHANNEL_SETTINGS_REFRESH_INTERVAL:
+            self.bot.loop.create_task(
+                channel_settings_refresh(
+                    self.bot, CONFIG.CHANNEL_SETTINGS_REFRESH_INTERVAL
+                )
+            )
 
     @commands.hybrid_group(help=LONG_HELP_TEXT, brief=SHORT_HELP_TEXT)
     @check(is_compsoc_exec_in_guild)
@@ -83,6 +88,7 @@ class Admin(commands.Cog):
                 db_session.add(new_ignored_channel)
                 try:
                     db_session.commit()
+                    channel_settings.set_ignored(channel.id, True)
                     await ctx.send(f"Added {channel.mention} to the ignored list.")
                 except SQLAlchemyError as e:
                     db_session.rollback()
@@ -99,6 +105,7 @@ class Admin(commands.Cog):
                 ).delete()
                 try:
                     db_session.commit()
+                    channel_settings.set_ignored(channel.id, False)
                     await ctx.send(f"{channel.mention} is no longer being ignored.")
                 except SQLAlchemyError as e:
                     db_session.rollback()
@@ -146,6 +153,7 @@ class Admin(commands.Cog):
                 db_session.add(new_karma_channel)
                 try:
                     db_session.commit()
+                    channel_settings.set_mini_karma(channel.id, True)
                     await ctx.send(
                         f"Added {channel.mention} to the mini-karma channels"
                     )
@@ -162,6 +170,7 @@ class Admin(commands.Cog):
                 ).delete()
                 try:
                     db_session.commit()
+                    channel_settings.set_mini_karma(channel.id, False)
                     await ctx.send(f"{channel.mention} is now on normal karma mode")
                 except SQLAlchemyError as e:
                     db_session.rollback()
@@ -5,6 +5,7 @@ from discord.ext.commands import Bot, CommandError, Context, check
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy_utils import ScalarListException
 
+from karma.blacklist import karma_blacklist
 from models import db_session
 from models.karma import BlockedKarma
 from utils import get_database_user, is_compsoc_exec_in_guild
@@ -26,6 +27,8 @@ class BlacklistError(CommandError):
 class Blacklist(commands.Cog):
     def __init__(self, bot: Bot):
         self.bot = bot
+        # Keep the blacklist in memory for karma to check against
+        karma_blacklist.load(db_session)
 
     @commands.hybrid_group(help=LONG_HELP_TEXT, brief=SHORT_HELP_TEXT)
     async def blacklist(self, ctx: Context):
@@ -46,6 +49,7 @@ class Blacklist(commands.Cog):
             db_session.add(blacklist)
             try:
                 db_session.commit()
+                karma_blacklist.add(item)
                 await ctx.send(f"Added {item} to the karma blacklist. :pencil:")
             except (ScalarListException, SQLAlchemyError) as e:
                 db_session.rollback()
@@ -73,6 +77,7 @@ class Blacklist(commands.Cog):
             ).delete()
             try:
                 db_session.commit()
+                karma_blacklist.remove(item)
                 await ctx.send(
                     f"{item} has been removed from the karma blacklist. :wastebasket:"
                 )
@@ -1,37 +1,37 @@
-from re import search, sub
+from re import search
 
 from discord import Message
-from discord.abc import GuildChannel
 from discord.ext import commands
-from discord.ext.commands import Bot, Cog
+from discord.ext.commands import Bot
+
+from config import CONFIG
+from utils.link_rewriter import LinkRewrite, LinkRewriter
+from utils.message_dispatch import MessageInfo, message_dispatch
 
 
 class OnMessage(commands.Cog):
     def __init__(self, bot: Bot):
         self.bot = bot
+        self.link_rewriter = LinkRewriter(
+            [LinkRewrite(**rule) for rule in CONFIG.LINK_REWRITES]
+        )
+        # Only replies to the bot can be thanks, and only links need replacing
+        message_dispatch.register(
+            self.on_message,
+            lambda info: info.in_guild
+            and not info.is_command
+            and (info.may_reply_to_bot or "http" in info.content),
+        )
+
+    async def cog_unload(self):
+        message_dispatch.unregister(self.on_message)
 
-    @Cog.listener()
-    async def on_message(self, message: Message):
-        if isinstance(message.channel, GuildChannel):
-            # Get all specified command prefixes for the bot
-            command_prefixes = self.bot.command_prefix(self.bot, message)
-            if not any(
-                message.content.startswith(prefix) for prefix in command_prefixes
-            ):
-                await self.thanks(message)
-                await self.scan_replace(
-                    message, r"https?://(twitter\.com|x\.com)", "https://fxtwitter.com"
-                )
-                await self.scan_replace(
-                    message,
-                    r"https?://(?:old\.|www\.)?reddit\.com",
-                    "https://rxddit.com",
-                )
-                await self.scan_replace(
-                    message, r"https?://www\.instagram\.com", "https://ddinstagram.com"
-                )
+    async def on_message(self, info: MessageInfo):
+        await self.thanks(info)
+        await self.rewrite_links(info.message)
 
-    async def thanks(self, message: Message):
+    async def thanks(self, info: MessageInfo):
+        message = info.message
         # to whoever sees this, you're welcome for the not having a fuck off massive indented if
         if message.author.id == self.bot.user.id:
             # dont thank itself
@@ -40,19 +40,8 @@ class OnMessage(commands.Cog):
         # previous_message = [
         #     message async for message in message.channel.history(limit=2)
         # ][1]
-        if message.reference and message.reference.message_id:
-            # dont thank replies to something that isnt the bot
-            replied_message = await message.channel.fetch_message(
-                message.reference.message_id
-            )
-            if replied_message.author.id != self.bot.user.id:
-                return
-        #elif (
-            #previous_message.author.id != self.bot.user.id
-            # and "apollo" not in message.content.lower()
-        #):
+        if not info.may_reply_to_bot:
             # can only thank replies to bot
-        else:
             return
         thanks = ["thx", "thanks", "thank you", "ty"]
         # only heart if thanks matches word in message
@@ -60,20 +49,19 @@ class OnMessage(commands.Cog):
             search(r"\b" + thank + r"\b", message.content.lower()) for thank in thanks
         ):
             return
+        # dont thank replies to something that isnt the bot
+        replied_message = await info.fetch_reply()
+        if replied_message is None or replied_message.author.id != self.bot.user.id:
+            return
 
         return await message.add_reaction("💜")
 
-    async def scan_replace(self, message: Message, regex, replace):
-        send_message = ""
-        sentance = message.content.replace("\n", " ").split(" ")
-        for word in sentance:
-            # if any word contains a link replace with replace
-            if search(regex, word):
-                send_message += "\n" + sub(regex, replace, word)
+    async def rewrite_links(self, message: Message):
+        rewritten = self.link_rewriter.rewrite(message.content)
         # if there is a message to send, send it
-        if send_message != "":
+        if rewritten:
             await message.edit(suppress=True)
-            await message.reply(send_message)
+            await message.reply("".join("\n" + link for link in rewritten))
 
 
 async def setup(bot: Bot):
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+
+from aiohttp import web
+from discord.ext import commands
+from discord.ext.commands import Bot, Context, check
+
+from config import CONFIG
+from models import OperationStats, query_stats
+from utils import is_compsoc_exec_in_guild
+from utils.loop_watchdog import LoopWatchdog
+from utils.metrics import metrics, serve_metrics
+
+LONG_HELP_TEXT = """
+Shows where Apollo is spending its time, exec only.
+
+`top` lists the commands, listeners and background loops which have taken the most time since startup, with their latency percentiles.
+`db` lists the commands and listeners which have spent the most time in the database since startup, with the statements they run per use.
+`stalls` lists the recent times the event loop was blocked, and what was running, `stall` shows where one was blocked.
+"""
+SHORT_HELP_TEXT = "Performance statistics, exec only."
+
+# The number of operations in a periodic log summary
+LOG_SUMMARY_SIZE = 10
+MAX_PERF_ROWS = 25
+# Space for a stack trace in a message, leaving room for the code block
+MAX_STACK_LENGTH = 1900
+
+
+def format_latency(n: int) -> str:
+    """A table of the n operations which have taken the most time in total"""
+    busiest = sorted(
+        metrics.latency.items(), key=lambda item: item[1].sum, reverse=True
+    )[:n]
+    width = max((len(name) for (_, name), _ in busiest), default=0)
+    lines = [
+        f"{'kind':<8} {'operation':<{width}} {'uses':>6} {'mean ms':>8} {'p50 ms':>8} {'p99 ms':>8}"
+    ]
+    for (kind, name), histogram in busiest:
+        lines.append(
+            f"{kind:<8} {name:<{width}} {histogram.count:>6} "
+            f"{1000 * histogram.mean:>8.1f} {1000 * histogram.quantile(0.5):>8.1f} "
+            f"{1000 * histogram.quantile(0.99):>8.1f}"
+        )
+    return "\n".join(lines)
+
+
+def format_query_stats(stats: dict[str, OperationStats], n: int) -> str:
+    """A table of the n operations which spent longest in the database"""
+    busiest = sorted(stats.items(), key=lambda item: item[1].db_time, reverse=True)
+    width = max((len(name) for name, _ in busiest[:n]), default=0)
+    lines = [
+        f"{'operation':<{width}} {'uses':>6} {'queries':>8} {'db ms':>9} {'q/use':>7} {'ms/use':>8}"
+    ]
+    for name, op in busiest[:n]:
+        lines.append(
+            f"{name:<{width}} {op.invocations:>6} {op.statements:>8} "
+            f"{1000 * op.db_time:>9.1f} {op.statements_per_invocation:>7.1f} "
+            f"{op.ms_per_invocation:>8.2f}"
+        )
+    return "\n".join(lines)
+
+
+async def query_stats_log(bot: Bot):
+    """Periodically logs the operations which spent longest in the database"""
+    await bot.wait_until_ready()
+
+    while not bot.is_closed():
+        await asyncio.sleep(CONFIG.QUERY_STATS_LOG_INTERVAL)
+        recent = query_stats.take_recent()
+        if recent:
+            logging.info(
+                "Database use in the last %ss:\n%s",
+                CONFIG.QUERY_STATS_LOG_INTERVAL,
+                format_query_stats(recent, LOG_SUMMARY_SIZE),
+            )
+
+
+class Perf(commands.Cog):
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        self.metrics_runner: web.AppRunner | None = None
+        self.watchdog: LoopWatchdog | None = None
+        if CONFIG.QUERY_STATS_LOG_INTERVAL:
+            self.bot.loop.create_task(query_stats_log(self.bot))
+
+    async def cog_load(self):
+        if CONFIG.METRICS_PORT:
+            self.metrics_runner = await serve_metrics(CONFIG.METRICS_PORT)
+        if CONFIG.LOOP_LAG_THRESHOLD:
+            self.watchdog = LoopWatchdog(CONFIG.LOOP_LAG_THRESHOLD)
+            self.watchdog.start()
+
+    async def cog_unload(self):
+        if self.metrics_runner is not None:
+            await self.metrics_runner.cleanup()
+        if self.watchdog is not None:
+            self.watchdog.stop()
+
+    @commands.hybrid_group(help=LONG_HELP_TEXT, brief=SHORT_HELP_TEXT)
+    @check(is_compsoc_exec_in_guild)
+    async def perf(self, ctx: Context):
+        if not ctx.invoked_subcommand:
+            await ctx.send("Subcommand not found")
+
+    @perf.command(
+        help="Lists the commands, listeners and loops which have taken longest in total."
+    )
+    @check(is_compsoc_exec_in_guild)
+    async def top(self, ctx: Context, n: int = 10):
+        if not metrics.latency:
+            await ctx.send("Nothing has been timed yet.")
+            return
+        table = format_latency(min(n, MAX_PERF_ROWS))
+        await ctx.send(f"```\n{table}\n```")
+
+    @perf.command(
+        help="Lists the commands and listeners which have spent longest in the database."
+    )
+    @check(is_compsoc_exec_in_guild)
+    async def db(self, ctx: Context, n: int = 10):
+        if not query_stats.totals:
+            await ctx.send("No database statements have been run yet.")
+            return
+        table = format_query_stats(query_stats.totals, min(n, MAX_PERF_ROWS))
+        await ctx.send(f"```\n{table}\n```")
+
+    @perf.command(help="Lists the recent times the event loop was blocked.")
+    @check(is_compsoc_exec_in_guild)
+    async def stalls(self, ctx: Context, n: int = 10):
+        if self.watchdog is None:
+            await ctx.send("The loop watchdog is disabled.")
+            return
+        if not self.watchdog.stalls:
+            await ctx.send("The event loop hasn't been blocked.")
+            return
+        recent = list(enumerate(self.watchdog.stalls))[-min(n, MAX_PERF_ROWS) :]
+        lines = [f"{'#':>3} {'at':<19} {'blocked s':>9} operation"]
+        for i, stall in reversed(recent):
+            lines.append(
+                f"{i:>3} {stall.at:%Y-%m-%d %H:%M:%S} {stall.seconds:>9.2f} {stall.operation}"
+            )
+        table = "\n".join(lines)
+        await ctx.send(f"```\n{table}\n```")
+
+    @perf.command(
+        help="Shows where the event loop was blocked, the latest time or the given number from stalls."
+    )
+    @check(is_compsoc_exec_in_guild)
+    async def stall(self, ctx: Context, i: int = -1):
+        if self.watchdog is None or not self.watchdog.stalls:
+            await ctx.send("No stalls have been recorded.")
+            return
+        try:
+            stall = self.watchdog.stalls[i]
+        except IndexError:
+            await ctx.send("No such stall.")
+            return
+        # The innermost frames are the interesting ones
+        stack = stall.stack[-MAX_STACK_LENGTH:]
+        await ctx.send(
+            f"Blocked for {stall.seconds:.2f}s in {stall.operation}:\n```\n{stack}\n```"
+        )
+
+
+async def setup(bot: Bot):
+    await bot.add_cog(Perf(bot))
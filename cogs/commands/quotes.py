@@ -16,6 +16,7 @@ from sqlalchemy_utils import ScalarListException
 from models import db_session
 from models.quote import Quote, QuoteOptouts
 from utils import (
+    attributed,
     get_database_user,
     get_name_string,
     is_compsoc_exec_in_guild,
@@ -380,6 +381,7 @@ class Quotes(commands.Cog):
         raise error
 
     @Cog.listener()
+    @attributed
     async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
         """Quote on reaction"""
         if payload.emoji.name != QUOTE_EMOJI:
@@ -16,6 +16,7 @@ from config import CONFIG
 from models import db_session
 from models.reminder import Reminder
 from utils import get_database_user, get_name_string, parse_time, user_is_irc_bot
+from utils.metrics import timed_operation
 
 LONG_HELP_TEXT = """
 Add reminders for yourself or remove the last one you added.
@@ -26,30 +27,34 @@ SHORT_HELP_TEXT = """Add or remove reminders."""
 async def reminder_check(bot: Bot):
     await bot.wait_until_ready()
     while not bot.is_closed():
-        now = datetime.now()
-        reminders = (
-            db_session.query(Reminder)
-            .filter(Reminder.trigger_at <= now, Reminder.triggered == False)  # noqa 712
-            .all()
-        )
-        for r in reminders:
-            if r.irc_name:
-                display_name = r.irc_name
-            else:
-                author_uid = r.user.user_uid
-                display_name = f"<@{author_uid}>"
-            channel = bot.get_channel(r.playback_channel_id)
-            message = f"Reminding {display_name}: " + r.reminder_content
-            if not channel:
-                # logging.warning(f"No channel matches: {r}")
-                continue
-            try:
-                await channel.send(message)
-            except discord.DiscordException:
-                # logging.warning(f"No channel access: {r}")
-                pass
-            r.triggered = True
-        db_session.commit()
+        with timed_operation("loop", "reminder_check"):
+            now = datetime.now()
+            reminders = (
+                db_session.query(Reminder)
+                .filter(
+                    Reminder.trigger_at <= now,
+                    Reminder.triggered == False,  # noqa 712
+                )
+                .all()
+            )
+            for r in reminders:
+                if r.irc_name:
+                    display_name = r.irc_name
+                else:
+                    author_uid = r.user.user_uid
+                    display_name = f"<@{author_uid}>"
+                channel = bot.get_channel(r.playback_channel_id)
+                message = f"Reminding {display_name}: " + r.reminder_content
+                if not channel:
+                    # logging.warning(f"No channel matches: {r}")
+                    continue
+                try:
+                    await channel.send(message)
+                except discord.DiscordException:
+                    # logging.warning(f"No channel access: {r}")
+                    pass
+                r.triggered = True
+            db_session.commit()
 
         await asyncio.sleep(CONFIG.REMINDER_SEARCH_INTERVAL)
 
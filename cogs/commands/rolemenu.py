@@ -7,7 +7,7 @@ from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 from models import db_session
 from models.role_menu import RoleEntry, RoleMenu
-from utils import is_compsoc_exec_in_guild, rerun_to_confirm
+from utils import attributed, is_compsoc_exec_in_guild, rerun_to_confirm
 from utils.announce_utils import get_long_msg
 
 
@@ -46,6 +46,7 @@ class RoleMenuCog(commands.Cog):
         self.delete_confirm = {}
 
     @commands.Cog.listener()
+    @attributed
     async def on_ready(self):
         """When the bot starts, recreate all menus' buttons, so interactions will be picked up"""
         await self.bot.wait_until_ready()
@@ -6,6 +6,10 @@ from discord.ext import commands
 from discord.ext.commands import Bot, Context
 
 from config import CONFIG
+from utils.http_client import http_client
+
+# Compiling and running code can take longer than the default timeout
+RUN_TIMEOUT = aiohttp.ClientTimeout(total=300)
 
 
 # pyromaniac data model
@@ -95,34 +99,35 @@ class Run(commands.Cog):
         json_request = {"code": code, "lang": str(language.value), "input": input}
 
         async with ctx.typing():
-            async with aiohttp.ClientSession() as session:
-                run_endpoint = CONFIG.PYROMANIAC_URL + "/api/run"
-                response = await session.post(run_endpoint, json=json_request)
-            if not response.ok:
-                if response.content_type == "application/json":
-                    json_response = await response.json()
-                    await ctx.reply(json_response.get("error"))
-                else:
-                    await ctx.reply(
-                        f"Internal error in pyromaniac:{await response.text()}"
-                    )
-            else:
-                json_response = await response.json()
-                stdout: str = json_response.get("stdout")
-                stderr: str = json_response.get("stderr")
-                match (stdout, stderr):
-                    case ("", ""):
-                        await ctx.reply("**Code executed succesfully, no output**")
-                    case (_, ""):
-                        await ctx.reply(f"**Code Output**: \n ```\n{stdout}\n```")
-                    case ("", _):
+            run_endpoint = CONFIG.PYROMANIAC_URL + "/api/run"
+            async with await http_client.post(
+                run_endpoint, json=json_request, timeout=RUN_TIMEOUT
+            ) as response:
+                if not response.ok:
+                    if response.content_type == "application/json":
+                        json_response = await response.json()
+                        await ctx.reply(json_response.get("error"))
+                    else:
                         await ctx.reply(
-                            f"**Code returned errors:**: \n ```\n{stderr}\n```"
-                        )
-                    case (_, _):
-                        await ctx.reply(
-                            f"**Code returned both output and errors.**\n **Output:**\n{stdout}\n**Errors:**\n{stderr}"
+                            f"Internal error in pyromaniac:{await response.text()}"
                         )
+                else:
+                    json_response = await response.json()
+                    stdout: str = json_response.get("stdout")
+                    stderr: str = json_response.get("stderr")
+                    match (stdout, stderr):
+                        case ("", ""):
+                            await ctx.reply("**Code executed succesfully, no output**")
+                        case (_, ""):
+                            await ctx.reply(f"**Code Output**: \n ```\n{stdout}\n```")
+                        case ("", _):
+                            await ctx.reply(
+                                f"**Code returned errors:**: \n ```\n{stderr}\n```"
+                            )
+                        case (_, _):
+                            await ctx.reply(
+                                f"**Code returned both output and errors.**\n **Output:**\n{stdout}\n**Errors:**\n{stderr}"
+                            )
 
 
 async def setup(bot: Bot):
@@ -16,7 +16,8 @@ from sqlalchemy.exc import SQLAlchemyError
 from config import CONFIG
 from models.models import db_session
 from models.system import EventKind, SystemEvent
-from utils import is_compsoc_exec_in_guild
+from utils import attributed, is_compsoc_exec_in_guild
+from utils.http_client import http_client
 
 APOLLO_ENDPOINT_URL = (
     "https://portainer.uwcs.co.uk/api/endpoints/2/docker/containers/apollo"
@@ -90,16 +91,17 @@ Started {started} (uptime {uptime})"""
     async def restart(self, ctx: Context[Bot]):
         headers = {"X-API-Key": f"{CONFIG.PORTAINER_API_KEY}"}
         db_comitted = True
-        async with aiohttp.ClientSession(headers=headers) as session:
-            event = SystemEvent(EventKind.RESTART, ctx.message.id, ctx.channel.id)
-            try:
-                db_session.add(event)
-                db_session.commit()
-            except (SQLAlchemyError, OperationalError):
-                logging.error("Failed to add event to database")
-                db_comitted = False
-            await ctx.reply("Going down for reboot...")
-            resp = await session.post(f"{APOLLO_ENDPOINT_URL}/restart")
+        event = SystemEvent(EventKind.RESTART, ctx.message.id, ctx.channel.id)
+        try:
+            db_session.add(event)
+            db_session.commit()
+        except (SQLAlchemyError, OperationalError):
+            logging.error("Failed to add event to database")
+            db_comitted = False
+        await ctx.reply("Going down for reboot...")
+        async with await http_client.post(
+            f"{APOLLO_ENDPOINT_URL}/restart", headers=headers
+        ) as resp:
             await self.process_fail(resp, ctx, db_comitted, "restart", event)
 
     @commands.hybrid_command()
@@ -107,27 +109,30 @@ Started {started} (uptime {uptime})"""
     async def update(self, ctx: Context[Bot]):
         headers = {"X-API-Key": f"{CONFIG.PORTAINER_API_KEY}"}
         db_comitted = True
-        async with aiohttp.ClientSession(headers=headers) as session:
-            # Get ID to filter webhook list by
-            info = await session.get(f"{APOLLO_ENDPOINT_URL}/json")
+        # Get ID to filter webhook list by
+        async with await http_client.get(
+            f"{APOLLO_ENDPOINT_URL}/json", headers=headers
+        ) as info:
             id = (await info.json())["Id"]
-            # Get Webhook token
-            webhook_list_url = f'https://portainer.uwcs.co.uk/api/webhooks?filters={{"EndpointID":2,"ResourceID":"{id}"}}'
-            webhook_list = await session.get(webhook_list_url)
+        # Get Webhook token
+        webhook_list_url = f'https://portainer.uwcs.co.uk/api/webhooks?filters={{"EndpointID":2,"ResourceID":"{id}"}}'
+        async with await http_client.get(
+            webhook_list_url, headers=headers
+        ) as webhook_list:
             webhook_token = (await webhook_list.json())[0]["Token"]
-            # Construct URL
-            webhook_url = f"https://portainer.uwcs.co.uk/api/webhooks/{webhook_token}"
-            logging.info(f"Recreate webhook url {webhook_url}")
-
-            event = SystemEvent(EventKind.UPDATE, ctx.message.id, ctx.channel.id)
-            try:
-                db_session.add(event)
-                db_session.commit()
-            except (SQLAlchemyError, OperationalError):
-                logging.error("Failed to add event to database")
-                db_comitted = False
-            await ctx.reply("Going down for update...")
-            resp = await session.post(webhook_url)
+        # Construct URL
+        webhook_url = f"https://portainer.uwcs.co.uk/api/webhooks/{webhook_token}"
+        logging.info(f"Recreate webhook url {webhook_url}")
+
+        event = SystemEvent(EventKind.UPDATE, ctx.message.id, ctx.channel.id)
+        try:
+            db_session.add(event)
+            db_session.commit()
+        except (SQLAlchemyError, OperationalError):
+            logging.error("Failed to add event to database")
+            db_comitted = False
+        await ctx.reply("Going down for update...")
+        async with await http_client.post(webhook_url, headers=headers) as resp:
             await self.process_fail(resp, ctx, db_comitted, "update", event)
 
     async def process_fail(
@@ -156,6 +161,7 @@ Started {started} (uptime {uptime})"""
     # have to do it all through Docker API; fetch config, save it, pull image, start contaienr
 
     @commands.Cog.listener()
+    @attributed
     async def on_ready(self):
         all_events = []
         # check for any unacknowledged events
@@ -200,8 +206,9 @@ Started {started} (uptime {uptime})"""
     @staticmethod
     async def get_docker_json() -> dict[Any, Any] | None:
         headers = {"X-API-Key": f"{CONFIG.PORTAINER_API_KEY}"}
-        async with aiohttp.ClientSession(headers=headers) as session:
-            resp = await session.get(f"{APOLLO_ENDPOINT_URL}/json")
+        async with await http_client.get(
+            f"{APOLLO_ENDPOINT_URL}/json", headers=headers
+        ) as resp:
             if not resp.ok:
                 logging.error("Could not reach Portainer API")
                 return None
@@ -210,9 +217,11 @@ Started {started} (uptime {uptime})"""
 
 async def setup(bot: Bot):
     headers = {"X-API-Key": f"{CONFIG.PORTAINER_API_KEY}"}
-    async with aiohttp.ClientSession(headers=headers) as session:
-        resp = await session.get(f"{APOLLO_ENDPOINT_URL}/json")
-    match (resp.ok, (environ.get("CONTAINER") is not None)):
+    async with await http_client.get(
+        f"{APOLLO_ENDPOINT_URL}/json", headers=headers
+    ) as resp:
+        reachable = resp.ok
+    match (reachable, (environ.get("CONTAINER") is not None)):
         case (True, True):
             await bot.add_cog(System(bot))
         case (True, False):
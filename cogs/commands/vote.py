@@ -5,6 +5,7 @@ from discord.ext.commands import Bot, Context, clean_content
 
 from models import db_session
 from models.votes import DiscordVoteMessage
+from utils import attributed
 from voting.discord_interfaces.discord_base import DiscordBase
 from voting.splitutils import split_args
 
@@ -44,6 +45,7 @@ class Vote(commands.Cog):
         await DiscordBase(self.bot).create_vote(ctx, choices)
 
     @commands.Cog.listener()
+    @attributed
     async def on_ready(self):
         await self.bot.wait_until_ready()
 
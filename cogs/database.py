@@ -1,74 +1,81 @@
 import logging
+from datetime import datetime
 from re import search
 
-from discord import Message
-from discord.abc import GuildChannel
 from discord.ext.commands import Bot, Cog, Context
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy_utils import ScalarListException
 
 from config import CONFIG
+from karma.cooldown import cooldowns
 from karma.karma import process_karma
-from models import db_session
-from models.channel_settings import IgnoredChannel
-from models.user import User
-from utils import get_database_user, is_compsoc_exec_in_guild, user_is_irc_bot
+from models import async_session, db_session, run_sync
+from utils import is_compsoc_exec_in_guild
+from utils.channel_settings import channel_settings
+from utils.message_dispatch import MessageInfo, message_dispatch
+from utils.user_cache import user_cache, user_cache_flush
 
 
 async def not_in_blacklisted_channel(ctx: Context):
-    return (
-        await is_compsoc_exec_in_guild(ctx)
-        or db_session.query(IgnoredChannel)
-        .filter(IgnoredChannel.channel == ctx.channel.id)
-        .first()
-        is None
-    )
+    if not channel_settings.is_ignored(ctx.channel.id):
+        return True
+    return await is_compsoc_exec_in_guild(ctx)
 
 
 class Database(Cog):
     def __init__(self, bot: Bot):
         self.bot = bot
+        channel_settings.load()
+        cooldowns.warm(db_session)
+        self.bot.loop.create_task(user_cache_flush(self.bot))
+        # Every message marks its author as seen, unless they're a bot
+        message_dispatch.register(self.on_message, lambda info: not info.from_bot)
         # Set up a global check that we're not in a blacklisted channel
         self.bot.add_check(not_in_blacklisted_channel)
 
-    @Cog.listener()
-    async def on_message(self, message: Message):
-        # If the message is by a bot that's not irc then ignore it
-        if message.author.bot and not user_is_irc_bot(message):
-            return
+    async def on_message(self, info: MessageInfo):
+        message = info.message
+        # Database work here happens for every message, so it goes through the async
+        # engine (if there's a driver for one) rather than blocking the event loop
+        async with async_session() as session:
+            # Make sure the user exists so it is available now
+            try:
+                user_id = await user_cache.ensure(session, message.author)
+            except (ScalarListException, SQLAlchemyError) as e:
+                await run_sync(session, lambda sync_session: sync_session.rollback())
+                logging.exception(e)
+                # Something very wrong, but not way to reliably recover so abort
+                return
+            # Written to the database with the next flush
+            user_cache.seen(user_id, datetime.utcnow())
 
-        user = get_database_user(message.author)
-        if not user:
-            user = User(user_uid=message.author.id, username=str(message.author))
-            db_session.add(user)
-        else:
-            user.last_seen = message.created_at
-        # Commit the session so the user is available now
-        try:
-            db_session.commit()
-        except (ScalarListException, SQLAlchemyError) as e:
-            db_session.rollback()
-            logging.exception(e)
-            # Something very wrong, but not way to reliably recover so abort
-            return
+            # Only log messages that were in a public channel
+            if not info.in_guild:
+                return
 
-        # Only log messages that were in a public channel
-        if isinstance(message.channel, GuildChannel):
             # KARMA
 
-            # Get all specified command prefixes for the bot
-            command_prefixes = self.bot.command_prefix(self.bot, message)
             # Only process karma if the message was not a command (ie did not start with a command prefix)
-            if not any(
-                message.content.startswith(prefix) for prefix in command_prefixes
-            ):
-                # process karma if apropriate
-                if search(r"\+\+|--|\+\-", message.content):
-                    reply = process_karma(
-                        message, message.id, db_session, CONFIG.KARMA_TIMEOUT
-                    )
-                    if reply:
-                        await message.channel.send(reply)
+            if info.is_command:
+                return
+
+            # process karma if apropriate
+            if not search(r"\+\+|--|\+\-", message.content):
+                return
+            reply = await run_sync(
+                session,
+                lambda sync_session: process_karma(
+                    message, message.id, sync_session, CONFIG.KARMA_TIMEOUT
+                ),
+            )
+
+        if reply:
+            await message.channel.send(reply)
+
+    async def cog_unload(self):
+        message_dispatch.unregister(self.on_message)
+        async with async_session() as session:
+            await user_cache.flush(session)
 
 
 async def setup(bot: Bot):
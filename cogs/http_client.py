@@ -0,0 +1,17 @@
+from discord.ext.commands import Bot, Cog
+
+from utils.http_client import http_client
+
+
+class HttpClient(Cog):
+    """Owns the shared HTTP client, closing its connections when unloaded"""
+
+    def __init__(self, bot: Bot):
+        self.bot = bot
+
+    async def cog_unload(self):
+        await http_client.close()
+
+
+async def setup(bot: Bot):
+    await bot.add_cog(HttpClient(bot))
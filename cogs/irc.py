@@ -1,27 +1,25 @@
-from discord import Message
 from discord.ext.commands import Bot, Cog
 
-from utils.utils import user_is_irc_bot
+from utils.message_dispatch import MessageInfo, message_dispatch
 
 
 class Irc(Cog):
     def __init__(self, bot: Bot):
         self.bot = bot
+        message_dispatch.register(self.on_message, lambda info: info.irc)
 
-    @Cog.listener()
-    async def on_message(self, message: Message):
+    async def cog_unload(self):
+        message_dispatch.unregister(self.on_message)
+
+    async def on_message(self, info: MessageInfo):
         # allow irc users to use commands by altering content to remove the nick before sending for command processing
         # note that clean_content is *not* altered and everything relies on this fact for it to work without having to
         # go back and lookup the message in the db
-        # if message.content.startswith("**<"): # <-- FOR TESTING
-        if user_is_irc_bot(message):
-            # Search for first "> " and strip the message from there (Since irc nicks can't have <, > in them
-            idx = message.content.find(">** ")
-            idx += 4
-            message.content = message.content[idx:]
-
-            ctx = await self.bot.get_context(message)
-            await self.bot.invoke(ctx)
+        message = info.message
+        message.content = info.content
+
+        ctx = await self.bot.get_context(message)
+        await self.bot.invoke(ctx)
 
 
 async def setup(bot: Bot):
@@ -11,6 +11,7 @@ class Parallelism(Cog):
         self.bot = bot
         self._thread_pool = None
         self._process_pool = None
+        self._workers: dict[str, concurrent.futures.ProcessPoolExecutor] = {}
 
     @classmethod
     async def get(cls, bot: Bot) -> Parallelism:
@@ -39,6 +40,19 @@ class Parallelism(Cog):
         self.process_pool.shutdown()
         self._process_pool = None
 
+    def worker(self, name, /, initializer=None):
+        """A dedicated single process worker, started on the first call for `name`.
+        `initializer` runs once when it starts, so expensive setup isn't repeated per task.
+        """
+        if name not in self._workers:
+            worker = concurrent.futures.ProcessPoolExecutor(
+                max_workers=1, initializer=initializer
+            )
+            # Start the process now rather than on the first real task
+            worker.submit(int)
+            self._workers[name] = worker
+        return self._workers[name]
+
     def execute_on_thread(self, func, /, *args, **kwargs):
         return self.thread_pool.submit(func, *args, **kwargs)
 
@@ -60,6 +74,11 @@ class Parallelism(Cog):
             func, int.response.send_message, loop, *args, **kwargs
         )
 
+    async def cog_unload(self):
+        for worker in self._workers.values():
+            worker.shutdown(wait=False, cancel_futures=True)
+        self._workers.clear()
+
 
 async def setup(bot: Bot):
     await bot.add_cog(Parallelism(bot))
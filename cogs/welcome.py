@@ -11,7 +11,7 @@ from sqlalchemy_utils import ScalarListException
 from config import CONFIG
 from models import db_session
 from models.user import User
-from utils import get_database_user
+from utils import attributed, get_database_user
 
 
 class Category:
@@ -50,6 +50,7 @@ class Welcome(Cog):
         )
 
     @Cog.listener()
+    @attributed
     async def on_member_join(self, member: Member):
         """Add the user to our database if they've never joined before"""
         user = get_database_user(member)
@@ -69,6 +70,7 @@ class Welcome(Cog):
             await channel.send(self.generate_welcome_message(member.display_name))
 
     @Cog.listener()
+    @attributed
     async def on_member_update(self, before: Member, after: Member):
         """Send a welcome message to members after they clear the welcome and membership screening screens."""
         if not before.pending or after.pending:
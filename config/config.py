@@ -1,7 +1,25 @@
+from datetime import date
 from pathlib import Path
+from typing import Literal
 
 import yaml
 
+# The links rewritten when the config doesn't give any
+DEFAULT_LINK_REWRITES = [
+    {
+        "pattern": r"https?://(twitter\.com|x\.com)",
+        "replacement": "https://fxtwitter.com",
+    },
+    {
+        "pattern": r"https?://(?:old\.|www\.)?reddit\.com",
+        "replacement": "https://rxddit.com",
+    },
+    {
+        "pattern": r"https?://www\.instagram\.com",
+        "replacement": "https://ddinstagram.com",
+    },
+]
+
 
 class Config:
     def __init__(self, filepath: str):
@@ -35,14 +53,30 @@ class Config:
         self.LOG_LEVEL: str = parsed.get("log_level")
         self.SQL_LOGGING: bool = parsed.get("log_sql")
         self.KARMA_TIMEOUT: int = parsed.get("karma_cooldown")
+        self.KARMA_TERM_START: date | None = parsed.get("karma_term_start")
         self.REMINDER_SEARCH_INTERVAL: int = parsed.get("reminder_search_interval")
         self.CHANNEL_CHECK_INTERVAL: int = parsed.get("channel_check_interval")
+        self.CHANNEL_SETTINGS_REFRESH_INTERVAL: int | None = parsed.get(
+            "channel_settings_refresh_interval"
+        )
+        self.USER_LAST_SEEN_FLUSH_INTERVAL: int = parsed.get(
+            "user_last_seen_flush_interval", 5
+        )
+        self.MESSAGE_CACHE_SIZE: int = parsed.get("message_cache_size", 5000)
+        self.QUERY_STATS_LOG_INTERVAL: int | None = parsed.get(
+            "query_stats_log_interval"
+        )
+        self.METRICS_PORT: int | None = parsed.get("metrics_port")
+        self.LOOP_LAG_THRESHOLD: float | None = parsed.get("loop_lag_threshold")
         self.ANNOUNCEMENT_SEARCH_INTERVAL: int = parsed.get(
             "announcement_search_interval"
         )
         self.ANNOUNCEMENT_IMPERSONATE: int = parsed.get("announcement_impersonate")
-        self.UNICODE_NORMALISATION_FORM: str = "NFKD"
+        self.UNICODE_NORMALISATION_FORM: Literal["NFC", "NFD", "NFKC", "NFKD"] = "NFKD"
         self.PYROMANIAC_URL: str = parsed.get("pyromaniac_url")
+        self.LINK_REWRITES: list[dict[str, str]] = parsed.get(
+            "link_rewrites", DEFAULT_LINK_REWRITES
+        )
 
         # Unused
         self.UWCS_MEMBER_ROLE_ID: int = parsed.get("UWCS_member_role_id")
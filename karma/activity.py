@@ -0,0 +1,76 @@
+import logging
+from datetime import datetime
+from typing import List, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from models.karma import Karma, KarmaActivity
+from models.models import upsert
+
+
+def activity_hour(time: datetime) -> datetime:
+    return time.replace(minute=0, second=0, microsecond=0)
+
+
+def record_activity(db_session: Session, karma_id: int, change: int, at: datetime):
+    """Add a karma change to its topic's activity for the hour, in a single upsert.
+
+    The activity is only a rollup of the changes, so failing to record it is logged
+    rather than undoing the change itself.
+    """
+    try:
+        with db_session.begin_nested():
+            upsert(
+                db_session,
+                KarmaActivity,
+                {
+                    "karma_id": karma_id,
+                    "hour": activity_hour(at),
+                    "changes": 1,
+                    "net": change,
+                },
+                [KarmaActivity.karma_id, KarmaActivity.hour],
+                lambda excluded: {
+                    "changes": KarmaActivity.changes + 1,
+                    "net": KarmaActivity.net + excluded.net,
+                },
+            )
+    except SQLAlchemyError as e:
+        logging.exception(e)
+
+
+def trending_topics(
+    db_session: Session, since: datetime, limit: int
+) -> List[Tuple[str, int, int]]:
+    """The names, number of changes and net change of the most karma'd topics since then"""
+    changes = func.sum(KarmaActivity.changes).label("changes")
+    return [
+        (name, changes, net)
+        for name, changes, net in db_session.query(
+            Karma.name, changes, func.sum(KarmaActivity.net)
+        )
+        .join(Karma, Karma.id == KarmaActivity.karma_id)
+        .filter(KarmaActivity.hour >= activity_hour(since))
+        .group_by(Karma.id, Karma.name)
+        .order_by(changes.desc(), Karma.name.asc())
+        .limit(limit)
+    ]
+
+
+def topic_activity(
+    db_session: Session, karma_id: int, since: datetime
+) -> List[Tuple[datetime, int, int]]:
+    """The hour, number of changes and net change of each active hour for a topic"""
+    return [
+        (hour, changes, net)
+        for hour, changes, net in db_session.query(
+            KarmaActivity.hour, KarmaActivity.changes, KarmaActivity.net
+        )
+        .filter(
+            KarmaActivity.karma_id == karma_id,
+            KarmaActivity.hour >= activity_hour(since),
+        )
+        .order_by(KarmaActivity.hour.asc())
+    ]
@@ -0,0 +1,41 @@
+from typing import Optional, Set
+
+from sqlalchemy.orm import Session
+
+from models.karma import BlockedKarma
+
+
+class KarmaBlacklist:
+    """In-memory copy of the karma blacklist so that checking a topic doesn't query the database.
+
+    The topics are loaded on first use (or explicitly with `load`) and kept up to date
+    by the blacklist commands through `add` and `remove`.
+    """
+
+    def __init__(self):
+        self._topics: Optional[Set[str]] = None
+
+    def load(self, db_session: Session):
+        self._topics = {
+            item.topic.casefold() for item in db_session.query(BlockedKarma).all()
+        }
+
+    def invalidate(self):
+        """Drop the loaded topics, they will be reloaded on next use"""
+        self._topics = None
+
+    def add(self, topic: str):
+        if self._topics is not None:
+            self._topics.add(topic.casefold())
+
+    def remove(self, topic: str):
+        if self._topics is not None:
+            self._topics.discard(topic.casefold())
+
+    def contains(self, topic: str, db_session: Session) -> bool:
+        if self._topics is None:
+            self.load(db_session)
+        return topic.casefold() in self._topics
+
+
+karma_blacklist = KarmaBlacklist()
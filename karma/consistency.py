@@ -0,0 +1,207 @@
+"""Verify the karma counters and running scores against the karma changes, and repair them.
+
+`Karma.pluses/minuses/neutrals/score/last_changed_at` and `KarmaChange.score` are kept up
+to date incrementally as karma is given, so they can drift from the changes they are
+derived from. Topics are checked in chunks and their changes are streamed in order, so
+memory use is bounded however large the tables are.
+
+Run from the repository root with `python -m karma.consistency [--repair]`. The bot keeps
+leaderboards in memory, so restart it after repairing.
+"""
+
+import argparse
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from models import db_session
+from models.karma import Karma, KarmaChange
+
+# Topics checked (and repaired) together, each chunk is committed separately
+CHUNK_SIZE = 1000
+# Changes fetched from the database at a time, and change scores repaired at a time
+BATCH_SIZE = 10000
+
+COUNTERS = ("pluses", "minuses", "neutrals", "score", "last_changed_at")
+
+
+@dataclass
+class TopicTotals:
+    """The counters of a karma topic, as recomputed from its changes"""
+
+    pluses: int = 0
+    minuses: int = 0
+    neutrals: int = 0
+    score: int = 0
+    last_changed_at: Optional[datetime] = None
+
+    def add(self, change: int, created_at: datetime):
+        if change > 0:
+            self.pluses += 1
+        elif change < 0:
+            self.minuses += 1
+        else:
+            self.neutrals += 1
+        self.score += change
+        self.last_changed_at = created_at
+
+
+@dataclass
+class ConsistencyReport:
+    topics: int = 0
+    changes: int = 0
+    drifted_topics: int = 0
+    drifted_changes: int = 0
+    repaired: bool = False
+    # The drifted topics and their differences, since the last progress call
+    drift: List[str] = field(default_factory=list)
+
+    @property
+    def consistent(self) -> bool:
+        return not self.drifted_topics and not self.drifted_changes
+
+
+def _topic_drift(row, totals: TopicTotals) -> Dict[str, object]:
+    """The counters of a topic which differ from those recomputed from its changes"""
+    return {
+        column: getattr(totals, column)
+        for column in COUNTERS
+        if getattr(row, column) != getattr(totals, column)
+    }
+
+
+def _fix_scores(db_session: Session, score_fixes: List[Dict[str, int]], repair: bool):
+    """Write (if repairing) and forget a batch of recomputed change scores"""
+    if repair and score_fixes:
+        db_session.execute(update(KarmaChange), score_fixes)
+    score_fixes.clear()
+
+
+def check_karma(
+    db_session: Session,
+    repair: bool = False,
+    chunk_size: int = CHUNK_SIZE,
+    batch_size: int = BATCH_SIZE,
+    progress: Optional[Callable[[ConsistencyReport], None]] = None,
+) -> ConsistencyReport:
+    """Recompute every topic's counters and running scores from its changes.
+
+    Drift is reported, and also written back in batched updates if `repair` is set.
+    """
+    report = ConsistencyReport(repaired=repair)
+    last_id = 0
+    while True:
+        topics = {
+            row.id: row
+            for row in db_session.execute(
+                select(Karma.id, Karma.name, *(getattr(Karma, c) for c in COUNTERS))
+                .where(Karma.id > last_id)
+                .order_by(Karma.id)
+                .limit(chunk_size)
+            )
+        }
+        if not topics:
+            break
+        first_id, last_id = min(topics), max(topics)
+
+        totals = {karma_id: TopicTotals() for karma_id in topics}
+        score_fixes: List[Dict[str, int]] = []
+        changes = db_session.execute(
+            select(
+                KarmaChange.karma_id,
+                KarmaChange.user_id,
+                KarmaChange.message_id,
+                KarmaChange.change,
+                KarmaChange.score,
+                KarmaChange.created_at,
+            )
+            .where(KarmaChange.karma_id.between(first_id, last_id))
+            .order_by(
+                KarmaChange.karma_id,
+                KarmaChange.created_at,
+                KarmaChange.message_id,
+            )
+            .execution_options(yield_per=batch_size)
+        )
+        for karma_id, user_id, message_id, change, score, created_at in changes:
+            topic_totals = totals.get(karma_id)
+            if topic_totals is None:
+                continue
+            topic_totals.add(change, created_at)
+            report.changes += 1
+            if score != topic_totals.score:
+                report.drifted_changes += 1
+                score_fixes.append(
+                    {
+                        "karma_id": karma_id,
+                        "user_id": user_id,
+                        "message_id": message_id,
+                        "score": topic_totals.score,
+                    }
+                )
+                if len(score_fixes) >= batch_size:
+                    _fix_scores(db_session, score_fixes, repair)
+        _fix_scores(db_session, score_fixes, repair)
+
+        topic_fixes = []
+        for karma_id, row in topics.items():
+            drift = _topic_drift(row, totals[karma_id])
+            if drift:
+                report.drifted_topics += 1
+                report.drift.append(
+                    f'"{row.name}" ({karma_id}): '
+                    + ", ".join(
+                        f"{column} {getattr(row, column)} -> {value}"
+                        for column, value in drift.items()
+                    )
+                )
+                topic_fixes.append({"id": karma_id, **drift})
+        if repair and topic_fixes:
+            db_session.execute(update(Karma), topic_fixes)
+
+        report.topics += len(topics)
+        if repair:
+            db_session.commit()
+        else:
+            # Don't hold a transaction open across the whole table
+            db_session.rollback()
+        if progress is not None:
+            progress(report)
+    return report
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument(
+        "--repair", action="store_true", help="write the recomputed values back"
+    )
+    arg_parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    arg_parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = arg_parser.parse_args()
+
+    def progress(report: ConsistencyReport):
+        for line in report.drift:
+            print(line)
+        report.drift.clear()
+
+    report = check_karma(
+        db_session,
+        repair=args.repair,
+        chunk_size=args.chunk_size,
+        batch_size=args.batch_size,
+        progress=progress,
+    )
+    print(
+        f"Checked {report.topics} topics and {report.changes} changes: "
+        f"{report.drifted_topics} topics and {report.drifted_changes} change scores "
+        + ("repaired" if report.repaired else "drifted")
+    )
+    if not report.consistent and not report.repaired:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from config import CONFIG
+from models.karma import Karma
+
+
+class CooldownTracker:
+    """Last change times of recently karma'd topics, keyed by topic key.
+
+    Entries are dropped once they are older than the timeout, and the oldest are evicted
+    beyond `maxsize` entries. A topic missing from the tracker is not necessarily off
+    cooldown, so callers should fall back to `Karma.last_changed_at`.
+    """
+
+    def __init__(self, timeout: int, maxsize: int = 4096):
+        self.timeout = timeout
+        self.maxsize = maxsize
+        self._last_changed: OrderedDict[str, datetime] = OrderedDict()
+
+    def __len__(self):
+        return len(self._last_changed)
+
+    def warm(self, db_session: Session):
+        """Load the topics changed within the timeout"""
+        since = datetime.utcnow() - timedelta(seconds=self.timeout)
+        recent = (
+            db_session.query(Karma.key, Karma.last_changed_at)
+            .filter(Karma.last_changed_at > since)
+            .order_by(Karma.last_changed_at.asc())
+            .all()
+        )
+        self._last_changed.clear()
+        for key, last_changed_at in recent:
+            self.record(key, last_changed_at)
+
+    def record(self, key: str, changed_at: datetime):
+        self._last_changed[key] = changed_at
+        self._last_changed.move_to_end(key)
+        self._expire()
+
+    def last_changed(self, key: str) -> Optional[datetime]:
+        self._expire()
+        return self._last_changed.get(key)
+
+    def _expire(self):
+        # Entries are kept in order of change time, so expired ones are at the front
+        cutoff = datetime.utcnow() - timedelta(seconds=self.timeout)
+        while self._last_changed:
+            oldest = next(iter(self._last_changed.values()))
+            if oldest > cutoff and len(self._last_changed) <= self.maxsize:
+                break
+            self._last_changed.popitem(last=False)
+
+
+cooldowns = CooldownTracker(CONFIG.KARMA_TIMEOUT)
@@ -1,30 +1,50 @@
 import logging
-import unicodedata
 from datetime import datetime, timedelta
+from typing import Dict, Iterable
 
 from discord import Message
-from sqlalchemy import desc
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from sqlalchemy_utils import ScalarListException
 
-from cogs.commands.karma_admin import MiniKarmaMode
-from config import CONFIG
+from cogs.commands.karma_admin import MiniKarmaMode, get_mini_karma
+from karma.activity import record_activity
+from karma.cooldown import cooldowns
+from karma.leaderboard import leaderboards
 from karma.parser import parse_message_content
+from karma.topic_index import topic_index
 from karma.transaction import (
     KarmaTransaction,
     apply_blacklist,
     filter_transactions,
     make_transactions,
 )
-from models.channel_settings import MiniKarmaChannel
-from models.karma import Karma, KarmaChange
-from utils import filter_out_none, get_database_user, get_name_string
+from models.karma import Karma, KarmaChange, topic_key
+from utils import get_name_string
+from utils.user_cache import user_cache
 
 
-def is_in_cooldown(last_change, timeout):
+def is_in_cooldown(last_changed_at: datetime, timeout: int):
     timeout_time = datetime.utcnow() - timedelta(seconds=timeout)
-    return last_change.created_at > timeout_time
+    return last_changed_at > timeout_time
+
+
+def resolve_topics(topics: Iterable[str], db_session: Session) -> Dict[str, Karma]:
+    """Find the existing karma items for the given topics in a single query.
+
+    The result is keyed by topic key, topics which have not been karma'd are absent.
+    """
+    keys = {topic_key(topic) for topic in topics}
+    if not keys:
+        return {}
+
+    resolved: Dict[str, Karma] = {}
+    # Older items take precedence should two items share a key
+    for karma_item in (
+        db_session.query(Karma).filter(Karma.key.in_(keys)).order_by(Karma.id.asc())
+    ):
+        resolved.setdefault(karma_item.key, karma_item)
+    return resolved
 
 
 def process_karma(message: Message, message_id: int, db_session: Session, timeout: int):
@@ -42,19 +62,8 @@ def process_karma(message: Message, message_id: int, db_session: Session, timeou
 
     # TODO: Protect from byte-limit length chars
 
-    # Get karma-ing user
-    user = get_database_user(message.author)
-
     # Get whether the channel is on mini karma or not
-    channel = (
-        db_session.query(MiniKarmaChannel)
-        .filter(MiniKarmaChannel.channel == message.channel.id)
-        .one_or_none()
-    )
-    if channel is None:
-        karma_mode = MiniKarmaMode.Normal
-    else:
-        karma_mode = MiniKarmaMode.Mini
+    karma_mode = get_mini_karma(message.channel.id)
 
     def own_karma_error(topic):
         if karma_mode == MiniKarmaMode.Normal:
@@ -124,6 +133,23 @@ def process_karma(message: Message, message_id: int, db_session: Session, timeou
 
     items = []
     errors = []
+    # The topic key, name and change time of each change made, and its leaderboard entry
+    applied = []
+
+    def recent_change(transaction: KarmaTransaction):
+        """Get the last change time of a topic if it's known to be on cooldown"""
+        key = topic_key(transaction.karma_item.topic)
+        last_changed_at = cooldowns.last_changed(key)
+        if last_changed_at is not None and is_in_cooldown(last_changed_at, timeout):
+            return last_changed_at
+        return None
+
+    # Look up every topic not known to be on cooldown at once
+    pending = [t for t in transactions if recent_change(t) is None]
+    karma_items = resolve_topics((t.karma_item.topic for t in pending), db_session)
+
+    # Get karma-ing user
+    user_id = user_cache.lookup(message.author.id, db_session) if pending else None
 
     # Iterate over the transactions to write them to the database
     for transaction in transactions:
@@ -139,134 +165,98 @@ def process_karma(message: Message, message_id: int, db_session: Session, timeou
             errors.append(own_karma_error(truncated_name))
             continue
 
-        def topic_transformations():
-            def query(t):
-                return db_session.query(Karma).filter(Karma.name.ilike(t)).one_or_none()
-
-            topic = transaction.karma_item.topic.casefold()
-            yield query(topic)
-            if len(topic) <= 1:
-                return
-            yield query(topic.replace(" ", "_"))
-            yield query(topic.replace("_", " "))
-            topic = unicodedata.normalize(CONFIG.UNICODE_NORMALISATION_FORM, topic)
-            yield query(topic)
-            yield query(topic.replace(" ", "_"))
-            yield query(topic.replace("_", " "))
-            topic = "".join(c for c in topic if not unicodedata.combining(c))
-            yield query(topic)
-            yield query(topic.replace(" ", "_"))
-            yield query(topic.replace("_", " "))
+        # Reject topics known to be on cooldown without going to the database
+        if (last_changed_at := recent_change(transaction)) is not None:
+            time_delta = datetime.utcnow() - last_changed_at
+            errors.append(cooldown_error(truncated_name, time_delta))
+            continue
 
         # Get the karma item from the database if it exists
-        karma_item = next(filter_out_none(topic_transformations()), None)
-
-        # Update or create the karma item
-        if not karma_item:
-            karma_item = Karma(name=transaction.karma_item.topic)
-            db_session.add(karma_item)
-            try:
-                db_session.commit()
-            except (ScalarListException, SQLAlchemyError) as e:
-                db_session.rollback()
-                logging.exception(e)
-                errors.append(internal_error(truncated_name))
-                continue
-
-        # Get the last change (or none if there was none)
-        last_change = (
-            db_session.query(KarmaChange)
-            .filter(KarmaChange.karma_id == karma_item.id)
-            .order_by(desc(KarmaChange.created_at))
-            .first()
-        )
+        key = topic_key(transaction.karma_item.topic)
+        karma_item = karma_items.get(key)
 
-        if not last_change:
-            # If the bot is being downvoted then the karma can only go up
-            if transaction.karma_item.topic.casefold() == "apollo":
-                new_score = abs(transaction.karma_item.operation.value)
-            else:
-                new_score = transaction.karma_item.operation.value
-
-            karma_change = KarmaChange(
-                karma_id=karma_item.id,
-                user_id=user.id,
-                message_id=message_id,
-                reason=transaction.karma_item.reason,
-                change=new_score,
-                score=new_score,
-                created_at=datetime.utcnow(),
-            )
-            db_session.add(karma_change)
-            try:
-                db_session.commit()
-            except (ScalarListException, SQLAlchemyError) as e:
-                db_session.rollback()
-                logging.exception(e)
-                errors.append(internal_error(truncated_name))
-                continue
+        # Check the cooldown against the item's last change (if it has one)
+        if (
+            karma_item is not None
+            and karma_item.last_changed_at is not None
+            and is_in_cooldown(karma_item.last_changed_at, timeout)
+        ):
+            time_delta = datetime.utcnow() - karma_item.last_changed_at
+            errors.append(cooldown_error(truncated_name, time_delta))
+            continue
+
+        # If the bot is being downvoted then the karma can only go up
+        if transaction.karma_item.topic.casefold() == "apollo":
+            change = abs(transaction.karma_item.operation.value)
         else:
-            time_delta = datetime.utcnow() - last_change.created_at
-            if is_in_cooldown(last_change, timeout):
-                errors.append(cooldown_error(truncated_name, time_delta))
-                continue
-
-            # If the bot is being downvoted then the karma can only go up
-            if transaction.karma_item.topic.casefold() == "apollo":
-                new_score = last_change.score + abs(
-                    transaction.karma_item.operation.value
-                )
-            else:
-                new_score = last_change.score + transaction.karma_item.operation.value
-
-            karma_change = KarmaChange(
-                karma_id=karma_item.id,
-                user_id=user.id,
-                message_id=message_id,
-                reason=transaction.karma_item.reason,
-                score=new_score,
-                change=(new_score - last_change.score),
-                created_at=datetime.utcnow(),
-            )
-            db_session.add(karma_change)
-            try:
-                db_session.commit()
-            except (ScalarListException, SQLAlchemyError) as e:
-                db_session.rollback()
-                logging.exception(e)
-                errors.append(internal_error(truncated_name))
+            change = transaction.karma_item.operation.value
+
+        # Each topic gets its own savepoint so that one failing doesn't undo the others
+        try:
+            with db_session.begin_nested():
+                # Create the karma item if needed
+                if karma_item is None:
+                    karma_item = Karma(name=transaction.karma_item.topic)
+                    db_session.add(karma_item)
+                    db_session.flush()
+
                 karma_change = KarmaChange(
                     karma_id=karma_item.id,
-                    user_id=user.id,
+                    user_id=user_id,
                     message_id=message_id,
                     reason=transaction.karma_item.reason,
-                    score=new_score,
-                    change=(new_score - last_change.score),
+                    score=karma_item.score + change,
+                    change=change,
                     created_at=datetime.utcnow(),
                 )
                 db_session.add(karma_change)
-                try:
-                    db_session.commit()
-                except (ScalarListException, SQLAlchemyError) as e:
-                    db_session.rollback()
-                    logging.exception(e)
-                    errors.append(internal_error(truncated_name))
-                    continue
-
-        # Update karma counts
-        if transaction.karma_item.operation.value == 0:
-            karma_item.neutrals = karma_item.neutrals + 1
-        elif transaction.karma_item.operation.value == 1:
-            karma_item.pluses = karma_item.pluses + 1
-        elif transaction.karma_item.operation.value == -1:
-            # Make sure the changed operation is updated
-            if transaction.karma_item.topic.casefold() == "apollo":
-                karma_item.pluses = karma_item.pluses + 1
-            else:
-                karma_item.minuses = karma_item.minuses + 1
+                record_activity(
+                    db_session, karma_item.id, change, karma_change.created_at
+                )
 
+                # Update the karma item alongside its change
+                karma_item.score = karma_change.score
+                karma_item.last_changed_at = karma_change.created_at
+                if transaction.karma_item.operation.value == 0:
+                    karma_item.neutrals = karma_item.neutrals + 1
+                elif change > 0:
+                    karma_item.pluses = karma_item.pluses + 1
+                else:
+                    karma_item.minuses = karma_item.minuses + 1
+        except (ScalarListException, SQLAlchemyError) as e:
+            logging.exception(e)
+            errors.append(internal_error(truncated_name))
+            continue
+
+        karma_items[key] = karma_item
+        leaderboard_entry = (
+            karma_item.id,
+            karma_item.name,
+            karma_item.score,
+            karma_item.total_karma,
+            change,
+            karma_change.created_at,
+        )
+        applied.append(
+            (key, truncated_name, karma_change.created_at, leaderboard_entry)
+        )
         items.append(success_item(transaction))
 
+    # Commit every change in the message at once
+    try:
+        db_session.commit()
+    except (ScalarListException, SQLAlchemyError) as e:
+        logging.exception(e)
+        db_session.rollback()
+        items = []
+        errors += [internal_error(name) for _, name, _, _ in applied]
+    else:
+        for key, _, changed_at, leaderboard_entry in applied:
+            cooldowns.record(key, changed_at)
+            leaderboards.record(*leaderboard_entry)
+            # New topics can be suggested from now on
+            topic_index.add(leaderboard_entry[1])
+
     # Get the name, either from discord or irc
     author_display = get_name_string(message)
 
@@ -288,10 +278,4 @@ def process_karma(message: Message, message_id: int, db_session: Session, timeou
         error_str = " ".join(errors)
         reply = " ".join(filter(None, ["Changes:", item_str, error_str]))
 
-    # Commit any changes (in case of any DB inconsistencies)
-    try:
-        db_session.commit()
-    except (ScalarListException, SQLAlchemyError) as e:
-        logging.exception(e)
-        db_session.rollback()
     return reply.rstrip()
@@ -0,0 +1,237 @@
+from bisect import bisect_left, insort
+from collections import deque
+from datetime import datetime, time, timedelta
+from enum import Enum
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from pytz import timezone, utc
+from sqlalchemy.orm import Session
+
+from config import CONFIG
+from models.karma import Karma, KarmaChange
+from utils import EnumGet
+
+LONDON = timezone("Europe/London")
+# Used for the term window when no term start date is configured
+TERM_LENGTH = timedelta(weeks=10)
+# The most changes kept for each window
+MAX_WINDOW_CHANGES = 100_000
+
+
+class Window(EnumGet, Enum):
+    """The time a leaderboard covers"""
+
+    Today = 0
+    Week = 1
+    Term = 2
+
+
+def window_start(window: Window, now: datetime) -> datetime:
+    """The start of the window containing `now`, both as naive UTC datetimes"""
+    local_now = utc.localize(now).astimezone(LONDON)
+    if window == Window.Today:
+        start_day = local_now.date()
+    elif window == Window.Week:
+        start_day = local_now.date() - timedelta(days=local_now.weekday())
+    elif CONFIG.KARMA_TERM_START is not None:
+        start_day = CONFIG.KARMA_TERM_START
+    else:
+        return now - TERM_LENGTH
+    start = LONDON.localize(datetime.combine(start_day, time()))
+    return start.astimezone(utc).replace(tzinfo=None)
+
+
+class Ranking:
+    """Karma items kept in order of a sort key, so the first N are a slice"""
+
+    def __init__(self, sort_key: Callable[[int, str, int, int], tuple]):
+        self.sort_key = sort_key
+        self._sorted: List[tuple] = []
+        self._keys: Dict[int, tuple] = {}
+
+    def rebuild(self, items: Dict[int, Tuple[str, int, int]]):
+        self._keys = {id_: self.sort_key(id_, *item) for id_, item in items.items()}
+        self._sorted = sorted(self._keys.values())
+
+    def update(self, karma_id: int, name: str, score: int, total: int):
+        old_key = self._keys.get(karma_id)
+        if old_key is not None:
+            del self._sorted[bisect_left(self._sorted, old_key)]
+        key = self.sort_key(karma_id, name, score, total)
+        insort(self._sorted, key)
+        self._keys[karma_id] = key
+
+    def remove(self, karma_id: int):
+        key = self._keys.pop(karma_id, None)
+        if key is not None:
+            del self._sorted[bisect_left(self._sorted, key)]
+
+    def first(self, n: int) -> List[int]:
+        return [key[-1] for key in self._sorted[:n]]
+
+
+def _rankings() -> Dict[str, Ranking]:
+    """Rankings for the top and bottom scores and most total karma"""
+    return {
+        "top": Ranking(lambda id_, name, score, total: (-score, name, id_)),
+        "bottom": Ranking(lambda id_, name, score, total: (score, name, id_)),
+        "most": Ranking(lambda id_, name, score, total: (-total, name, id_)),
+    }
+
+
+class WindowTotals:
+    """The net change and number of changes of each item karma'd within a window.
+
+    The totals are kept up to date as changes are added and expire out of the window,
+    along with rankings on them, so a windowed leaderboard is a slice like an all-time
+    one. At most MAX_WINDOW_CHANGES changes are kept, the window starting at the oldest
+    of them beyond that.
+    """
+
+    def __init__(self):
+        self.start = datetime.min
+        self.totals: Dict[int, Tuple[int, int]] = {}
+        self.rankings = _rankings()
+        self._changes: Deque[Tuple[datetime, int, str, int]] = deque()
+
+    def _set(self, karma_id: int, name: str, net: int, count: int):
+        if count:
+            self.totals[karma_id] = (net, count)
+            for ranking in self.rankings.values():
+                ranking.update(karma_id, name, net, count)
+        else:
+            del self.totals[karma_id]
+            for ranking in self.rankings.values():
+                ranking.remove(karma_id)
+
+    def add(self, changed_at: datetime, karma_id: int, name: str, change: int):
+        if changed_at < self.start:
+            return
+        self._changes.append((changed_at, karma_id, name, change))
+        net, count = self.totals.get(karma_id, (0, 0))
+        self._set(karma_id, name, net + change, count + 1)
+        if len(self._changes) > MAX_WINDOW_CHANGES:
+            self._drop_oldest()
+
+    def expire(self, start: datetime):
+        """Move the window's start, dropping the changes made before it"""
+        self.start = start
+        while self._changes and self._changes[0][0] < start:
+            self._drop_oldest()
+
+    def _drop_oldest(self):
+        _, karma_id, name, change = self._changes.popleft()
+        net, count = self.totals[karma_id]
+        self._set(karma_id, name, net - change, count - 1)
+
+
+class Leaderboards:
+    """In-memory karma leaderboards, so showing one doesn't sort the karma table.
+
+    All-time rankings by score and by total karma are kept sorted, and updated by
+    `record` after each committed change. Each window keeps running totals of the
+    changes made within it, ranked the same way (see `WindowTotals`). Everything is
+    loaded on first use (or explicitly with `load`).
+    """
+
+    def __init__(self):
+        self._reset()
+        self._loaded = False
+
+    def _reset(self):
+        self._items: Dict[int, Tuple[str, int, int]] = {}
+        self._rankings = _rankings()
+        self._windows = {window: WindowTotals() for window in Window}
+
+    def load(self, db_session: Session):
+        self._reset()
+        items = db_session.query(
+            Karma.id,
+            Karma.name,
+            Karma.score,
+            Karma.pluses + Karma.minuses + Karma.neutrals,
+        )
+        self._items = {
+            karma_id: (name, score, total) for karma_id, name, score, total in items
+        }
+        for ranking in self._rankings.values():
+            ranking.rebuild(self._items)
+
+        now = datetime.utcnow()
+        for window, totals in self._windows.items():
+            totals.start = window_start(window, now)
+        since = min(totals.start for totals in self._windows.values())
+        # Only the latest changes are kept, see WindowTotals
+        changes = (
+            db_session.query(
+                KarmaChange.created_at, KarmaChange.karma_id, KarmaChange.change
+            )
+            .filter(KarmaChange.created_at >= since)
+            .order_by(KarmaChange.created_at.desc())
+            .limit(MAX_WINDOW_CHANGES)
+            .all()
+        )
+        for changed_at, karma_id, change in reversed(changes):
+            if karma_id in self._items:
+                for totals in self._windows.values():
+                    totals.add(changed_at, karma_id, self._items[karma_id][0], change)
+        self._loaded = True
+
+    def _ensure_loaded(self, db_session: Session):
+        if not self._loaded:
+            self.load(db_session)
+
+    def record(
+        self,
+        karma_id: int,
+        name: str,
+        score: int,
+        total: int,
+        change: int,
+        changed_at: datetime,
+    ):
+        """Update the leaderboards with a committed karma change"""
+        if not self._loaded:
+            return
+        self._items[karma_id] = (name, score, total)
+        for ranking in self._rankings.values():
+            ranking.update(karma_id, name, score, total)
+        for totals in self._windows.values():
+            totals.add(changed_at, karma_id, name, change)
+
+    def top(
+        self, n: int, db_session: Session, window: Optional[Window] = None
+    ) -> List[Tuple[str, int]]:
+        """The names and scores (or net change within the window) of the n highest"""
+        self._ensure_loaded(db_session)
+        return self._leaderboard("top", n, window, 1)
+
+    def bottom(
+        self, n: int, db_session: Session, window: Optional[Window] = None
+    ) -> List[Tuple[str, int]]:
+        """The names and scores (or net change within the window) of the n lowest"""
+        self._ensure_loaded(db_session)
+        return self._leaderboard("bottom", n, window, 1)
+
+    def most(
+        self, n: int, db_session: Session, window: Optional[Window] = None
+    ) -> List[Tuple[str, int]]:
+        """The names and total karma (or changes within the window) of the n most karma'd"""
+        self._ensure_loaded(db_session)
+        return self._leaderboard("most", n, window, 2)
+
+    def _leaderboard(
+        self, ranking: str, n: int, window: Optional[Window], value: int
+    ) -> List[Tuple[str, int]]:
+        if window is None:
+            ids = self._rankings[ranking].first(n)
+            return [(self._items[id_][0], self._items[id_][value]) for id_ in ids]
+
+        # Windowed values are the net change (for score) and count (for total karma)
+        totals = self._windows[window]
+        totals.expire(window_start(window, datetime.utcnow()))
+        ids = totals.rankings[ranking].first(n)
+        return [(self._items[id_][0], totals.totals[id_][value - 1]) for id_ in ids]
+
+
+leaderboards = Leaderboards()
@@ -3,11 +3,6 @@ from dataclasses import dataclass
 from enum import Enum
 from typing import List, Optional
 
-from parsita import TextParsers, opt, reg, rep
-from parsita.util import constant
-
-from utils.utils import filter_out_none
-
 
 class KarmaOperation(Enum):
     POSITIVE = 1
@@ -31,18 +26,6 @@ class KarmaItem:
     bypass: bool = False
 
 
-def make_karma(el: list):
-    """Contents of el:
-    First element contains topic and whether it is a bypass or not
-    Second element contains karma operation
-    Third element contains a list of zero or one elements with the reason in it
-    """
-    # TODO: add structural pattern matching when 3.10 is usable
-    return KarmaItem(
-        topic=el[0][0], operation=el[1], reason=next(iter(el[2]), None), bypass=el[0][1]
-    )
-
-
 def make_op_regex(o):
     non_op_pre = r"(?<![+-])"
     non_op_post = r"(?![+-])"
@@ -50,36 +33,63 @@ def make_op_regex(o):
     return rf"{non_op_pre}{o}{non_op_post}{allowed_post}"
 
 
-class KarmaParser(TextParsers):
-    anything = reg(r".") > constant(None)
+def make_quoted_regex(name):
+    # Quotes may contain escaped quotes, but not end with an escaped backslash
+    return rf'"(?P<{name}>.*?(?<!\\)(?:\\\\)*?)"'
 
-    word_topic = reg(r'[^"\s]+?(?=[+-]{2})')
-    string_topic = reg(r'".*?(?<!\\)(\\\\)*?"(?=[+-]{2})')
-    topic = (word_topic > (lambda t: [t, False])) | (
-        string_topic > (lambda t: [t[1:-1], True])
-    )
 
-    op_positive = reg(make_op_regex(r"\+\+")) > constant(KarmaOperation.POSITIVE)
-    op_neutral = (reg(make_op_regex(r"\+-")) | reg(make_op_regex(r"-\+"))) > constant(
-        KarmaOperation.NEUTRAL
-    )
-    op_negative = reg(make_op_regex(r"--")) > constant(KarmaOperation.NEGATIVE)
-    operator = op_positive | op_neutral | op_negative
+# Consumes all whitespace, the lookahead stops the regex engine from backtracking into it
+WHITESPACE = r"\s*(?!\s)"
 
-    bracket_reason = reg(r"\(.+?\)") > (lambda s: s[1:-1])
-    quote_reason = reg(r'".*?(?<!\\)(\\\\)*?"(?![+-]{2})') > (lambda s: s[1:-1])
-    reason_words = reg(r"(?i)because") | reg(r"(?i)for")
-    text_reason = reason_words >> (reg(r'[^",]+') | quote_reason)
-    reason = bracket_reason | quote_reason | text_reason
+# The topic is matched inside a lookahead and then consumed with a backreference.
+# This makes it atomic: a topic that is not followed by a valid operator is never
+# extended to find one further along.
+WORD_TOPIC = r'(?P<word_topic>[^"\s]+?)(?=[+-]{2})'
+STRING_TOPIC = rf"{make_quoted_regex('string_topic')}(?=[+-]{{2}})"
+TOPIC = rf"(?=(?P<topic>{WORD_TOPIC}|{STRING_TOPIC}))(?P=topic)"
 
-    karma = (topic & operator & opt(reason)) > make_karma
+OPERATORS = {
+    "++": KarmaOperation.POSITIVE,
+    "+-": KarmaOperation.NEUTRAL,
+    "-+": KarmaOperation.NEUTRAL,
+    "--": KarmaOperation.NEGATIVE,
+}
+OPERATOR = "(?P<op>{})".format("|".join(make_op_regex(re.escape(o)) for o in OPERATORS))
 
-    parse_all = rep(karma | anything) > filter_out_none
+BRACKET_REASON = r"\((?P<bracket_reason>.+?)\)"
+QUOTE_REASON = rf"{make_quoted_regex('quote_reason')}(?![+-]{{2}})"
+TEXT_REASON = (
+    rf"(?i:because|for){WHITESPACE}"
+    rf"(?:(?P<text_reason>[^\",]+)|{make_quoted_regex('text_quote_reason')}(?![+-]{{2}}))"
+)
+REASON = rf"(?:{BRACKET_REASON}|{QUOTE_REASON}|{TEXT_REASON})"
+
+KARMA = re.compile(rf"{TOPIC}{OPERATOR}{WHITESPACE}{REASON}?")
+REASON_GROUPS = ("bracket_reason", "quote_reason", "text_reason", "text_quote_reason")
+
+
+def make_karma(match: re.Match) -> KarmaItem:
+    bypass = match.group("word_topic") is None
+    topic = match.group("string_topic") if bypass else match.group("word_topic")
+    reason = next(
+        (match.group(g) for g in REASON_GROUPS if match.group(g) is not None), None
+    )
+    return KarmaItem(
+        topic=topic,
+        operation=OPERATORS[match.group("op")],
+        reason=reason,
+        bypass=bypass,
+    )
 
 
 def parse_message_content(content: str) -> List[KarmaItem]:
+    """Find the karma items in a message in a single pass over its content.
+
+    Code blocks are removed first. Scanning resumes after each karma item (and its
+    reason, if any), so karma inside a reason is not counted.
+    """
     cleaned = re.sub(r"```.*?```", " ", content, flags=re.DOTALL)
     cleaned = re.sub(r"`.*?`", " ", cleaned, flags=re.DOTALL)
     if cleaned == "" or cleaned.isspace():
         return []
-    return list(KarmaParser.parse_all.parse(cleaned).or_die())
+    return [make_karma(match) for match in KARMA.finditer(cleaned)]
@@ -0,0 +1,244 @@
+from collections import OrderedDict
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib import font_manager, rc_context
+from matplotlib.dates import (
+    DateFormatter,
+    DayLocator,
+    HourLocator,
+    MinuteLocator,
+    MonthLocator,
+    WeekdayLocator,
+    YearLocator,
+    date2num,
+)
+from sqlalchemy.orm import Session
+
+from models.karma import Karma, KarmaChange
+
+matplotlib.use("Agg")
+
+# Name of the Parallelism worker process plots are rendered in
+PLOT_WORKER = "karma_plot"
+PLOT_DPI = 160
+LOCAL_TIMEZONE = ZoneInfo("Europe/London")
+PLOT_SIZE = (8, 6)
+# There's no use plotting more points than the plot is pixels wide
+MAX_PLOT_POINTS = PLOT_SIZE[0] * PLOT_DPI
+
+# Plot data for each topic: the local times of its changes (as naive datetime64s)
+# and the score after each
+KarmaSeries = Dict[str, Tuple[np.ndarray, np.ndarray]]
+
+
+def to_local_time(times: np.ndarray) -> np.ndarray:
+    """Converts naive UTC datetime64s to naive Europe/London times"""
+    # The offset only changes on the hour (in UTC), so it is looked up once per hour
+    hours, hour_indexes = np.unique(times.astype("datetime64[h]"), return_inverse=True)
+    offsets = np.array(
+        [
+            hour.replace(tzinfo=timezone.utc).astimezone(LOCAL_TIMEZONE).utcoffset()
+            for hour in hours.astype(datetime)
+        ],
+        dtype="timedelta64[us]",
+    )
+    return times + offsets[hour_indexes]
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indexes of the points kept when downsampling with Largest-Triangle-Three-Buckets.
+    The first and last points are always kept, and from each bucket between the point
+    making the largest triangle with the previous kept point and the next bucket's mean.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x, y = x.astype(float), y.astype(float)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    kept = np.empty(threshold, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        mean_x = x[next_start:next_end].mean()
+        mean_y = y[next_start:next_end].mean()
+        a = kept[i]
+        areas = np.abs(
+            (x[a] - mean_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (mean_y - y[a])
+        )
+        kept[i + 1] = start + int(areas.argmax())
+    return kept
+
+
+def fetch_series(
+    karma_items: Dict[str, Karma],
+    db_session: Session,
+    max_points: int = MAX_PLOT_POINTS,
+) -> KarmaSeries:
+    """Gets the plot data of each karma item in one query, downsampled to `max_points`"""
+    # Different names for the same topic each get its series
+    names: Dict[int, List[str]] = {}
+    for name, item in karma_items.items():
+        names.setdefault(item.id, []).append(name)
+    rows = (
+        db_session.query(
+            KarmaChange.karma_id, KarmaChange.created_at, KarmaChange.score
+        )
+        .filter(KarmaChange.karma_id.in_(names))
+        .order_by(KarmaChange.karma_id, KarmaChange.created_at)
+        .all()
+    )
+    if not rows:
+        return {}
+    karma_ids, times, scores = (np.array(column) for column in zip(*rows))
+    times = to_local_time(times.astype("datetime64[us]"))
+
+    series: KarmaSeries = {}
+    starts = np.flatnonzero(np.r_[True, karma_ids[1:] != karma_ids[:-1]])
+    for start, end in zip(starts, np.r_[starts[1:], len(karma_ids)]):
+        item_times, item_scores = times[start:end], scores[start:end]
+        kept = lttb(item_times.astype(np.int64), item_scores, max_points)
+        for name in names[karma_ids[start]]:
+            series[name] = (item_times[kept], item_scores[kept])
+    # Keep the order the topics were asked for
+    return {name: series[name] for name in karma_items if name in series}
+
+
+def init_plot_worker():
+    """Loads the backend and Humor Sans font once for the worker process"""
+    matplotlib.use("Agg")
+    font_manager.fontManager.addfont(str(Path("resources", "Humor-Sans.ttf")))
+
+
+def render_plot(series: KarmaSeries, xkcd: bool = False) -> bytes:
+    """Renders the karma of each topic over time to a PNG.
+    This is slow for topics with many changes, so it is run in the plot worker.
+    """
+    xkcd_context = plt.xkcd if xkcd else nullcontext
+    line_width = plt.rcParams["grid.linewidth"]
+
+    # xkcd context sets grid.linewidth to 0 which causes an error with ax.grid.
+    # Setting it back to the initial line width fixes this.
+    with xkcd_context(), rc_context(
+        {"grid.linewidth": line_width, "figure.autolayout": True}
+    ):
+        fig, ax = plt.subplots(figsize=PLOT_SIZE)
+
+    # Get the earliest and latest karma values
+    earliest_karma = min(times[0] for times, _ in series.values())
+    latest_karma = max(times[-1] for times, _ in series.values())
+    karma_timeline = (latest_karma - earliest_karma).item()
+
+    # Determine the right graph tick positioning
+    if karma_timeline <= timedelta(hours=1):
+        date_format = DateFormatter("%H:%M %d %b %Y")
+        date_locator_major = MinuteLocator(interval=15)
+        date_locator_minor = MinuteLocator()
+    elif karma_timeline <= timedelta(hours=6):
+        date_format = DateFormatter("%H:%M %d %b %Y")
+        date_locator_major = HourLocator()
+        date_locator_minor = MinuteLocator(interval=15)
+    elif karma_timeline <= timedelta(days=14):
+        date_format = DateFormatter("%d %b %Y")
+        date_locator_major = DayLocator()
+        date_locator_minor = HourLocator(interval=6)
+    elif karma_timeline <= timedelta(days=30):
+        date_format = DateFormatter("%d %b %Y")
+        date_locator_major = WeekdayLocator()
+        date_locator_minor = DayLocator()
+    elif karma_timeline <= timedelta(days=365):
+        date_format = DateFormatter("%B %Y")
+        date_locator_major = MonthLocator()
+        date_locator_minor = WeekdayLocator(interval=2)
+    else:
+        date_format = DateFormatter("%Y")
+        date_locator_major = YearLocator()
+        date_locator_minor = MonthLocator()
+
+    # Transform the karma changes into plottable values
+    for karma, (times, scores) in series.items():
+        time = date2num(times)
+
+        # Plot the values
+        ax.xaxis.set_major_locator(date_locator_major)
+        ax.xaxis.set_minor_locator(date_locator_minor)
+        ax.xaxis.set_major_formatter(date_format)
+        ax.grid(visible=True, which="minor", color="0.9", linestyle=":")
+        ax.grid(visible=True, which="major", color="0.5", linestyle="--")
+        ax.set(
+            xlabel="Time",
+            ylabel="Karma",
+            xlim=[
+                time[0] - ((time[-1] - time[0]) * 0.05),
+                time[-1] + ((time[-1] - time[0]) * 0.05),
+            ],
+        )
+        (line,) = ax.plot_date(time, scores, "-", xdate=True)
+        line.set_label(karma)
+
+    # Create a legend if more than  1 line and format the dates
+    if len(series) > 1:
+        with xkcd_context():
+            ax.legend()
+    fig.autofmt_xdate()
+
+    img = BytesIO()
+    with xkcd_context():
+        fig.savefig(img, dpi=PLOT_DPI, transparent=False, format="png")
+    plt.close(fig)
+    return img.getvalue()
+
+
+def plot_filename(topics: Iterable[str]) -> str:
+    return (
+        "".join(topics)
+        + "-"
+        + str(hex(int(datetime.utcnow().timestamp()))).lstrip("0x")
+        + ".png"
+    ).replace(" ", "")
+
+
+def plot_key(karma_items: Dict[str, Karma], xkcd: bool) -> Hashable:
+    """Identifies a plot by its topics and their latest change, so any new change misses"""
+    return (
+        tuple(
+            (name, item.id, item.last_changed_at) for name, item in karma_items.items()
+        ),
+        xkcd,
+    )
+
+
+class PlotCache:
+    """Recently rendered plot PNGs, evicting the least recently used beyond `maxsize`"""
+
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = maxsize
+        self._plots: OrderedDict[Hashable, bytes] = OrderedDict()
+
+    def __len__(self):
+        return len(self._plots)
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        png = self._plots.get(key)
+        if png is not None:
+            self._plots.move_to_end(key)
+        return png
+
+    def put(self, key: Hashable, png: bytes):
+        self._plots[key] = png
+        self._plots.move_to_end(key)
+        while len(self._plots) > self.maxsize:
+            self._plots.popitem(last=False)
+
+
+plot_cache = PlotCache()
@@ -0,0 +1,95 @@
+from io import BytesIO
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session
+
+from models.karma import KarmaChange
+
+REASONS_PER_PAGE = 10
+
+# Reasons are sorted alphabetically, with the message ID to break ties. This is also
+# the key pages are fetched after or before, so no page needs an OFFSET
+ReasonKey = Tuple[str, int]
+Reason = Tuple[str, int, ReasonKey]
+
+_sort_key = (func.lower(KarmaChange.reason), KarmaChange.message_id)
+
+
+def reason_prefix(change: int) -> str:
+    # These are full width unicode characters to ensure that the text remains
+    # aligned when not in a monospace font
+    if change > 0:
+        return "＋"
+    elif change < 0:
+        return "－"
+    else:
+        return "＝"
+
+
+def format_reason(reason: str, change: int, max_length: Optional[int] = None) -> str:
+    if max_length is not None and len(reason) > max_length:
+        reason = reason[: max_length - 1] + "…"
+    return f" {reason_prefix(change)} {reason}"
+
+
+def _reasons_query(karma_id: int, db_session: Session):
+    return db_session.query(KarmaChange.reason, KarmaChange.change, *_sort_key).filter(
+        KarmaChange.karma_id == karma_id, KarmaChange.reason.is_not(None)
+    )
+
+
+def count_reasons(karma_id: int, db_session: Session) -> int:
+    return (
+        db_session.query(func.count())
+        .filter(KarmaChange.karma_id == karma_id, KarmaChange.reason.is_not(None))
+        .scalar()
+    )
+
+
+def get_reasons_page(
+    karma_id: int,
+    db_session: Session,
+    after: Optional[ReasonKey] = None,
+    before: Optional[ReasonKey] = None,
+    limit: int = REASONS_PER_PAGE,
+) -> List[Reason]:
+    """Get a page of a karma item's reasons as (reason, change, key) in alphabetical order.
+    Pages start after the `after` key, or end before the `before` key.
+    """
+    query = _reasons_query(karma_id, db_session)
+    if after is not None:
+        query = query.filter(tuple_(*_sort_key) > tuple_(*after)).order_by(
+            *(c.asc() for c in _sort_key)
+        )
+    elif before is not None:
+        query = query.filter(tuple_(*_sort_key) < tuple_(*before)).order_by(
+            *(c.desc() for c in _sort_key)
+        )
+    else:
+        query = query.order_by(*(c.asc() for c in _sort_key))
+
+    page = [
+        (reason, change, (key, id_)) for reason, change, key, id_ in query.limit(limit)
+    ]
+    if before is not None and after is None:
+        page.reverse()
+    return page
+
+
+def export_reasons(
+    karma_id: int, db_session: Session, batch_size: int = 1000
+) -> BytesIO:
+    """Write all of a karma item's reasons to a text file in memory.
+    Rows are streamed from the database in batches rather than all loaded at once.
+    """
+    buffer = BytesIO()
+    query = (
+        _reasons_query(karma_id, db_session)
+        .order_by(*(c.asc() for c in _sort_key))
+        .execution_options(yield_per=batch_size)
+    )
+    for reason, change, _, _ in query:
+        buffer.write(f"{format_reason(reason, change)}\n".encode("utf8"))
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,77 @@
+from dataclasses import dataclass
+from datetime import datetime
+
+from pytz import timezone, utc
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models.karma import Karma, KarmaChange
+from models.user import User
+
+
+def _local_time(time: datetime) -> datetime:
+    return utc.localize(time).astimezone(timezone("Europe/London"))
+
+
+@dataclass
+class KarmaStats:
+    """Statistics about the changes to a karma topic, aggregated by the database"""
+
+    changes: int
+    users: int
+    first_change: datetime
+    last_change: datetime
+    top_user_uid: int
+    top_user_changes: int
+    pluses: int
+    minuses: int
+    neutrals: int
+
+    @property
+    def approval(self) -> float:
+        return 100 * (self.pluses - self.minuses) / (self.pluses + self.minuses)
+
+    @property
+    def mins_per_change(self) -> float:
+        return (self.last_change - self.first_change).total_seconds() / (
+            60 * self.changes
+        )
+
+    @staticmethod
+    def for_karma(karma: Karma, db_session: Session):
+        """Get the statistics of a karma item, or None if it has no changes"""
+        changes, users, first_change, last_change = (
+            db_session.query(
+                func.count(),
+                func.count(KarmaChange.user_id.distinct()),
+                func.min(KarmaChange.created_at),
+                func.max(KarmaChange.created_at),
+            )
+            .filter(KarmaChange.karma_id == karma.id)
+            .one()
+        )
+        if not changes:
+            return None
+
+        # Ties go to whoever karma'd the topic first
+        user_changes = func.count().label("user_changes")
+        top_user_uid, top_user_changes = (
+            db_session.query(User.user_uid, user_changes)
+            .join(KarmaChange, KarmaChange.user_id == User.id)
+            .filter(KarmaChange.karma_id == karma.id)
+            .group_by(User.id, User.user_uid)
+            .order_by(user_changes.desc(), func.min(KarmaChange.created_at).asc())
+            .first()
+        )
+
+        return KarmaStats(
+            changes=changes,
+            users=users,
+            first_change=_local_time(first_change),
+            last_change=_local_time(last_change),
+            top_user_uid=top_user_uid,
+            top_user_changes=top_user_changes,
+            pluses=karma.pluses,
+            minuses=karma.minuses,
+            neutrals=karma.neutrals,
+        )
@@ -0,0 +1,88 @@
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from models.karma import Karma, topic_key
+
+
+def trigrams(key: str, partial: bool = False) -> Set[str]:
+    """The trigrams of a topic key, padded like pg_trgm so that the ends count for more.
+    A partial key (as typed so far) isn't padded at the end, so it still matches longer topics.
+    """
+    padded = f"  {key}" if partial else f"  {key} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class TopicIndex:
+    """In-memory trigram index over the karma topics, for suggestions and autocomplete.
+
+    Topic names are loaded on first use (or explicitly with `load`) and new topics are
+    added through `add` once they are committed.
+    """
+
+    def __init__(self):
+        self._names: Optional[Dict[str, str]] = None
+        self._sizes: Dict[str, int] = {}
+        self._postings: defaultdict[str, Set[str]] = defaultdict(set)
+
+    def load(self, db_session: Session):
+        self._names = {}
+        self._sizes = {}
+        self._postings = defaultdict(set)
+        for key, name in db_session.query(Karma.key, Karma.name).order_by(Karma.id):
+            self._add(key, name)
+
+    def _add(self, key: str, name: str):
+        assert self._names is not None
+        # The oldest topic with a key is the one that's used, like resolve_topics
+        if key in self._names:
+            return
+        self._names[key] = name
+        key_trigrams = trigrams(key)
+        self._sizes[key] = len(key_trigrams)
+        for trigram in key_trigrams:
+            self._postings[trigram].add(key)
+
+    def add(self, name: str):
+        if self._names is not None:
+            self._add(topic_key(name), name)
+
+    def _matches(self, query: Set[str]) -> Counter[str]:
+        """The number of the query's trigrams in each topic sharing any"""
+        shared: Counter[str] = Counter()
+        for trigram in query:
+            shared.update(self._postings.get(trigram, ()))
+        return shared
+
+    def similar(
+        self, topic: str, db_session: Session, limit: int = 3, threshold: float = 0.3
+    ) -> List[str]:
+        """The names of the topics most similar to the given one, most similar first"""
+        if self._names is None:
+            self.load(db_session)
+        query = trigrams(topic_key(topic))
+        scored = []
+        for key, count in self._matches(query).items():
+            similarity = count / (len(query) + self._sizes[key] - count)
+            if similarity >= threshold:
+                scored.append((-similarity, key))
+        return [self._names[key] for _, key in sorted(scored)[:limit]]
+
+    def complete(self, partial: str, db_session: Session, limit: int = 25) -> List[str]:
+        """The names of the topics best matching what's been typed so far"""
+        if self._names is None:
+            self.load(db_session)
+        key = topic_key(partial)
+        if not key:
+            return []
+        query = trigrams(key, partial=True)
+        # Rank by how much of the typed text a topic contains, then shortest first
+        ranked = sorted(
+            self._matches(query).items(),
+            key=lambda match: (-match[1], len(match[0]), match[0]),
+        )
+        return [self._names[key] for key, _ in ranked[:limit]]
+
+
+topic_index = TopicIndex()
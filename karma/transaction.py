@@ -5,8 +5,8 @@ from typing import Iterable, List
 from discord import Message
 from sqlalchemy.orm import Session
 
+from karma.blacklist import karma_blacklist
 from karma.parser import KarmaItem
-from models.karma import BlockedKarma
 from utils.utils import user_is_irc_bot
 
 
@@ -38,16 +38,9 @@ class KarmaTransaction:
     @staticmethod
     def try_from_item(karma_item: KarmaItem, message: Message, db_session: Session):
         """Try to create a karma item, returning None if the topic is on the blacklist"""
-
-        def query():
-            """This function serves to lazily query the database."""
-            return (
-                db_session.query(BlockedKarma)
-                .filter(BlockedKarma.topic.ilike(karma_item.topic.casefold()))
-                .one_or_none()
-            )
-
-        if not karma_item.bypass and query() is not None:
+        if not karma_item.bypass and karma_blacklist.contains(
+            karma_item.topic, db_session
+        ):
             return None
         self_karma = is_self_karma(karma_item, message)
         return KarmaTransaction(karma_item, self_karma)
@@ -88,22 +81,13 @@ def apply_blacklist(
     transactions: Iterable[KarmaTransaction], db_session: Session
 ) -> List[KarmaTransaction]:
     def is_on_blacklist(karma_transaction: KarmaTransaction):
-        """Query the database to test whether an item is on the blacklist.
+        """Test whether an item is on the blacklist.
 
         Returns true when the item is on the blacklist.
         """
-        # If possible, don't query the database
         if karma_transaction.karma_item.bypass:
             return False
-        query = (
-            db_session.query(BlockedKarma)
-            .filter(
-                BlockedKarma.topic.ilike(karma_transaction.karma_item.topic.casefold())
-            )
-            .one_or_none()
-        )
-        # If we find the item then it is on the blacklist
-        return query is not None
+        return karma_blacklist.contains(karma_transaction.karma_item.topic, db_session)
 
     return [
         transaction for transaction in transactions if not is_on_blacklist(transaction)
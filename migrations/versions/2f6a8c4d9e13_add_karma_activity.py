@@ -0,0 +1,64 @@
+"""add karma activity
+
+Revision ID: 2f6a8c4d9e13
+Revises: 9d4e7b1c02f6
+Create Date: 2026-10-18 16:42:31.207719
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "2f6a8c4d9e13"
+down_revision = "9d4e7b1c02f6"
+branch_labels = None
+depends_on = None
+
+
+karma_changes = sa.table(
+    "karma_changes",
+    sa.column("karma_id", sa.Integer),
+    sa.column("created_at", sa.DateTime),
+    sa.column("change", sa.Integer),
+)
+
+
+def upgrade():
+    karma_activity = op.create_table(
+        "karma_activity",
+        sa.Column("karma_id", sa.Integer(), nullable=False),
+        sa.Column("hour", sa.DateTime(), nullable=False),
+        sa.Column("changes", sa.Integer(), nullable=False),
+        sa.Column("net", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["karma_id"],
+            ["karma.id"],
+            name=op.f("fk_karma_activity_karma_id_karma"),
+        ),
+        sa.PrimaryKeyConstraint("karma_id", "hour", name=op.f("pk_karma_activity")),
+    )
+    op.create_index(
+        op.f("ix_karma_activity_hour"), "karma_activity", ["hour"], unique=False
+    )
+
+    # Backfill from the existing changes
+    if op.get_bind().dialect.name == "postgresql":
+        hour = sa.func.date_trunc("hour", karma_changes.c.created_at)
+    else:
+        hour = sa.func.strftime("%Y-%m-%d %H:00:00.000000", karma_changes.c.created_at)
+    op.execute(
+        karma_activity.insert().from_select(
+            ["karma_id", "hour", "changes", "net"],
+            sa.select(
+                karma_changes.c.karma_id,
+                hour,
+                sa.func.count(),
+                sa.func.sum(karma_changes.c.change),
+            ).group_by(karma_changes.c.karma_id, hour),
+        )
+    )
+
+
+def downgrade():
+    op.drop_index(op.f("ix_karma_activity_hour"), table_name="karma_activity")
+    op.drop_table("karma_activity")
@@ -0,0 +1,65 @@
+"""add karma score and last_changed_at
+
+Revision ID: 5b8f0e3c27a4
+Revises: c4e2a9d71b3f
+Create Date: 2026-10-18 11:03:47.118254
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5b8f0e3c27a4"
+down_revision = "c4e2a9d71b3f"
+branch_labels = None
+depends_on = None
+
+
+karma = sa.table(
+    "karma",
+    sa.column("id", sa.Integer),
+    sa.column("score", sa.Integer),
+    sa.column("last_changed_at", sa.DateTime),
+)
+karma_changes = sa.table(
+    "karma_changes",
+    sa.column("karma_id", sa.Integer),
+    sa.column("created_at", sa.DateTime),
+    sa.column("score", sa.Integer),
+)
+
+
+def upgrade():
+    op.add_column("karma", sa.Column("score", sa.Integer(), nullable=True))
+    op.add_column("karma", sa.Column("last_changed_at", sa.DateTime(), nullable=True))
+
+    # Backfill from the latest change of each item
+    latest_change = (
+        sa.select(karma_changes.c.score)
+        .where(karma_changes.c.karma_id == karma.c.id)
+        .order_by(karma_changes.c.created_at.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    last_changed_at = (
+        sa.select(sa.func.max(karma_changes.c.created_at))
+        .where(karma_changes.c.karma_id == karma.c.id)
+        .scalar_subquery()
+    )
+    op.execute(
+        karma.update().values(
+            score=sa.func.coalesce(latest_change, 0),
+            last_changed_at=last_changed_at,
+        )
+    )
+
+    with op.batch_alter_table("karma") as bop:
+        bop.alter_column("score", existing_type=sa.Integer(), nullable=False)
+        bop.create_index(bop.f("ix_karma_score"), ["score"], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table("karma") as bop:
+        bop.drop_index(bop.f("ix_karma_score"))
+        bop.drop_column("last_changed_at")
+        bop.drop_column("score")
@@ -0,0 +1,42 @@
+"""add user last_seen and unique user_uid
+
+Revision ID: 9d4e7b1c02f6
+Revises: 5b8f0e3c27a4
+Create Date: 2026-10-18 14:21:09.503117
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9d4e7b1c02f6"
+down_revision = "5b8f0e3c27a4"
+branch_labels = None
+depends_on = None
+
+
+users = sa.table("users", sa.column("user_uid", sa.BigInteger))
+
+
+def upgrade():
+    # New users are upserted on user_uid, so it has to be unique
+    duplicates = op.get_bind().execute(
+        sa.select(users.c.user_uid)
+        .group_by(users.c.user_uid)
+        .having(sa.func.count() > 1)
+    )
+    duplicate_uids = [row.user_uid for row in duplicates]
+    if duplicate_uids:
+        raise Exception(
+            f"Merge the duplicate users with user_uid in {duplicate_uids} first"
+        )
+
+    with op.batch_alter_table("users") as bop:
+        bop.add_column(sa.Column("last_seen", sa.DateTime(), nullable=True))
+        bop.create_unique_constraint(bop.f("uq_users_user_uid"), ["user_uid"])
+
+
+def downgrade():
+    with op.batch_alter_table("users") as bop:
+        bop.drop_constraint(bop.f("uq_users_user_uid"), type_="unique")
+        bop.drop_column("last_seen")
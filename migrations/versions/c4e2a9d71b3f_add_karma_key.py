@@ -0,0 +1,56 @@
+"""add karma key
+
+Revision ID: c4e2a9d71b3f
+Revises: 951a5ce4741b
+Create Date: 2026-10-18 10:12:31.402118
+
+"""
+import unicodedata
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c4e2a9d71b3f"
+down_revision = "951a5ce4741b"
+branch_labels = None
+depends_on = None
+
+
+karma = sa.table(
+    "karma",
+    sa.column("id", sa.Integer),
+    sa.column("name", sa.String),
+    sa.column("key", sa.String),
+)
+
+
+def topic_key(topic: str) -> str:
+    # frozen copy of models.karma.topic_key at the time of this migration
+    key = unicodedata.normalize("NFKD", topic.casefold())
+    key = "".join(c for c in key if not unicodedata.combining(c))
+    return key.replace("_", " ")
+
+
+def upgrade():
+    op.add_column("karma", sa.Column("key", sa.String(), nullable=True))
+
+    bind = op.get_bind()
+    rows = bind.execute(sa.select(karma.c.id, karma.c.name)).all()
+    if rows:
+        bind.execute(
+            karma.update()
+            .where(karma.c.id == sa.bindparam("_id"))
+            .values(key=sa.bindparam("_key")),
+            [{"_id": id_, "_key": topic_key(name)} for id_, name in rows],
+        )
+
+    with op.batch_alter_table("karma") as bop:
+        bop.alter_column("key", existing_type=sa.String(), nullable=False)
+        bop.create_index(bop.f("ix_karma_key"), ["key"], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table("karma") as bop:
+        bop.drop_index(bop.f("ix_karma_key"))
+        bop.drop_column("key")
@@ -1,6 +1,7 @@
 # pyright: reportImportCycles=false
 # we need to import User for type checking but that gives a circular import
 
+import unicodedata
 from datetime import datetime
 from typing import TYPE_CHECKING
 
@@ -9,6 +10,7 @@ from sqlalchemy import ForeignKey, func
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from config import CONFIG
 from models.models import Base, DiscordSnowflake
 
 # breaks the circular import at runtime
@@ -17,6 +19,16 @@ if TYPE_CHECKING:
     from .user import User
 
 
+def topic_key(topic: str) -> str:
+    """Canonical form of a karma topic, used to match differently written topics.
+
+    Casefolds, decomposes and strips combining marks, and treats underscores as spaces.
+    """
+    key = unicodedata.normalize(CONFIG.UNICODE_NORMALISATION_FORM, topic.casefold())
+    key = "".join(c for c in key if not unicodedata.combining(c))
+    return key.replace("_", " ")
+
+
 class KarmaChange(Base):
     __tablename__ = "karma_changes"
 
@@ -42,6 +54,8 @@ class Karma(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True, init=False)
     name: Mapped[str]
+    # derived from name in __post_init__, see topic_key
+    key: Mapped[str] = mapped_column(index=True, init=False)
 
     changes: Mapped[list["KarmaChange"]] = relationship(
         back_populates="karma", order_by=KarmaChange.created_at.asc(), init=False
@@ -53,6 +67,12 @@ class Karma(Base):
     pluses: Mapped[int] = mapped_column(default=0)
     minuses: Mapped[int] = mapped_column(default=0)
     neutrals: Mapped[int] = mapped_column(default=0)
+    # kept in step with the latest KarmaChange so it need not be looked up
+    score: Mapped[int] = mapped_column(default=0, index=True)
+    last_changed_at: Mapped[datetime | None] = mapped_column(default=None)
+
+    def __post_init__(self):
+        self.key = topic_key(self.name)
 
     @hybrid_property
     def net_score(self):
@@ -63,6 +83,18 @@ class Karma(Base):
         return self.pluses + self.minuses + self.neutrals
 
 
+class KarmaActivity(Base):
+    """The karma changes to each topic within each hour, kept up to date with the changes"""
+
+    __tablename__ = "karma_activity"
+
+    karma_id: Mapped[int] = mapped_column(ForeignKey("karma.id"), primary_key=True)
+    # the start of the hour, in UTC like KarmaChange.created_at
+    hour: Mapped[datetime] = mapped_column(primary_key=True, index=True)
+    changes: Mapped[int]
+    net: Mapped[int]
+
+
 class BlockedKarma(Base):
     __tablename__ = "blacklist"
 
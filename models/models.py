@@ -1,18 +1,204 @@
+import asyncio
 import logging
-from typing import Annotated
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Annotated, Any, AsyncGenerator, Callable, TypeVar
 
-from sqlalchemy import BigInteger, ForeignKey, MetaData, create_engine
-from sqlalchemy.orm import DeclarativeBase, MappedAsDataclass, Session, mapped_column
+from sqlalchemy import (
+    URL,
+    BigInteger,
+    Connection,
+    Engine,
+    ForeignKey,
+    MetaData,
+    create_engine,
+    event,
+    insert,
+    literal,
+    make_url,
+    select,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import ExceptionContext
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import (
+    DeclarativeBase,
+    InstrumentedAttribute,
+    MappedAsDataclass,
+    Session,
+    mapped_column,
+)
+from sqlalchemy.sql import ColumnCollection, ColumnElement
 
 from config import CONFIG
 
+_T = TypeVar("_T")
+
+# The command or listener running in the current task, see QueryStats
+current_operation: ContextVar[str | None] = ContextVar(
+    "current_operation", default=None
+)
+
+
+@dataclass
+class OperationStats:
+    invocations: int = 0
+    statements: int = 0
+    db_time: float = 0
+
+    @property
+    def statements_per_invocation(self) -> float:
+        return self.statements / self.invocations if self.invocations else 0
+
+    @property
+    def ms_per_invocation(self) -> float:
+        return 1000 * self.db_time / self.invocations if self.invocations else 0
+
+
+class QueryStats:
+    """The statements run and time spent in the database by each command and listener.
+
+    Work is attributed to `current_operation`, set by the bot's invoke hooks and the
+    `attributed` listener decorator. Anything else is attributed to its asyncio task.
+    Totals are kept since startup, and separately since the last `take_recent`.
+    """
+
+    def __init__(self):
+        self.totals: defaultdict[str, OperationStats] = defaultdict(OperationStats)
+        self.recent: defaultdict[str, OperationStats] = defaultdict(OperationStats)
+
+    def invoked(self, operation: str):
+        self.totals[operation].invocations += 1
+        self.recent[operation].invocations += 1
+
+    def executed(self, operation: str, elapsed: float):
+        for stats in (self.totals[operation], self.recent[operation]):
+            stats.statements += 1
+            stats.db_time += elapsed
+
+    def take_recent(self) -> dict[str, OperationStats]:
+        recent, self.recent = self.recent, defaultdict(OperationStats)
+        return recent
+
+
+query_stats = QueryStats()
+
+
+def _operation() -> str:
+    operation = current_operation.get()
+    if operation is not None:
+        return operation
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return task.get_name() if task is not None else "other"
+
+
+def _query_start_times(conn: Connection) -> list[float]:
+    start_times: list[float] = conn.info.setdefault("query_start_time", [])
+    return start_times
+
+
+def _before_cursor_execute(conn: Connection, *args: Any):
+    _query_start_times(conn).append(perf_counter())
+
+
+def _after_cursor_execute(conn: Connection, *args: Any):
+    elapsed = perf_counter() - _query_start_times(conn).pop()
+    query_stats.executed(_operation(), elapsed)
+
+
+def _handle_error(context: ExceptionContext):
+    if context.connection is not None:
+        start_times = _query_start_times(context.connection)
+        if start_times:
+            start_times.pop()
+
+
+def track_queries(engine: Engine):
+    """Attribute the statements run through an engine in `query_stats`"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
 # this is bad, redo this
 engine = create_engine(CONFIG.DATABASE_CONNECTION)
+track_queries(engine)
 if CONFIG.SQL_LOGGING:
     logging.basicConfig()
     logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
 db_session = Session(bind=engine, future=True)
 
+# asyncio engine for the message hot path, so queries there don't block the event loop
+# created on first use, None if the database has no async driver (see async_session)
+_async_engine: AsyncEngine | None = None
+_async_engine_created = False
+
+
+def async_database_url(url: str | URL) -> URL | None:
+    """The URL to connect to the database with an async driver, None if there isn't one"""
+    url = make_url(url)
+    backend, driver = url.get_backend_name(), url.get_driver_name()
+    if backend == "sqlite" and driver in ("pysqlite", "aiosqlite"):
+        return url.set(drivername="sqlite+aiosqlite")
+    # psycopg (3) is both sync and async, psycopg2 is what a plain postgresql:// uses
+    if backend == "postgresql" and driver in ("psycopg", "psycopg2"):
+        return url.set(drivername="postgresql+psycopg")
+    if backend == "postgresql" and driver == "asyncpg":
+        return url
+    return None
+
+
+def create_async_engine_for(url: str | URL) -> AsyncEngine | None:
+    """An async engine for the database, None if no async driver is available for it"""
+    async_url = async_database_url(url)
+    if async_url is None:
+        logging.warning(f"No async driver for {make_url(url).drivername}")
+        return None
+    try:
+        return create_async_engine(async_url)
+    except ImportError as e:
+        logging.warning(f"Async driver for {async_url.drivername} not installed: {e}")
+        return None
+
+
+def get_async_engine() -> AsyncEngine | None:
+    global _async_engine, _async_engine_created
+    if not _async_engine_created:
+        _async_engine = create_async_engine_for(CONFIG.DATABASE_CONNECTION)
+        if _async_engine is not None:
+            track_queries(_async_engine.sync_engine)
+        _async_engine_created = True
+    return _async_engine
+
+
+@asynccontextmanager
+async def async_session() -> AsyncGenerator[AsyncSession | Session, None]:
+    """A session for the async engine, or the (blocking) `db_session` without one.
+
+    Use `run_sync` to run work in either.
+    """
+    async_engine = get_async_engine()
+    if async_engine is None:
+        yield db_session
+        return
+    async with AsyncSession(bind=async_engine, expire_on_commit=False) as session:
+        yield session
+
+
+async def run_sync(session: AsyncSession | Session, fn: Callable[[Session], _T]) -> _T:
+    """Run fn with the session, through the async session's connection if it is one"""
+    if isinstance(session, AsyncSession):
+        return await session.run_sync(fn)
+    return fn(session)
+
+
 # some useful re-usable column types
 # dataclass args (init, default) cannot be part of annotations and must be explicit
 IntPk = Annotated[int, mapped_column(primary_key=True)]
@@ -37,3 +223,52 @@ class Base(MappedAsDataclass, DeclarativeBase):
             "pk": "pk_%(table_name)s",
         }
     )
+
+
+def upsert(
+    session: Session,
+    model: type[Base],
+    values: dict[str, Any],
+    index_elements: list[InstrumentedAttribute[Any]],
+    set_: Callable[[ColumnCollection[str, ColumnElement[Any]]], dict[str, Any]],
+    returning: InstrumentedAttribute[Any] | None = None,
+) -> Any:
+    """Insert a row, or update the existing row where it conflicts on index_elements.
+
+    The update is `set_(excluded)`, where `excluded` has the values that would have been
+    inserted. PostgreSQL and SQLite do it in one INSERT ... ON CONFLICT, other databases
+    look for the row and then insert or update it within a savepoint. Returns the row's
+    `returning` column, if given.
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert_ = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        statement = insert_(model).values(values)
+        statement = statement.on_conflict_do_update(
+            index_elements=index_elements, set_=set_(statement.excluded)
+        )
+        if returning is None:
+            session.execute(statement)
+            return None
+        return session.execute(statement.returning(returning)).scalar_one()
+
+    where = [column == values[column.key] for column in index_elements]
+    excluded: ColumnCollection[str, ColumnElement[Any]] = ColumnCollection(
+        [(key, literal(value)) for key, value in values.items()]
+    )
+    with session.begin_nested():
+        exists = session.execute(
+            select(*index_elements).where(*where).with_for_update()
+        ).first()
+        if exists is None:
+            session.execute(insert(model).values(values))
+        else:
+            session.execute(
+                update(model)
+                .where(*where)
+                .values(set_(excluded))
+                .execution_options(synchronize_session=False)
+            )
+    if returning is None:
+        return None
+    return session.execute(select(returning).where(*where)).scalar_one()
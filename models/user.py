@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from models.karma import KarmaChange
@@ -8,8 +10,9 @@ class User(Base):
     __tablename__ = "users"
 
     id: Mapped[int] = mapped_column(primary_key=True, init=False)
-    user_uid: Mapped[DiscordSnowflake]
+    user_uid: Mapped[DiscordSnowflake] = mapped_column(unique=True)
     username: Mapped[str]
     karma_changes: Mapped[list["KarmaChange"]] = relationship(
         back_populates="user", order_by=KarmaChange.created_at, init=False
     )
+    last_seen: Mapped[datetime | None] = mapped_column(default=None)
@@ -7,6 +7,7 @@ from alembic.config import Config
 from sqlalchemy import create_engine
 from sqlalchemy.orm import Session
 
+from karma.blacklist import KarmaBlacklist
 from karma.parser import KarmaItem, KarmaOperation
 from karma.transaction import KarmaTransaction, apply_blacklist
 from models import Base
@@ -118,3 +119,14 @@ TEST_CASES: dict[str, Tuple[list[KarmaTransaction], list[KarmaTransaction]]] = {
 def test_blacklist(database, transactions, expected):
     actual = apply_blacklist(transactions, database)
     assert actual == expected
+
+
+def test_blacklist_write_through(database):
+    blacklist = KarmaBlacklist()
+    blacklist.load(database)
+    assert blacklist.contains("Notepad", database)
+
+    blacklist.add("FooBar")
+    blacklist.remove("notepad")
+    assert blacklist.contains("foobar", database)
+    assert not blacklist.contains("notepad", database)
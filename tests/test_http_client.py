@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from utils.http_client import CONNECTION_LIMIT_PER_HOST, MAX_ATTEMPTS, HttpClient
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr("utils.http_client.RETRY_BACKOFF", 0)
+
+
+def serve(statuses):
+    """A server answering with each status in turn, then 200"""
+    requests = []
+
+    async def handler(request):
+        requests.append(request.method)
+        status = statuses[len(requests) - 1] if len(requests) <= len(statuses) else 200
+        return web.Response(status=status, text="hi")
+
+    app = web.Application()
+    app.router.add_route("*", "/", handler)
+    return TestServer(app), requests
+
+
+async def request(method, statuses):
+    server, requests = serve(statuses)
+    client = HttpClient()
+    async with server:
+        response = await client.request(method, str(server.make_url("/")))
+        body = await response.text()
+        await client.close()
+    return response.status, body, requests
+
+
+def test_retries_unavailable():
+    status, body, requests = asyncio.run(request("GET", [503, 502]))
+    assert (status, body) == (200, "hi")
+    assert requests == ["GET"] * 3
+
+
+def test_gives_up_after_max_attempts():
+    status, _, requests = asyncio.run(request("GET", [503] * 5))
+    assert status == 503
+    assert len(requests) == MAX_ATTEMPTS
+
+
+def test_does_not_retry_post():
+    status, _, requests = asyncio.run(request("POST", [503]))
+    assert status == 503
+    assert requests == ["POST"]
+
+
+def test_does_not_retry_client_errors():
+    status, _, requests = asyncio.run(request("GET", [404]))
+    assert status == 404
+    assert requests == ["GET"]
+
+
+def test_reuses_connections():
+    async def run():
+        server, _ = serve([])
+        client = HttpClient()
+        async with server:
+            for _ in range(5):
+                response = await client.get(str(server.make_url("/")))
+                await response.read()
+            connector = client.session.connector
+            await client.close()
+        return connector
+
+    connector = asyncio.run(run())
+    assert connector.limit_per_host == CONNECTION_LIMIT_PER_HOST
+    assert connector.closed
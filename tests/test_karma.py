@@ -1,31 +1,81 @@
 import datetime as datetime_module
 from datetime import datetime
 
-from karma.karma import is_in_cooldown
-from models.karma import KarmaChange
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from karma.cooldown import CooldownTracker
+from karma.karma import is_in_cooldown, resolve_topics
+from models import Base
+from models.karma import Karma, topic_key
 
 _TIMEOUT = 60
 
 
-def build_karma_change(created_at: datetime):
-    return KarmaChange(
-        karma_id=1,
-        user_id=1,
-        message_id=1,
-        reason=None,
-        change=1,
-        score=1,
-        created_at=created_at,
-    )
+@pytest.fixture(scope="module")
+def database():
+    db_engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(db_engine)
+    db_session = Session(bind=db_engine, future=True)
+
+    db_session.add_all([Karma(name="foo bar"), Karma(name="Café")])
+    db_session.commit()
+
+    return db_session
 
 
 def test_is_in_cooldown():
-    last_change = build_karma_change(datetime.utcnow())
-    assert is_in_cooldown(last_change, _TIMEOUT)
+    assert is_in_cooldown(datetime.utcnow(), _TIMEOUT)
 
 
 def test_not_is_in_cooldown():
-    last_change = build_karma_change(
-        datetime.utcnow() - datetime_module.timedelta(seconds=100)
-    )
-    assert not is_in_cooldown(last_change, _TIMEOUT)
+    last_changed_at = datetime.utcnow() - datetime_module.timedelta(seconds=100)
+    assert not is_in_cooldown(last_changed_at, _TIMEOUT)
+
+
+TOPIC_KEY_CASES = {
+    "lowercase": ("foobar", "foobar"),
+    "casefolded": ("FooBar", "foobar"),
+    "underscores as spaces": ("foo_bar", "foo bar"),
+    "combining marks stripped": ("Café", "cafe"),
+    "compatibility decomposed": ("ﬁle", "file"),
+}
+
+
+@pytest.mark.parametrize(
+    ["topic", "expected"], TOPIC_KEY_CASES.values(), ids=TOPIC_KEY_CASES.keys()
+)
+def test_topic_key(topic, expected):
+    assert topic_key(topic) == expected
+
+
+def test_resolve_topics(database):
+    resolved = resolve_topics(["FOO_BAR", "cafe", "missing"], database)
+    assert {k: v.name for k, v in resolved.items()} == {
+        "foo bar": "foo bar",
+        "cafe": "Café",
+    }
+
+
+def test_cooldown_tracker():
+    tracker = CooldownTracker(_TIMEOUT)
+    tracker.record("foo", datetime.utcnow())
+    assert tracker.last_changed("foo") is not None
+    assert tracker.last_changed("bar") is None
+
+
+def test_cooldown_tracker_expires():
+    tracker = CooldownTracker(_TIMEOUT)
+    tracker.record("foo", datetime.utcnow() - datetime_module.timedelta(seconds=100))
+    tracker.record("bar", datetime.utcnow())
+    assert tracker.last_changed("foo") is None
+    assert len(tracker) == 1
+
+
+def test_cooldown_tracker_bounded():
+    tracker = CooldownTracker(_TIMEOUT, maxsize=2)
+    for key in ["foo", "bar", "baz"]:
+        tracker.record(key, datetime.utcnow())
+    assert tracker.last_changed("foo") is None
+    assert len(tracker) == 2
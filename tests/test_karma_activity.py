@@ -0,0 +1,72 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from karma.activity import record_activity, topic_activity, trending_topics
+from models import Base
+from models.karma import Karma
+
+
+@pytest.fixture
+def database():
+    db_engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(db_engine)
+    db_session = Session(bind=db_engine, future=True)
+
+    db_session.add_all([Karma(name="foo"), Karma(name="bar")])
+    db_session.flush()
+    for karma_id, change, at in [
+        (1, 1, datetime(2023, 1, 1, 10, 5)),
+        (1, -1, datetime(2023, 1, 1, 10, 55)),
+        (1, 1, datetime(2023, 1, 1, 11, 0)),
+        (2, 1, datetime(2023, 1, 1, 12, 0)),
+        (2, 1, datetime(2022, 12, 1)),
+    ]:
+        record_activity(db_session, karma_id, change, at)
+    db_session.commit()
+
+    return db_session
+
+
+def test_topic_activity(database):
+    assert topic_activity(database, 1, datetime(2023, 1, 1)) == [
+        (datetime(2023, 1, 1, 10), 2, 0),
+        (datetime(2023, 1, 1, 11), 1, 1),
+    ]
+
+
+def test_trending_topics(database):
+    assert trending_topics(database, datetime(2023, 1, 1), 5) == [
+        ("foo", 3, 1),
+        ("bar", 1, 1),
+    ]
+    # The hour a window starts in is counted whole
+    assert trending_topics(database, datetime(2023, 1, 1, 11, 30), 5) == [
+        ("bar", 1, 1),
+        ("foo", 1, 1),
+    ]
+
+
+def test_records_without_on_conflict(database, monkeypatch):
+    # Databases other than PostgreSQL and SQLite look for the hour, then insert or update
+    monkeypatch.setattr(database.get_bind().dialect, "name", "mysql")
+    record_activity(database, 1, 1, datetime(2023, 1, 1, 10, 30))
+    record_activity(database, 1, 1, datetime(2023, 1, 1, 13, 30))
+    database.commit()
+
+    assert topic_activity(database, 1, datetime(2023, 1, 1)) == [
+        (datetime(2023, 1, 1, 10), 3, 1),
+        (datetime(2023, 1, 1, 11), 1, 1),
+        (datetime(2023, 1, 1, 13), 1, 1),
+    ]
+
+
+def test_failure_keeps_the_transaction(database):
+    database.add(Karma(name="baz"))
+    database.execute(text("DROP TABLE karma_activity"))
+    record_activity(database, 1, 1, datetime(2023, 1, 1, 10, 30))
+    database.commit()
+
+    assert database.query(Karma).filter(Karma.name == "baz").one()
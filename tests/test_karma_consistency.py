@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from karma.consistency import check_karma
+from models import Base
+from models.karma import Karma, KarmaChange
+from models.user import User
+
+START = datetime(2023, 1, 1)
+
+
+@pytest.fixture
+def database():
+    db_engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(db_engine)
+    db_session = Session(bind=db_engine, future=True)
+
+    db_session.add(User(user_uid=1, username="foo"))
+    consistent = Karma(name="consistent", score=1, pluses=2, minuses=1)
+    consistent.last_changed_at = START + timedelta(minutes=2)
+    # Counted twice as if retried, and its second change has the wrong running score
+    drifted = Karma(name="drifted", score=2, pluses=2, neutrals=1)
+    unchanged = Karma(name="unchanged")
+    db_session.add_all([consistent, drifted, unchanged])
+    db_session.flush()
+
+    changes = [
+        (consistent.id, 1, 1),
+        (consistent.id, -1, 0),
+        (consistent.id, 1, 1),
+        (drifted.id, 1, 1),
+        (drifted.id, 0, 2),
+    ]
+    for message_id, (karma_id, change, score) in enumerate(changes):
+        db_session.add(
+            KarmaChange(
+                karma_id=karma_id,
+                user_id=1,
+                message_id=message_id,
+                created_at=START + timedelta(minutes=message_id),
+                reason=None,
+                change=change,
+                score=score,
+            )
+        )
+    db_session.commit()
+
+    return db_session
+
+
+def test_check_reports_drift(database):
+    report = check_karma(database, chunk_size=2, batch_size=2)
+
+    assert (report.topics, report.changes) == (3, 5)
+    assert (report.drifted_topics, report.drifted_changes) == (1, 1)
+    assert report.drift[0].startswith('"drifted" (2): pluses 2 -> 1, score 2 -> 1')
+    # Nothing is written without repairing
+    assert database.get(Karma, 2).score == 2
+
+
+def test_repair_fixes_drift(database):
+    assert not check_karma(database, repair=True, chunk_size=2).consistent
+
+    drifted = database.get(Karma, 2)
+    assert (drifted.pluses, drifted.neutrals, drifted.score) == (1, 1, 1)
+    assert drifted.last_changed_at == START + timedelta(minutes=4)
+    assert [change.score for change in drifted.changes] == [1, 1]
+    assert check_karma(database).consistent
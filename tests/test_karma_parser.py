@@ -20,6 +20,8 @@ TEST_CASES = {
     "space between topic and operator": ("foobar ++", []),
     "no karma operator with reason": ('"foobar" for reason', []),
     "operator embedded in link": ("https://foobar.com?slug=--asdf", []),
+    "command line flags": ("ls --all --human-readable", []),
+    "too long operator unquoted": ("foobar---", []),
     # Cases with no karma because of code blocks
     "no karma code block": (
         "```foobar++```",
@@ -106,6 +108,14 @@ TEST_CASES = {
         "baz quz foobar++ qux",
         [KarmaItem("foobar", KarmaOperation.POSITIVE, None)],
     ),
+    "topic not extended past invalid operator": (
+        "foo+++ bar++",
+        [KarmaItem("bar", KarmaOperation.POSITIVE, None)],
+    ),
+    "quoted with escaped quote": (
+        r'"foo\"bar"++',
+        [KarmaItem(r"foo\"bar", KarmaOperation.POSITIVE, None, bypass=True)],
+    ),
     # Karma reasons
     "paren (reason)": (
         "foobar++ (reason)",
@@ -175,6 +185,13 @@ TEST_CASES = {
             KarmaItem("quz", KarmaOperation.NEUTRAL, None),
         ],
     ),
+    "multiple karma on separate lines": (
+        "foo++\nbar--",
+        [
+            KarmaItem("foo", KarmaOperation.POSITIVE, None),
+            KarmaItem("bar", KarmaOperation.NEGATIVE, None),
+        ],
+    ),
     "multiple quoted karma": (
         '"item 1"++ "item 2"++',
         [
@@ -0,0 +1,142 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from karma.plot import (
+    PlotCache,
+    fetch_series,
+    lttb,
+    plot_key,
+    render_plot,
+    to_local_time,
+)
+from models import Base
+from models.karma import Karma, KarmaChange
+from models.user import User
+
+
+@pytest.fixture
+def database():
+    db_engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(db_engine)
+    db_session = Session(bind=db_engine, future=True)
+
+    db_session.add_all([User(user_uid=1, username="foo"), Karma(name="foo")])
+    db_session.add(Karma(name="bar"))
+    db_session.flush()
+    for karma_id in (1, 2):
+        for i in range(100):
+            db_session.add(
+                KarmaChange(
+                    karma_id=karma_id,
+                    user_id=1,
+                    message_id=i,
+                    created_at=datetime(2023, 3, 1 + i % 28, i % 24),
+                    reason=None,
+                    change=1,
+                    score=i,
+                )
+            )
+    db_session.commit()
+
+    return db_session
+
+
+def test_render_plot():
+    times = np.arange("2023-01-01T00", "2023-01-01T10", dtype="datetime64[h]")
+    png = render_plot({"foo": (times, np.arange(10))}, xkcd=True)
+    assert png.startswith(b"\x89PNG")
+
+
+def test_to_local_time():
+    times = np.array(["2023-01-01T12:00", "2023-07-01T12:00"], dtype="datetime64[us]")
+    expected = np.array(
+        ["2023-01-01T12:00", "2023-07-01T13:00"], dtype="datetime64[us]"
+    )
+    assert (to_local_time(times) == expected).all()
+
+
+def test_to_local_time_around_transitions():
+    times = np.array(
+        [
+            "2023-03-26T00:59:59",
+            "2023-03-26T01:00:00",
+            "2023-10-29T00:59:59",
+            "2023-10-29T01:00:00",
+        ],
+        dtype="datetime64[us]",
+    )
+    expected = np.array(
+        [
+            "2023-03-26T00:59:59",
+            "2023-03-26T02:00:00",
+            "2023-10-29T01:59:59",
+            "2023-10-29T01:00:00",
+        ],
+        dtype="datetime64[us]",
+    )
+    assert (to_local_time(times) == expected).all()
+
+
+def test_lttb_keeps_ends_and_peaks():
+    x = np.arange(1000)
+    y = np.zeros(1000)
+    y[500] = 100
+    kept = lttb(x, y, 10)
+
+    assert len(kept) == 10
+    assert kept[0] == 0 and kept[-1] == 999
+    assert 500 in kept
+    assert (np.diff(kept) > 0).all()
+
+
+def test_lttb_below_threshold():
+    assert list(lttb(np.arange(5), np.arange(5), 10)) == [0, 1, 2, 3, 4]
+
+
+def test_fetch_series(database):
+    items = {
+        "bar": database.get(Karma, 2),
+        "foo": database.get(Karma, 1),
+    }
+    series = fetch_series(items, database, max_points=20)
+
+    assert list(series) == ["bar", "foo"]
+    times, scores = series["foo"]
+    assert len(times) == len(scores) == 20
+    assert (np.diff(times) >= np.timedelta64(0)).all()
+
+
+def test_fetch_series_same_topic_twice(database):
+    item = database.get(Karma, 1)
+    series = fetch_series({"foo": item, "Foo": item}, database, max_points=20)
+
+    assert list(series) == ["foo", "Foo"]
+    assert (series["foo"][1] == series["Foo"][1]).all()
+
+
+def test_plot_key_changes_with_latest_change():
+    item = Karma(name="foo")
+    item.id = 1
+    item.last_changed_at = datetime(2023, 1, 1)
+    key = plot_key({"foo": item}, False)
+
+    assert plot_key({"foo": item}, False) == key
+    assert plot_key({"foo": item}, True) != key
+    item.last_changed_at = datetime(2023, 1, 2)
+    assert plot_key({"foo": item}, False) != key
+
+
+def test_plot_cache_evicts_least_recently_used():
+    cache = PlotCache(maxsize=2)
+    cache.put("a", b"a")
+    cache.put("b", b"b")
+    assert cache.get("a") == b"a"
+    cache.put("c", b"c")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"a"
+    assert len(cache) == 2
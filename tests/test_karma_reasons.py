@@ -0,0 +1,71 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from karma.reasons import (
+    count_reasons,
+    export_reasons,
+    format_reason,
+    get_reasons_page,
+)
+from models import Base
+from models.karma import Karma, KarmaChange
+from models.user import User
+
+REASONS = [f"reason {c}" for c in "DbAceGf"]
+
+
+@pytest.fixture
+def database():
+    db_engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(db_engine)
+    db_session = Session(bind=db_engine, future=True)
+
+    db_session.add_all([User(user_uid=1, username="foo"), Karma(name="foo")])
+    db_session.flush()
+    for message_id, reason in enumerate(REASONS + [None, None]):
+        db_session.add(
+            KarmaChange(
+                karma_id=1,
+                user_id=1,
+                message_id=message_id,
+                created_at=datetime(2023, 1, 1),
+                reason=reason,
+                change=1 if message_id % 2 else -1,
+                score=0,
+            )
+        )
+    db_session.commit()
+
+    return db_session
+
+
+def test_count_reasons(database):
+    assert count_reasons(1, database) == len(REASONS)
+
+
+def test_reasons_pages(database):
+    expected = sorted(REASONS, key=str.casefold)
+
+    first = get_reasons_page(1, database, limit=3)
+    second = get_reasons_page(1, database, after=first[-1][2], limit=3)
+    third = get_reasons_page(1, database, after=second[-1][2], limit=3)
+    assert [r for r, _, _ in first + second + third] == expected
+
+    back = get_reasons_page(1, database, before=second[0][2], limit=3)
+    assert back == first
+
+
+def test_export_reasons(database):
+    lines = export_reasons(1, database, batch_size=2).read().decode("utf8")
+    assert lines.splitlines() == [
+        format_reason(reason, REASONS.index(reason) % 2 or -1)
+        for reason in sorted(REASONS, key=str.casefold)
+    ]
+
+
+def test_format_reason_truncates():
+    assert format_reason("abcdef", 1, max_length=4) == " ＋ abc…"
+    assert format_reason("abcdef", 0) == " ＝ abcdef"
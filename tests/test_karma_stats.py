@@ -0,0 +1,65 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from karma.stats import KarmaStats
+from models import Base
+from models.karma import Karma, KarmaChange
+from models.user import User
+
+
+@pytest.fixture
+def database():
+    db_engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(db_engine)
+    db_session = Session(bind=db_engine, future=True)
+
+    alice = User(user_uid=1, username="alice")
+    bob = User(user_uid=2, username="bob")
+    db_session.add_all([alice, bob, Karma(name="foo", pluses=3, minuses=1)])
+    db_session.add(Karma(name="empty"))
+    db_session.flush()
+
+    changes = [
+        (bob, datetime(2023, 1, 1, 12, 0), 1),
+        (alice, datetime(2023, 1, 1, 12, 10), 1),
+        (alice, datetime(2023, 1, 1, 12, 20), -1),
+        (bob, datetime(2023, 1, 1, 12, 40), 1),
+    ]
+    score = 0
+    for message_id, (user, created_at, change) in enumerate(changes):
+        score += change
+        db_session.add(
+            KarmaChange(
+                karma_id=1,
+                user_id=user.id,
+                message_id=message_id,
+                created_at=created_at,
+                reason=None,
+                change=change,
+                score=score,
+            )
+        )
+    db_session.commit()
+
+    return db_session
+
+
+def test_karma_stats(database):
+    karma = database.query(Karma).filter(Karma.name == "foo").one()
+    stats = KarmaStats.for_karma(karma, database)
+
+    assert stats.changes == 4
+    assert stats.users == 2
+    # Tied on changes, bob karma'd it first
+    assert (stats.top_user_uid, stats.top_user_changes) == (2, 2)
+    assert stats.first_change.hour == 12
+    assert stats.mins_per_change == 10
+    assert stats.approval == 50
+
+
+def test_karma_stats_no_changes(database):
+    karma = database.query(Karma).filter(Karma.name == "empty").one()
+    assert KarmaStats.for_karma(karma, database) is None
@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import karma.leaderboard
+from karma.leaderboard import Leaderboards, Window, WindowTotals, window_start
+from models import Base
+from models.karma import Karma, KarmaChange
+from models.user import User
+
+
+@pytest.fixture
+def database():
+    db_engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(db_engine)
+    db_session = Session(bind=db_engine, future=True)
+
+    db_session.add(User(user_uid=1, username="foo"))
+    db_session.add_all(
+        [
+            Karma(name="a", score=3, pluses=3),
+            Karma(name="b", score=-2, minuses=2),
+            Karma(name="c", score=3, pluses=4, minuses=1),
+            Karma(name="d", score=0, neutrals=1),
+        ]
+    )
+    db_session.flush()
+    now = datetime.utcnow()
+    for message_id, (karma_id, change, age) in enumerate(
+        [(1, 1, timedelta(days=30)), (2, -1, timedelta(0)), (4, 0, timedelta(0))]
+    ):
+        db_session.add(
+            KarmaChange(
+                karma_id=karma_id,
+                user_id=1,
+                message_id=message_id,
+                created_at=now - age,
+                reason=None,
+                change=change,
+                score=0,
+            )
+        )
+    db_session.commit()
+
+    return db_session
+
+
+def test_all_time_leaderboards(database):
+    leaderboards = Leaderboards()
+
+    assert leaderboards.top(3, database) == [("a", 3), ("c", 3), ("d", 0)]
+    assert leaderboards.bottom(2, database) == [("b", -2), ("d", 0)]
+    assert leaderboards.most(1, database) == [("c", 5)]
+
+
+def test_record_updates_rankings(database):
+    leaderboards = Leaderboards()
+    leaderboards.load(database)
+
+    leaderboards.record(2, "b", 10, 3, 12, datetime.utcnow())
+    assert leaderboards.top(2, database) == [("b", 10), ("a", 3)]
+    assert leaderboards.bottom(1, database) == [("d", 0)]
+
+
+def test_record_before_load_is_ignored(database):
+    leaderboards = Leaderboards()
+    leaderboards.record(2, "b", 10, 3, 12, datetime.utcnow())
+    assert leaderboards.top(1, database) == [("a", 3)]
+
+
+def test_window_leaderboards(database):
+    leaderboards = Leaderboards()
+
+    assert leaderboards.bottom(5, database, Window.Today) == [("b", -1), ("d", 0)]
+    assert leaderboards.most(5, database, Window.Today) == [("b", 1), ("d", 1)]
+    leaderboards.record(1, "a", 4, 4, 1, datetime.utcnow())
+    assert leaderboards.top(1, database, Window.Today) == [("a", 1)]
+
+
+def test_window_totals_expire():
+    totals = WindowTotals()
+    start = datetime(2023, 7, 1)
+    totals.add(start, 1, "a", 1)
+    totals.add(start + timedelta(hours=1), 2, "b", -1)
+    totals.add(start + timedelta(hours=2), 1, "a", 1)
+    assert totals.rankings["top"].first(2) == [1, 2]
+    assert totals.totals == {1: (2, 2), 2: (-1, 1)}
+
+    totals.expire(start + timedelta(hours=1))
+    assert totals.totals == {1: (1, 1), 2: (-1, 1)}
+    totals.expire(start + timedelta(hours=2))
+    assert totals.totals == {1: (1, 1)}
+    assert totals.rankings["bottom"].first(5) == [1]
+    # Changes from before the window's start aren't counted
+    totals.add(start, 2, "b", 5)
+    assert totals.rankings["most"].first(5) == [1]
+
+
+def test_window_totals_capped(monkeypatch):
+    monkeypatch.setattr(karma.leaderboard, "MAX_WINDOW_CHANGES", 2)
+    totals = WindowTotals()
+    start = datetime(2023, 7, 1)
+    for hour, karma_id in enumerate([1, 2, 2]):
+        totals.add(start + timedelta(hours=hour), karma_id, "ab"[karma_id - 1], 1)
+    assert totals.totals == {2: (2, 2)}
+
+
+def test_window_start():
+    # Midday on a Wednesday in summer time
+    now = datetime(2023, 7, 5, 11, 0)
+    assert window_start(Window.Today, now) == datetime(2023, 7, 4, 23, 0)
+    assert window_start(Window.Week, now) == datetime(2023, 7, 2, 23, 0)
+    assert window_start(Window.Term, now) == now - timedelta(weeks=10)
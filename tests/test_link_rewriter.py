@@ -0,0 +1,55 @@
+import pytest
+
+from config import CONFIG
+from config.config import DEFAULT_LINK_REWRITES
+from utils.link_rewriter import LinkRewrite, LinkRewriter
+
+
+@pytest.fixture
+def rewriter():
+    return LinkRewriter([LinkRewrite(**rule) for rule in CONFIG.LINK_REWRITES])
+
+
+def test_no_links(rewriter):
+    assert rewriter.rewrite("just chatting about twitter.com") == []
+
+
+def test_unmatched_link(rewriter):
+    assert rewriter.rewrite("see https://example.com/x") == []
+
+
+def test_rewrites_every_rule_in_order(rewriter):
+    content = (
+        "look https://x.com/user/status/1 and\n"
+        "https://old.reddit.com/r/warwick also https://www.instagram.com/p/abc"
+    )
+    assert rewriter.rewrite(content) == [
+        "https://fxtwitter.com/user/status/1",
+        "https://rxddit.com/r/warwick",
+        "https://ddinstagram.com/p/abc",
+    ]
+
+
+def test_keeps_the_rest_of_the_word(rewriter):
+    assert rewriter.rewrite("(https://twitter.com/a)") == ["(https://fxtwitter.com/a)"]
+
+
+def test_replacement_groups():
+    rewriter = LinkRewriter(
+        [
+            LinkRewrite(r"https?://(\w+)\.example\.com", r"https://\1.org"),
+            LinkRewrite(r"https?://x\.com", "https://fxtwitter.com"),
+        ]
+    )
+    assert rewriter.rewrite("http://www.example.com/a http://x.com/b") == [
+        "https://www.org/a",
+        "https://fxtwitter.com/b",
+    ]
+
+
+def test_no_rules():
+    assert LinkRewriter([]).rewrite("https://x.com") == []
+
+
+def test_default_rules_match_example_config():
+    assert CONFIG.LINK_REWRITES == DEFAULT_LINK_REWRITES
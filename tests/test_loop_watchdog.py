@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+from utils.loop_watchdog import LoopWatchdog
+from utils.metrics import task_operations, timed_operation
+
+
+def block_the_loop():
+    time.sleep(0.5)
+
+
+async def slow_command():
+    with timed_operation("command", "!slow"):
+        block_the_loop()
+
+
+def test_stall_attributed():
+    async def run():
+        watchdog = LoopWatchdog(0.2)
+        watchdog.start()
+        await asyncio.sleep(0.2)
+        await asyncio.create_task(slow_command())
+        await asyncio.sleep(0.3)
+        watchdog.stop()
+        return watchdog
+
+    watchdog = asyncio.run(run())
+    assert len(watchdog.stalls) == 1
+    stall = watchdog.stalls[0]
+    assert stall.operation == "!slow"
+    assert "block_the_loop" in stall.stack
+    assert 0.3 < stall.seconds < 1
+    assert not task_operations
+
+
+def test_no_stalls():
+    async def run():
+        watchdog = LoopWatchdog(0.2)
+        watchdog.start()
+        for _ in range(5):
+            await asyncio.sleep(0.05)
+        watchdog.stop()
+        return watchdog
+
+    assert not asyncio.run(run()).stalls
+
+
+def test_nested_operations():
+    async def run():
+        with timed_operation("loop", "outer"):
+            with timed_operation("listener", "inner"):
+                assert task_operations[asyncio.current_task()] == "inner"
+            assert task_operations[asyncio.current_task()] == "outer"
+        assert asyncio.current_task() not in task_operations
+
+    asyncio.run(run())
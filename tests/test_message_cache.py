@@ -0,0 +1,72 @@
+import asyncio
+
+import discord
+import pretend
+from discord import Message
+
+from utils.message_cache import MessageCache
+
+
+def make_message(message_id, replying_to=None):
+    message = Message.__new__(Message)
+    message.id = message_id
+    message.reference = (
+        pretend.stub(message_id=replying_to.id, resolved=replying_to)
+        if replying_to is not None
+        else None
+    )
+    return message
+
+
+class StubChannel:
+    def __init__(self, messages):
+        self.messages = {message.id: message for message in messages}
+        self.fetches = 0
+
+    async def fetch_message(self, message_id):
+        self.fetches += 1
+        if message_id not in self.messages:
+            raise discord.NotFound(pretend.stub(status=404, reason="Not Found"), "")
+        return self.messages[message_id]
+
+
+def test_least_recently_used_is_dropped():
+    cache = MessageCache(max_size=2)
+    first, second, third = make_message(1), make_message(2), make_message(3)
+    cache.add(first)
+    cache.add(second)
+    assert cache.get(1) is first
+    cache.add(third)
+
+    assert len(cache) == 2
+    assert cache.get(2) is None
+    assert cache.get(1) is first
+
+
+def test_replied_to_messages_are_cached():
+    cache = MessageCache(max_size=10)
+    original = make_message(1)
+    cache.add(make_message(2, replying_to=original))
+    assert cache.get(1) is original
+
+    edited = make_message(1)
+    cache.edit(edited)
+    cache.edit(make_message(5))
+    assert cache.get(1) is edited
+    assert cache.get(5) is None
+
+    cache.remove(1)
+    assert cache.get(1) is None
+
+
+def test_fetch_only_asks_discord_on_a_miss():
+    cache = MessageCache(max_size=10)
+    channel = StubChannel([make_message(1)])
+
+    async def fetch_twice():
+        return [await cache.fetch(channel, 1), await cache.fetch(channel, 1)]
+
+    first, second = asyncio.run(fetch_twice())
+    assert first is second is channel.messages[1]
+    assert channel.fetches == 1
+    assert asyncio.run(cache.fetch(channel, 2)) is None
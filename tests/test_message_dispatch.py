@@ -0,0 +1,93 @@
+import asyncio
+
+import pretend
+from discord import Message
+from discord.abc import GuildChannel
+
+from config import CONFIG
+from tests.stubs import IRC_USER, TEST_USER, make_message_stub
+from utils.message_dispatch import MessageDispatch, MessageInfo
+
+BOT = pretend.stub(command_prefix=lambda bot, message: ["!"], user=pretend.stub(id=1))
+
+
+class StubGuildChannel(GuildChannel):
+    def __init__(self, fetched=None):
+        self.fetches = 0
+        self.fetched = fetched
+
+    async def fetch_message(self, message_id):
+        self.fetches += 1
+        await asyncio.sleep(0)
+        return self.fetched
+
+
+def make_message(content, author=TEST_USER, channel=None, reference=None):
+    message = make_message_stub(content, pretend.stub(bot=False, id=author.id))
+    message.channel = channel if channel is not None else StubGuildChannel()
+    message.reference = reference
+    return message
+
+
+def make_resolved(author_id):
+    resolved = Message.__new__(Message)
+    resolved.author = pretend.stub(id=author_id)
+    return resolved
+
+
+def test_classify_irc_command(monkeypatch):
+    monkeypatch.setattr(CONFIG, "UWCS_DISCORD_BRIDGE_BOT_ID", IRC_USER.id)
+    info = MessageInfo.classify(BOT, make_message("**<nick>** !karma foo", IRC_USER))
+
+    assert info.irc and not info.from_bot
+    assert info.content == "!karma foo"
+    assert info.is_command
+    assert info.in_guild
+    assert not info.may_reply_to_bot
+
+
+def test_classify_replies():
+    to_bot = pretend.stub(message_id=5, resolved=make_resolved(1))
+    to_user = pretend.stub(message_id=5, resolved=make_resolved(2))
+    unresolved = pretend.stub(message_id=5, resolved=None)
+
+    assert MessageInfo.classify(BOT, make_message("ty", reference=to_bot)).reply_to_bot
+    info = MessageInfo.classify(BOT, make_message("ty", reference=to_user))
+    assert info.reply_to_bot is False and not info.may_reply_to_bot
+    info = MessageInfo.classify(BOT, make_message("ty", reference=unresolved))
+    assert info.reply_to_bot is None and info.may_reply_to_bot
+
+
+def test_dispatch_routes_to_matching_handlers():
+    dispatch = MessageDispatch()
+    replied = pretend.stub(id=5, reference=None)
+    channel = StubGuildChannel(fetched=replied)
+    reference = pretend.stub(message_id=5, resolved=None)
+    handled = []
+
+    async def replies(info):
+        handled.append(("replies", await info.fetch_reply()))
+
+    async def replies_too(info):
+        handled.append(("replies_too", await info.fetch_reply()))
+
+    async def commands(info):
+        handled.append(("commands", info.content))
+
+    async def broken(info):
+        raise ValueError
+
+    dispatch.register(replies, lambda info: info.reply_to_id is not None)
+    dispatch.register(replies_too, lambda info: info.reply_to_id is not None)
+    dispatch.register(commands, lambda info: info.is_command)
+    dispatch.register(broken)
+    asyncio.run(
+        dispatch.dispatch(BOT, make_message("hi", channel=channel, reference=reference))
+    )
+
+    assert sorted(handled) == [("replies", replied), ("replies_too", replied)]
+    # Fetched once between the handlers, and only for an unresolved reply
+    assert channel.fetches == 1
+
+    dispatch.unregister(replies)
+    assert len(dispatch._handlers) == 3
@@ -0,0 +1,39 @@
+import pytest
+
+from models.models import current_operation, query_stats
+from utils.metrics import Histogram, Metrics, metrics, timed_operation
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram(buckets=(1, 2, 4))
+    for value in (0.5, 1, 1.5, 3, 100):
+        histogram.observe(value)
+
+    assert histogram.counts == [2, 1, 1, 1]
+    assert histogram.mean == pytest.approx(21.2)
+    assert histogram.quantile(0.5) == pytest.approx(1.5)
+    # Above the largest bucket can only be estimated as that bucket
+    assert histogram.quantile(0.99) == 4
+    assert Histogram().quantile(0.5) == 0
+
+
+def test_render_prometheus_text():
+    test_metrics = Metrics()
+    test_metrics.observe("command", '!say "hi"', 0.02)
+
+    text = test_metrics.render()
+    labels = 'kind="command",name="!say \\"hi\\""'
+    assert f'apollo_latency_seconds_bucket{{{labels},le="0.01"}} 0' in text
+    assert f'apollo_latency_seconds_bucket{{{labels},le="0.025"}} 1' in text
+    assert f'apollo_latency_seconds_bucket{{{labels},le="+Inf"}} 1' in text
+    assert f"apollo_latency_seconds_count{{{labels}}} 1" in text
+    assert "# TYPE apollo_db_statements_total counter" in text
+
+
+def test_timed_operation():
+    with timed_operation("loop", "test_loop"):
+        assert current_operation.get() == "test_loop"
+    assert current_operation.get() is None
+
+    assert metrics.latency["loop", "test_loop"].count == 1
+    assert query_stats.totals["test_loop"].invocations == 1
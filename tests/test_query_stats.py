@@ -0,0 +1,41 @@
+import asyncio
+
+from sqlalchemy import create_engine, text
+
+from models.models import QueryStats, current_operation, query_stats, track_queries
+
+
+def test_take_recent_resets_recent_only():
+    stats = QueryStats()
+    stats.invoked("!karma")
+    stats.executed("!karma", 0.5)
+    stats.executed("!karma", 0.5)
+
+    recent = stats.take_recent()
+    assert recent["!karma"].statements_per_invocation == 2
+    assert recent["!karma"].ms_per_invocation == 1000
+    assert not stats.recent
+    assert stats.totals["!karma"].statements == 2
+
+
+def test_statements_are_attributed_to_the_current_operation():
+    engine = create_engine("sqlite:///:memory:")
+    track_queries(engine)
+
+    async def run(operation):
+        if operation is not None:
+            current_operation.set(operation)
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            connection.execute(text("SELECT 2"))
+
+    async def main():
+        await asyncio.gather(
+            asyncio.create_task(run("!test perf")),
+            asyncio.create_task(run(None), name="test perf task"),
+        )
+
+    asyncio.run(main())
+    assert query_stats.totals["!test perf"].statements == 2
+    assert query_stats.totals["test perf task"].statements == 2
+    assert current_operation.get() is None
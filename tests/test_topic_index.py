@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from karma.topic_index import TopicIndex, trigrams
+from models import Base
+from models.karma import Karma
+
+TOPICS = ["apollo", "Apple", "pineapple", "python", "Pythonista", "foo bar"]
+
+
+@pytest.fixture(scope="module")
+def database():
+    db_engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(db_engine)
+    db_session = Session(bind=db_engine, future=True)
+
+    db_session.add_all([Karma(name=name) for name in TOPICS])
+    db_session.commit()
+
+    return db_session
+
+
+def test_trigrams():
+    assert trigrams("ab") == {"  a", " ab", "ab "}
+    assert trigrams("ab", partial=True) == {"  a", " ab"}
+
+
+def test_similar_suggests_typos(database):
+    index = TopicIndex()
+    assert index.similar("apolo", database) == ["apollo"]
+    assert index.similar("pythn", database)[0] == "python"
+    assert index.similar("FOO_BAR", database) == ["foo bar"]
+    assert index.similar("zzz", database) == []
+
+
+def test_complete_prefers_short_prefix_matches(database):
+    index = TopicIndex()
+    assert index.complete("pyth", database)[:2] == ["python", "Pythonista"]
+    assert index.complete("", database) == []
+
+
+def test_add_after_load(database):
+    index = TopicIndex()
+    index.add("ignored before load")
+    index.load(database)
+    index.add("applesauce")
+    index.add("APPLE")
+
+    assert "applesauce" in index.complete("applesa", database)
+    assert index.similar("apple", database, threshold=1) == ["Apple"]
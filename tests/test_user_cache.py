@@ -0,0 +1,157 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models import Base, create_async_engine_for
+from models.user import User
+from utils.user_cache import UserCache
+
+
+@pytest.fixture
+def database():
+    db_engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(db_engine)
+    db_session = Session(bind=db_engine, future=True)
+
+    db_session.add(User(user_uid=1234, username="foo"))
+    db_session.commit()
+
+    return db_session
+
+
+def test_lookup_caches_ids(database):
+    statements = []
+    event.listen(
+        database.get_bind(),
+        "before_cursor_execute",
+        lambda *args: statements.append(args[2]),
+    )
+    cache = UserCache()
+
+    user_id = cache.lookup(1234, database)
+    assert user_id == database.query(User.id).scalar()
+    statements.clear()
+    assert cache.lookup(1234, database) == user_id
+    assert statements == []
+
+
+def test_lookup_does_not_cache_misses(database):
+    cache = UserCache()
+    assert cache.lookup(5678, database) is None
+    assert len(cache) == 0
+
+    database.add(User(user_uid=5678, username="bar"))
+    database.commit()
+    assert cache.lookup(5678, database) is not None
+
+
+class DiscordUser:
+    def __init__(self, id, name):
+        self.id = id
+        self.name = name
+
+    def __str__(self):
+        return self.name
+
+
+def test_ensure_inserts_new_users(database):
+    cache = UserCache()
+    user_id = asyncio.run(cache.ensure(database, DiscordUser(5678, "bar")))
+
+    user = database.query(User).filter(User.user_uid == 5678).one()
+    assert (user.id, user.username) == (user_id, "bar")
+
+
+def test_ensure_updates_existing_users(database):
+    cache = UserCache()
+    user_id = asyncio.run(cache.ensure(database, DiscordUser(1234, "renamed")))
+
+    user = database.query(User).one()
+    assert (user.id, user.username) == (user_id, "renamed")
+
+
+def test_ensure_caches_ids(database):
+    statements = []
+    event.listen(
+        database.get_bind(),
+        "before_cursor_execute",
+        lambda *args: statements.append(args[2]),
+    )
+    cache = UserCache()
+
+    user_id = asyncio.run(cache.ensure(database, DiscordUser(1234, "foo")))
+    statements.clear()
+    assert asyncio.run(cache.ensure(database, DiscordUser(1234, "foo"))) == user_id
+    assert statements == []
+    assert cache.lookup(1234, database) == user_id
+
+
+def test_flush_writes_latest_times(database):
+    cache = UserCache()
+    user_id = database.query(User.id).scalar()
+    cache.seen(user_id, datetime(2023, 1, 1))
+    cache.seen(user_id, datetime(2023, 1, 2))
+    asyncio.run(cache.flush(database))
+
+    assert database.query(User.last_seen).scalar() == datetime(2023, 1, 2)
+
+
+def test_flush_keeps_times_on_failure(database):
+    cache = UserCache()
+    user_id = database.query(User.id).scalar()
+    cache.seen(user_id, datetime(2023, 1, 1))
+    database.execute(text("ALTER TABLE users RENAME TO users_old"))
+    asyncio.run(cache.flush(database))
+    database.execute(text("ALTER TABLE users_old RENAME TO users"))
+
+    asyncio.run(cache.flush(database))
+    assert database.query(User.last_seen).scalar() == datetime(2023, 1, 1)
+
+
+def test_async_session(tmp_path):
+    async def run():
+        engine = create_async_engine_for(f"sqlite:///{tmp_path}/apollo.db")
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        cache = UserCache()
+        async with AsyncSession(bind=engine) as session:
+            user_id = await cache.ensure(session, DiscordUser(1234, "foo"))
+            cache.seen(user_id, datetime(2023, 1, 1))
+            await cache.flush(session)
+            user = (await session.execute(select(User))).scalar_one()
+        await engine.dispose()
+        return user_id, user
+
+    user_id, user = asyncio.run(run())
+    assert (user.id, user.username, user.last_seen) == (
+        user_id,
+        "foo",
+        datetime(2023, 1, 1),
+    )
+
+
+@pytest.fixture
+def database_without_on_conflict(database, monkeypatch):
+    # Databases other than PostgreSQL and SQLite look for the user, then insert or update
+    monkeypatch.setattr(database.get_bind().dialect, "name", "mysql")
+    return database
+
+
+def test_ensure_inserts_without_on_conflict(database_without_on_conflict):
+    database = database_without_on_conflict
+    user_id = asyncio.run(UserCache().ensure(database, DiscordUser(5678, "bar")))
+
+    user = database.query(User).filter(User.user_uid == 5678).one()
+    assert (user.id, user.username) == (user_id, "bar")
+
+
+def test_ensure_updates_without_on_conflict(database_without_on_conflict):
+    database = database_without_on_conflict
+    user_id = asyncio.run(UserCache().ensure(database, DiscordUser(1234, "renamed")))
+
+    user = database.query(User).one()
+    assert (user.id, user.username) == (user_id, "renamed")
@@ -0,0 +1,66 @@
+import asyncio
+
+from discord.ext.commands import Bot
+
+from models import db_session
+from models.channel_settings import IgnoredChannel, MiniKarmaChannel
+from utils.metrics import timed_operation
+
+
+class ChannelSettings:
+    """In-memory copy of the ignored and mini-karma channels.
+
+    Every command and karma message needs these, so they are held as sets of channel IDs.
+    The admin commands keep them up to date after changing the tables.
+    """
+
+    def __init__(self):
+        self.ignored: set[int] = set()
+        self.mini_karma: set[int] = set()
+        self._loaded = False
+
+    def load(self):
+        ignored: list[IgnoredChannel] = db_session.query(IgnoredChannel).all()
+        mini_karma: list[MiniKarmaChannel] = db_session.query(MiniKarmaChannel).all()
+        self.ignored = {c.channel for c in ignored}
+        self.mini_karma = {c.channel for c in mini_karma}
+        self._loaded = True
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def is_ignored(self, channel_id: int) -> bool:
+        self._ensure_loaded()
+        return channel_id in self.ignored
+
+    def is_mini_karma(self, channel_id: int) -> bool:
+        self._ensure_loaded()
+        return channel_id in self.mini_karma
+
+    def set_ignored(self, channel_id: int, ignored: bool):
+        self._ensure_loaded()
+        if ignored:
+            self.ignored.add(channel_id)
+        else:
+            self.ignored.discard(channel_id)
+
+    def set_mini_karma(self, channel_id: int, mini_karma: bool):
+        self._ensure_loaded()
+        if mini_karma:
+            self.mini_karma.add(channel_id)
+        else:
+            self.mini_karma.discard(channel_id)
+
+
+channel_settings = ChannelSettings()
+
+
+async def channel_settings_refresh(bot: Bot, interval: int):
+    """Reloads the channel settings every interval (sec) in case the tables were changed elsewhere"""
+    await bot.wait_until_ready()
+
+    while not bot.is_closed():
+        await asyncio.sleep(interval)
+        with timed_operation("loop", "channel_settings_refresh"):
+            channel_settings.load()
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+from typing import Any
+
+import aiohttp
+
+# Connections open at once, in total and to any one host
+CONNECTION_LIMIT = 100
+CONNECTION_LIMIT_PER_HOST = 10
+# Time (sec) resolved hostnames are kept
+DNS_CACHE_TTL = 300
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=30, connect=10)
+# Attempts at a request which can safely be repeated, backing off exponentially
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF = 0.5
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class HttpClient:
+    """The HTTP client every outbound request goes through.
+
+    One session is shared, so connections (and their TLS handshakes) and resolved
+    hostnames are reused between requests rather than set up for each one. Requests time
+    out by default, and ones which can safely be repeated are retried a few times if
+    the connection fails or the server is unavailable.
+    """
+
+    def __init__(self):
+        self._session: aiohttp.ClientSession | None = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # Made on first use since it needs the running event loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=CONNECTION_LIMIT,
+                limit_per_host=CONNECTION_LIMIT_PER_HOST,
+                ttl_dns_cache=DNS_CACHE_TTL,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=DEFAULT_TIMEOUT
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def request(
+        self, method: str, url: str, **kwargs: Any
+    ) -> aiohttp.ClientResponse:
+        """Make a request, taking the same arguments as `aiohttp.ClientSession.request`.
+
+        The response's body must be read or the response released, to return its
+        connection to the pool.
+        """
+        attempts = MAX_ATTEMPTS if method.upper() in IDEMPOTENT_METHODS else 1
+        for attempt in range(1, attempts + 1):
+            try:
+                response = await self.session.request(method, url, **kwargs)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt == attempts:
+                    raise
+                logging.info(f"{method} {url} failed ({e!r}), retrying")
+            else:
+                if response.status not in RETRY_STATUSES or attempt == attempts:
+                    return response
+                logging.info(f"{method} {url} returned {response.status}, retrying")
+                response.release()
+            await asyncio.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+        raise AssertionError("unreachable")
+
+    async def get(self, url: str, **kwargs: Any) -> aiohttp.ClientResponse:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> aiohttp.ClientResponse:
+        return await self.request("POST", url, **kwargs)
+
+
+http_client = HttpClient()
@@ -0,0 +1,47 @@
+import re
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class LinkRewrite:
+    # a regex for the links to rewrite
+    pattern: str
+    # what the part of a word the pattern matches is replaced with, which may refer to
+    # the pattern's groups
+    replacement: str
+
+
+class LinkRewriter:
+    """Rewrites links in a message to sites which embed better, e.g. twitter to fxtwitter.
+
+    The rules are compiled into a single regex, so finding every link to rewrite in a
+    message is one pass over it, and messages without "http" in them aren't searched at
+    all.
+    """
+
+    def __init__(self, rules: list[LinkRewrite]):
+        self.rules = rules
+        self._patterns = [re.compile(rule.pattern) for rule in rules]
+        # Each rule is its own named group, so which one matched is the match's lastgroup
+        # (with no rules, a regex which never matches)
+        links = (
+            "|".join(f"(?P<rule{i}>{rule.pattern})" for i, rule in enumerate(rules))
+            or "(?!)"
+        )
+        self._links = re.compile(links)
+        # Whole (whitespace separated) words containing a link
+        self._words = re.compile(rf"(?<!\S)\S*?(?:{links})\S*")
+
+    def _rewrite_link(self, match: re.Match[str]) -> str:
+        assert match.lastgroup is not None
+        i = int(match.lastgroup.removeprefix("rule"))
+        return self._patterns[i].sub(self.rules[i].replacement, match.group())
+
+    def rewrite(self, content: str) -> list[str]:
+        """The words of content containing links to rewrite, rewritten"""
+        if "http" not in content:
+            return []
+        return [
+            self._links.sub(self._rewrite_link, word.group())
+            for word in self._words.finditer(content)
+        ]
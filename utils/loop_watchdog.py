@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import sys
+import threading
+import traceback
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from time import perf_counter
+
+from utils.metrics import task_operations
+
+# Time (sec) between the loop's heartbeats, and between the watchdog checking them
+HEARTBEAT_INTERVAL = 0.1
+# The number of recent stalls kept
+MAX_STALLS = 50
+
+
+@dataclass
+class Stall:
+    """A time the event loop was blocked, and what it was running when noticed"""
+
+    at: datetime
+    operation: str
+    stack: str
+    # how long the loop was blocked, updated once it's running again
+    seconds: float
+
+
+def _running_operation(loop: asyncio.AbstractEventLoop) -> str:
+    task = asyncio.current_task(loop)
+    if task is None:
+        # a callback rather than a task
+        return "other"
+    return task_operations.get(task) or task.get_name()
+
+
+class LoopWatchdog:
+    """Notices the event loop being blocked, and what is blocking it.
+
+    A task on the loop beats every HEARTBEAT_INTERVAL, and a thread checks the beats.
+    Once a beat is over `threshold` late, the thread captures the loop thread's stack
+    and the command, listener or background loop running there. The stall is logged,
+    and kept in `stalls` with its full length once the loop recovers.
+    """
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self.stalls: deque[Stall] = deque(maxlen=MAX_STALLS)
+        self._last_beat = perf_counter()
+        # the stall the loop is currently in, and the beat it's late after
+        self._stall: Stall | None = None
+        self._stall_beat: float | None = None
+        self._stopped = threading.Event()
+        self._heartbeat: asyncio.Task[None] | None = None
+
+    def start(self):
+        """Start watching the running event loop, so must be called from it"""
+        loop = asyncio.get_running_loop()
+        self._last_beat = perf_counter()
+        self._heartbeat = loop.create_task(self._beat(), name="loop_watchdog")
+        threading.Thread(
+            target=self._watch,
+            args=(loop, threading.get_ident()),
+            name="loop_watchdog",
+            daemon=True,
+        ).start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+
+    async def _beat(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            now = perf_counter()
+            stall = self._stall
+            # Unless the watchdog noticed the stall just after it ended
+            if stall is not None and self._stall_beat == self._last_beat:
+                stall.seconds = now - self._last_beat - HEARTBEAT_INTERVAL
+                logging.warning(
+                    "Event loop was blocked for %.2fs in %s",
+                    stall.seconds,
+                    stall.operation,
+                )
+            self._stall = None
+            self._last_beat = now
+
+    def _watch(self, loop: asyncio.AbstractEventLoop, loop_thread: int):
+        while not self._stopped.wait(HEARTBEAT_INTERVAL):
+            last_beat = self._last_beat
+            lag = perf_counter() - last_beat - HEARTBEAT_INTERVAL
+            if lag < self.threshold or self._stall_beat == last_beat:
+                continue
+
+            # The only way to see another thread's stack, which is the point of this
+            frame = sys._current_frames().get(  # pyright: ignore[reportPrivateUsage]
+                loop_thread
+            )
+            stack = "".join(traceback.format_stack(frame)) if frame else ""
+            stall = Stall(datetime.now(), _running_operation(loop), stack, lag)
+            self._stall_beat = last_beat
+            self._stall = stall
+            self.stalls.append(stall)
+            logging.warning(
+                "Event loop blocked for over %.2fs in %s:\n%s",
+                lag,
+                stall.operation,
+                stack,
+            )
@@ -0,0 +1,64 @@
+from collections import OrderedDict
+
+import discord
+from discord import Message
+
+from config import CONFIG
+
+
+class MessageCache:
+    """The most recently seen messages by ID, so looking up a reply needn't go to discord.
+
+    Fed with every message from the gateway (and the messages they reply to, which
+    discord sends along with them) and kept up to date with edits and deletions. The
+    least recently used message is dropped once there are `max_size`.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._messages: OrderedDict[int, Message] = OrderedDict()
+
+    def __len__(self):
+        return len(self._messages)
+
+    def add(self, message: Message):
+        reference = message.reference
+        if reference is not None and isinstance(reference.resolved, Message):
+            self._put(reference.resolved)
+        self._put(message)
+        while len(self._messages) > self.max_size:
+            self._messages.popitem(last=False)
+
+    def _put(self, message: Message):
+        self._messages[message.id] = message
+        self._messages.move_to_end(message.id)
+
+    def edit(self, message: Message):
+        """Replace a cached message with its edited version"""
+        if message.id in self._messages:
+            self._messages[message.id] = message
+
+    def remove(self, message_id: int):
+        self._messages.pop(message_id, None)
+
+    def get(self, message_id: int) -> Message | None:
+        message = self._messages.get(message_id)
+        if message is not None:
+            self._messages.move_to_end(message_id)
+        return message
+
+    async def fetch(
+        self, channel: discord.abc.Messageable, message_id: int
+    ) -> Message | None:
+        """The message from the cache, or from discord on a miss (None if it's gone)"""
+        message = self.get(message_id)
+        if message is None:
+            try:
+                message = await channel.fetch_message(message_id)
+            except discord.NotFound:
+                return None
+            self.add(message)
+        return message
+
+
+message_cache = MessageCache(CONFIG.MESSAGE_CACHE_SIZE)
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+import discord
+from discord import Message
+from discord.abc import GuildChannel
+from discord.ext.commands import Bot
+
+from utils.message_cache import message_cache
+from utils.metrics import timed_operation
+from utils.utils import user_is_irc_bot
+
+
+async def fetch_reply(message: Message) -> Message | None:
+    """The message replied to, using the copy discord sends with the reply if there is one
+    or the message cache, and only asking discord for it if neither has it
+    """
+    reference = message.reference
+    if reference is None or reference.message_id is None:
+        return None
+    if isinstance(reference.resolved, Message):
+        return reference.resolved
+    if isinstance(reference.resolved, discord.DeletedReferencedMessage):
+        return None
+    return await message_cache.fetch(message.channel, reference.message_id)
+
+
+@dataclass
+class MessageInfo:
+    """What the message handlers need to know about a message, worked out once"""
+
+    message: Message
+    # the content without the nick of an irc message
+    content: str
+    # sent by a bot other than the irc bridge
+    from_bot: bool
+    irc: bool
+    in_guild: bool
+    # starts with one of the bot's command prefixes
+    is_command: bool
+    reply_to_id: int | None
+    # whether the message replied to is the bot's, if discord sent it with the reply
+    reply_to_bot: bool | None
+    _reply: "asyncio.Task[Message | None] | None" = field(
+        default=None, init=False, repr=False
+    )
+
+    @classmethod
+    def classify(cls, bot: Bot, message: Message) -> "MessageInfo":
+        irc = user_is_irc_bot(message)
+        content = message.content
+        if irc:
+            # Strip up to the first ">** ", since irc nicks can't have <, > in them
+            content = content[content.find(">** ") + 4 :]
+
+        reference = message.reference
+        reply_to_id = reference.message_id if reference is not None else None
+        reply_to_bot = None
+        if reference is not None and isinstance(reference.resolved, Message):
+            reply_to_bot = bot.user is not None and (
+                reference.resolved.author.id == bot.user.id
+            )
+
+        # when_mentioned_or, so a list of prefixes rather than an awaitable
+        prefixes: list[str] = bot.command_prefix(bot, message)  # type: ignore
+        return cls(
+            message=message,
+            content=content,
+            from_bot=message.author.bot and not irc,
+            irc=irc,
+            in_guild=isinstance(message.channel, GuildChannel),
+            is_command=content.startswith(tuple(prefixes)),
+            reply_to_id=reply_to_id,
+            reply_to_bot=reply_to_bot,
+        )
+
+    @property
+    def may_reply_to_bot(self) -> bool:
+        """Whether the message is a reply which could be to the bot, without fetching it"""
+        return self.reply_to_id is not None and self.reply_to_bot is not False
+
+    async def fetch_reply(self) -> Message | None:
+        """The message replied to, fetched at most once between the handlers"""
+        if self._reply is None:
+            self._reply = asyncio.ensure_future(fetch_reply(self.message))
+        return await self._reply
+
+
+Predicate = Callable[[MessageInfo], bool]
+Handler = Callable[[MessageInfo], Awaitable[None]]
+
+
+class MessageDispatch:
+    """Routes each message to the handlers interested in it.
+
+    Rather than every cog listening for messages and each working out the same things,
+    a message is classified once and passed to the handlers whose predicate accepts it.
+    Matching handlers run concurrently, as separate listeners would, and are timed and
+    attributed like listeners.
+    """
+
+    def __init__(self):
+        self._handlers: dict[str, tuple[Predicate, Handler]] = {}
+
+    def register(self, handler: Handler, predicate: Predicate = lambda info: True):
+        # Keyed by name so that reloading a cog replaces its handler
+        self._handlers[handler.__qualname__] = (predicate, handler)
+
+    def unregister(self, handler: Handler):
+        self._handlers.pop(handler.__qualname__, None)
+
+    async def dispatch(self, bot: Bot, message: Message):
+        info = MessageInfo.classify(bot, message)
+        matched = [
+            (name, handler)
+            for name, (predicate, handler) in self._handlers.items()
+            if predicate(info)
+        ]
+        await asyncio.gather(
+            *(self._run(name, handler, info) for name, handler in matched)
+        )
+
+    @staticmethod
+    async def _run(name: str, handler: Handler, info: MessageInfo):
+        try:
+            with timed_operation("listener", name):
+                await handler(info)
+        except Exception:
+            logging.exception(f"Error handling message in {name}")
+
+
+message_dispatch = MessageDispatch()
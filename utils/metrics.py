@@ -0,0 +1,158 @@
+import asyncio
+from bisect import bisect_left
+from collections.abc import Generator
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Any
+
+from aiohttp import web
+
+from models.models import current_operation, query_stats
+
+# Upper bounds (sec) of the latency histogram buckets, the same as Prometheus' defaults
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Histogram:
+    """Counts of observations in fixed buckets, plus their count and sum"""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        # the last count is for observations above every bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0
+
+    def quantile(self, q: float) -> float:
+        """An estimate of the q-quantile, interpolating within its bucket like Prometheus"""
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return 0
+
+
+def _labels(**labels: str) -> str:
+    escaped = (
+        (k, v.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"))
+        for k, v in labels.items()
+    )
+    return ",".join(f'{k}="{v}"' for k, v in escaped)
+
+
+class Metrics:
+    """Latency histograms of the commands, listeners and background loops.
+
+    Each histogram is keyed by kind (command, listener or loop) and operation name, the
+    same name the operation's database use is attributed to in `query_stats`.
+    """
+
+    def __init__(self):
+        self.latency: dict[tuple[str, str], Histogram] = {}
+
+    def observe(self, kind: str, name: str, seconds: float):
+        histogram = self.latency.get((kind, name))
+        if histogram is None:
+            histogram = self.latency[kind, name] = Histogram()
+        histogram.observe(seconds)
+
+    def render(self) -> str:
+        """The metrics in the Prometheus text exposition format"""
+        lines = [
+            "# HELP apollo_latency_seconds Latency of commands, listeners and background loop iterations.",
+            "# TYPE apollo_latency_seconds histogram",
+        ]
+        for (kind, name), histogram in sorted(self.latency.items()):
+            labels = _labels(kind=kind, name=name)
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(
+                    f'apollo_latency_seconds_bucket{{{labels},le="{bound}"}} {cumulative}'
+                )
+            lines += [
+                f'apollo_latency_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}',
+                f"apollo_latency_seconds_sum{{{labels}}} {histogram.sum}",
+                f"apollo_latency_seconds_count{{{labels}}} {histogram.count}",
+            ]
+
+        lines += [
+            "# HELP apollo_db_statements_total SQL statements run by each operation.",
+            "# TYPE apollo_db_statements_total counter",
+        ]
+        operations = sorted(query_stats.totals.items())
+        for operation, stats in operations:
+            labels = _labels(operation=operation)
+            lines.append(f"apollo_db_statements_total{{{labels}}} {stats.statements}")
+        lines += [
+            "# HELP apollo_db_seconds_total Time spent in the database by each operation.",
+            "# TYPE apollo_db_seconds_total counter",
+        ]
+        for operation, stats in operations:
+            labels = _labels(operation=operation)
+            lines.append(f"apollo_db_seconds_total{{{labels}}} {stats.db_time}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+# The operation being timed in each task, for the loop watchdog, which can't see the
+# task's context from its thread
+task_operations: dict[asyncio.Task[Any], str] = {}
+
+
+@contextmanager
+def timed_operation(kind: str, name: str) -> Generator[None, None, None]:
+    """Record the latency of the block, and attribute its database use to `name`"""
+    query_stats.invoked(name)
+    token = current_operation.set(name)
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    outer: str | None = None
+    if task is not None:
+        outer = task_operations.get(task)
+        task_operations[task] = name
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        metrics.observe(kind, name, perf_counter() - start)
+        current_operation.reset(token)
+        if task is not None:
+            if outer is None:
+                del task_operations[task]
+            else:
+                task_operations[task] = outer
+
+
+async def _metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(
+        body=metrics.render().encode(),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
+
+
+async def serve_metrics(port: int) -> web.AppRunner:
+    """Serve the metrics at /metrics on localhost, until the returned runner is cleaned up"""
+    app = web.Application()
+    app.router.add_get("/metrics", _metrics_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
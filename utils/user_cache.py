@@ -0,0 +1,108 @@
+import asyncio
+import logging
+from datetime import datetime
+
+import discord
+from discord.ext.commands import Bot
+from sqlalchemy import update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from config import CONFIG
+from models import async_session, run_sync, upsert
+from models.user import User
+from utils.metrics import timed_operation
+
+
+def _upsert(session: Session, user: discord.User | discord.Member) -> int:
+    return upsert(
+        session,
+        User,
+        {"user_uid": user.id, "username": str(user)},
+        [User.user_uid],
+        lambda excluded: {"username": excluded.username},
+        returning=User.id,
+    )
+
+
+class UserCache:
+    """Maps discord user IDs to `users.id` and buffers `last_seen` updates.
+
+    Every message marks its author as seen, so rather than a write per message the times
+    are held here and written in one bulk UPDATE by `flush`. The ID mapping never goes
+    stale since users are never deleted, so it is kept for every user seen.
+    """
+
+    def __init__(self):
+        self._ids: dict[int, int] = {}
+        self._last_seen: dict[int, datetime] = {}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def lookup(self, user_uid: int, db_session: Session) -> int | None:
+        """The `users.id` for a discord user ID, querying on a miss"""
+        user_id = self._ids.get(user_uid)
+        if user_id is None:
+            user_id = (
+                db_session.query(User.id).filter(User.user_uid == user_uid).scalar()
+            )
+            if user_id is not None:
+                self._ids[user_uid] = user_id
+        return user_id
+
+    async def ensure(
+        self, session: AsyncSession | Session, user: discord.User | discord.Member
+    ) -> int:
+        """The `users.id` for a discord user, upserting the user on a miss"""
+        user_id = self._ids.get(user.id)
+        if user_id is None:
+
+            def upsert(sync_session: Session) -> int:
+                user_id = _upsert(sync_session, user)
+                sync_session.commit()
+                return user_id
+
+            user_id = await run_sync(session, upsert)
+            self._ids[user.id] = user_id
+        return user_id
+
+    def seen(self, user_id: int, at: datetime):
+        self._last_seen[user_id] = at
+
+    async def flush(self, session: AsyncSession | Session):
+        """Write the buffered `last_seen` times in a single bulk UPDATE"""
+        if not self._last_seen:
+            return
+        pending, self._last_seen = self._last_seen, {}
+
+        def write(sync_session: Session):
+            sync_session.execute(
+                update(User),
+                [{"id": id_, "last_seen": at} for id_, at in pending.items()],
+            )
+            sync_session.commit()
+
+        try:
+            await run_sync(session, write)
+        except SQLAlchemyError as e:
+            await run_sync(session, lambda sync_session: sync_session.rollback())
+            logging.exception(e)
+            # Keep the times for the next flush, unless a newer one has come in since
+            for id_, at in pending.items():
+                self._last_seen.setdefault(id_, at)
+
+
+user_cache = UserCache()
+
+
+async def user_cache_flush(bot: Bot):
+    """Periodically writes the buffered `last_seen` times"""
+    await bot.wait_until_ready()
+
+    while not bot.is_closed():
+        await asyncio.sleep(CONFIG.USER_LAST_SEEN_FLUSH_INTERVAL)
+        with timed_operation("loop", "user_cache_flush"):
+            async with async_session() as session:
+                await user_cache.flush(session)
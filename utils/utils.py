@@ -8,7 +8,6 @@ from decimal import Decimal, InvalidOperation
 from io import BytesIO
 from typing import Any, Callable, Coroutine, Iterable, ParamSpec, Tuple, TypeAlias
 
-import aiohttp
 import dateparser
 import discord
 from discord.ext.commands import Bot, Context
@@ -18,7 +17,11 @@ from config import CONFIG
 from models import db_session
 from models.user import User
 
+# Aliased so utils' star import doesn't shadow the submodules with their instances
+from .http_client import http_client as _http_client
+from .metrics import timed_operation
 from .typing import Identifiable
+from .user_cache import user_cache as _user_cache
 
 
 class EnumGet:
@@ -68,7 +71,8 @@ def format_list_of_members(members: Iterable[discord.Member], /, *, ping: bool =
 
 
 def get_database_user_from_id(id_: int, /) -> User | None:
-    return db_session.query(User).filter(User.user_uid == id_).one_or_none()
+    user_id = _user_cache.lookup(id_, db_session)
+    return db_session.get(User, user_id) if user_id is not None else None
 
 
 def get_database_user(user: Identifiable, /) -> User | None:
@@ -184,8 +188,9 @@ def parse_time(time: str, /):
     return parsed_time
 
 
-def pluralise(el: list[Any], /, word: str, single: str = "", plural: str = "s"):
-    if len(el) > 1:
+def pluralise(el: list[Any] | int, /, word: str, single: str = "", plural: str = "s"):
+    count = el if isinstance(el, int) else len(el)
+    if count > 1:
         return word + plural
     else:
         return word + single
@@ -270,7 +275,7 @@ P = ParamSpec("P")
 
 
 def wait_react(
-    func: Callable[P, Coroutine[Any, Any, None]]
+    func: Callable[P, Coroutine[Any, Any, None]],
 ) -> Callable[P, Coroutine[Any, Any, None]]:
     """
     Reacts to the command message with a clock while message processing is ongoing
@@ -296,7 +301,7 @@ def wait_react(
 
 
 def done_react(
-    func: Callable[P, Coroutine[Any, Any, None]]
+    func: Callable[P, Coroutine[Any, Any, None]],
 ) -> Callable[P, Coroutine[Any, Any, None]]:
     """
     Reacts to the command message with a thumbs up once command processing is complete
@@ -319,6 +324,23 @@ def done_react(
     return decorator
 
 
+def attributed(
+    func: Callable[P, Coroutine[Any, Any, None]],
+) -> Callable[P, Coroutine[Any, Any, None]]:
+    """
+    Records the latency of a cog listener and attributes its database work to it
+    Commands are timed and attributed by the bot's invoke hooks instead
+    """
+    operation = func.__qualname__
+
+    @functools.wraps(func)
+    async def decorator(*args: P.args, **kwargs: P.kwargs):
+        with timed_operation("listener", operation):
+            await func(*args, **kwargs)
+
+    return decorator
+
+
 def rerun_to_confirm(key_name: str, confirm_msg="Re-run to confirm"):
     """
     Records the first run of the command, only actuall runs command on confirmatory second run
@@ -363,14 +385,13 @@ def rerun_to_confirm(key_name: str, confirm_msg="Re-run to confirm"):
 
 async def get_from_url(url: str, headers: dict[str, Any] | None = None) -> bytes | None:
     """gets content from url"""
-    async with aiohttp.ClientSession(headers=headers) as session:  # sets up a session
-        async with session.get(url) as response:  # gets the response
-            if response.status == 200:  # if successful return response
-                logging.info("successfully got from " + url)
-                return await response.read()
-            else:  # otherwise none
-                logging.info("failed to get from " + url)
-                return None
+    async with await _http_client.get(url, headers=headers) as response:
+        if response.status == 200:  # if successful return response
+            logging.info("successfully got from " + url)
+            return await response.read()
+        else:  # otherwise none
+            logging.info("failed to get from " + url)
+            return None
 
 
 JSON: TypeAlias = dict[str, "JSON"] | list["JSON"] | str | int | float | bool | None